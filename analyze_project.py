@@ -9,16 +9,80 @@ import os
 import ast
 import json
 import re
+import sys
+import argparse
+import contextlib
+import cProfile
+import heapq
+import hashlib
+import sqlite3
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
-from collections import defaultdict
+from typing import Dict, List, Set, Tuple, Any, Iterable, Iterator, Optional, NamedTuple, TextIO
+from collections import defaultdict, deque
 
 
 class ProjectAnalyzer:
     """Analyzes project structure, tech stack, and all functions."""
 
-    def __init__(self, project_root: str):
+    # Report sections in order, keyed by the names accepted by --sections,
+    # with the heading line each one starts with.
+    REPORT_SECTIONS = {
+        "stack": "1. TECHNOLOGY STACK OVERVIEW",
+        "architecture": "\n2. PROJECT ARCHITECTURE",
+        "python": "\n3. PYTHON FUNCTIONS & CLASSES",
+        "components": "\n\n4. ANGULAR COMPONENTS & SERVICES",
+        "core_modules": "\n\n5. CORE PYTHON MODULES",
+        "features": "\n6. KEY FEATURES IMPLEMENTED",
+        "data_flow": "\n7. DATA FLOW",
+        "stats": "\n8. CODEBASE STATISTICS",
+        "scripts": "\n9. AVAILABLE SCRIPTS",
+    }
+
+    # What each data-driven section is rendered from: "stack" is the tech
+    # stack, the rest are kinds of source file. Other sections are static.
+    SECTION_INPUTS = {
+        "stack": {"stack"},
+        "python": {"python"},
+        "components": {"typescript"},
+        "stats": {"python", "typescript", "javascript"},
+    }
+
+    # Files stat'ed, looked up and handed to the workers at a time. Cache
+    # updates are written per batch as well, so memory does not grow with
+    # the size of the project.
+    EXTRACTION_BATCH = 512
+
+    # Longest docstring prefix any report shows. Retained records are cut to
+    # this once the full text has been streamed and indexed.
+    REPORT_DOCSTRING_CHARS = 100
+
+    def __init__(self, project_root: str, jobs: int = 1, cache: Optional["AnalysisCache"] = None,
+                 record_sink: Optional["NDJSONReportWriter"] = None, retain_records: bool = True,
+                 discovery_mode: str = "auto", excludes: Optional[List[str]] = None,
+                 profiler: Optional["AnalysisProfiler"] = None, read_ahead: int = 32,
+                 read_ahead_bytes: int = 64 * 1024 * 1024, index: Optional["SymbolIndex"] = None):
         self.project_root = Path(project_root)
+        self.profiler = profiler
+        self.discovery_mode = discovery_mode
+        self.excludes = excludes or []
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.cache = cache
+        # Serial runs read files on a thread pool ahead of the parser, with at
+        # most read_ahead files / read_ahead_bytes bytes waiting to be parsed.
+        self.read_ahead = max(1, read_ahead)
+        self.read_ahead_bytes = read_ahead_bytes
+        # Extraction results are streamed to record_sink as each file is done;
+        # with retain_records=False they are not kept for the summary reports.
+        self.record_sink = record_sink
+        self.retain_records = retain_records
+        # Each file's rows in index are replaced as it is extracted, inside
+        # the transaction the caller opened with index.begin().
+        self.index = index
         self.python_files = []
         self.typescript_files = []
         self.javascript_files = []
@@ -32,29 +96,34 @@ class ProjectAnalyzer:
         self.classes = defaultdict(list)
         self.services = defaultdict(list)
         self.components = defaultdict(list)
+        # Per-file FileRecords keyed by (kind, path), used by reanalyze() and the index
+        self.file_results = {}
 
-    def discover_files(self) -> None:
-        """Discover all relevant source files in the project."""
-        print("📁 Discovering project files...")
+    def discover_files(self, quiet: bool = False) -> None:
+        """Discover all relevant source files in the project.
         
-        for root, dirs, files in os.walk(self.project_root):
-            # Skip node_modules and virtual environments
-            dirs[:] = [d for d in dirs if d not in ['node_modules', 'venv', 'env', '__pycache__', '.venv']]
-            
-            for file in files:
-                file_path = Path(root) / file
-                relative_path = file_path.relative_to(self.project_root)
-                
-                if file.endswith('.py'):
-                    self.python_files.append(relative_path)
-                elif file.endswith('.ts'):
-                    self.typescript_files.append(relative_path)
-                elif file.endswith('.js') and 'node_modules' not in str(file_path):
-                    self.javascript_files.append(relative_path)
+        ``quiet`` suppresses the progress output, for repeated discovery in --watch.
+        """
+        if not quiet:
+            print("📁 Discovering project files...")
+        
+        self.python_files = []
+        self.typescript_files = []
+        self.javascript_files = []
+        
+        discovery = SourceDiscovery(self.project_root, mode=self.discovery_mode, extra_excludes=self.excludes)
+        for relative_path in discovery.discover():
+            if relative_path.endswith('.py'):
+                self.python_files.append(Path(relative_path))
+            elif relative_path.endswith('.ts'):
+                self.typescript_files.append(Path(relative_path))
+            elif relative_path.endswith('.js'):
+                self.javascript_files.append(Path(relative_path))
         
-        print(f"✓ Found {len(self.python_files)} Python files")
-        print(f"✓ Found {len(self.typescript_files)} TypeScript files")
-        print(f"✓ Found {len(self.javascript_files)} JavaScript files")
+        if not quiet:
+            print(f"✓ Found {len(self.python_files)} Python files ({discovery.used_mode})")
+            print(f"✓ Found {len(self.typescript_files)} TypeScript files")
+            print(f"✓ Found {len(self.javascript_files)} JavaScript files")
 
     def analyze_tech_stack(self) -> None:
         """Analyze and document the technology stack."""
@@ -94,272 +163,530 @@ class ProjectAnalyzer:
         """Analyze Python files for functions, classes, and documentation."""
         print("\n🐍 Analyzing Python Files...")
         
-        for file_path in self.python_files:
-            full_path = self.project_root / file_path
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                tree = ast.parse(content)
-                self._extract_python_components(tree, str(file_path))
-            except Exception as e:
-                print(f"  ⚠ Error parsing {file_path}: {e}")
-
-    def _extract_python_components(self, tree: ast.AST, file_path: str) -> None:
-        """Extract functions and classes from Python AST."""
-        module_key = f"climatemaps/{file_path}"
-        
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                self.functions[module_key].append({
-                    "name": node.name,
-                    "lineno": node.lineno,
-                    "args": [arg.arg for arg in node.args.args],
-                    "docstring": ast.get_docstring(node) or "No documentation",
-                    "type": "Function"
-                })
-            
-            elif isinstance(node, ast.ClassDef):
-                docstring = ast.get_docstring(node) or "No documentation"
-                class_info = {
-                    "name": node.name,
-                    "lineno": node.lineno,
-                    "docstring": docstring,
-                    "methods": []
-                }
-                
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef):
-                        class_info["methods"].append({
-                            "name": item.name,
-                            "args": [arg.arg for arg in item.args.args],
-                            "docstring": ast.get_docstring(item) or "No documentation"
-                        })
-                
-                self.classes[module_key].append(class_info)
+        for file_path, result, error in self._run_extraction("python", self.python_files):
+            self._record_result("python", file_path, result, error)
 
     def analyze_typescript_files(self) -> None:
         """Analyze TypeScript files for services and components."""
         print("\n📘 Analyzing TypeScript Files...")
         
-        for file_path in self.typescript_files:
-            full_path = self.project_root / file_path
-            try:
-                with open(full_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Extract component/service information
-                if 'service.ts' in str(file_path):
-                    self._extract_typescript_service(content, str(file_path))
-                elif 'component.ts' in str(file_path):
-                    self._extract_angular_component(content, str(file_path))
+        for file_path, result, error in self._run_extraction("typescript", self.typescript_files):
+            self._record_result("typescript", file_path, result, error)
+
+    def reanalyze(self, changed: Set[str]) -> None:
+        """Bring the records up to date after the file lists were re-discovered.
+        
+        Only files listed in ``changed`` or not seen before are extracted again;
+        results of every other file are reused from the previous pass. Files
+        that disappeared are dropped from the cache and the index. Records
+        are then rebuilt in discovery order so the reports match a cold run.
+        """
+        live = {("python", str(p)) for p in self.python_files}
+        live.update(("typescript", str(p)) for p in self.typescript_files)
+        removed = [key for key in self.file_results if key not in live]
+        for key in removed:
+            del self.file_results[key]
+            if self.index:
+                self.index.remove_file(key[1])
+        if self.cache and removed:
+            self.cache.remove([path for _, path in removed])
+        
+        for kind, files in (("python", self.python_files), ("typescript", self.typescript_files)):
+            pending = [p for p in files if str(p) in changed or (kind, str(p)) not in self.file_results]
+            for file_path, result, error in self._run_extraction(kind, pending, prune=False):
+                self._record_result(kind, file_path, result, error, merge=False)
+        
+        self._rebuild_records()
+
+    def analyze_since(self, ref: str) -> Dict[str, Any]:
+        """Analyze only the source files that differ from git revision ``ref``.
+        
+        Added and modified files are extracted. When every other discovered
+        file has a cache entry, those are taken from the cache (or extracted
+        again if the entry no longer matches the file on disk) so the records
+        cover the whole tree. Otherwise only the changed files are handled
+        and ``unanalyzed_files`` in the result says how many were left out;
+        callers must not publish whole-tree reports from such a run. The old
+        versions of modified and deleted files are read from git and compared
+        with the new ones. Returns the added, removed and changed symbols.
+        """
+        print(f"\n🔀 Analyzing changes since {ref}...")
+        scope = GitDiffScope(self.project_root, ref,
+                             SourceDiscovery(self.project_root, extra_excludes=self.excludes))
+        changes = scope.changes()
+        
+        kinds = (("python", self.python_files), ("typescript", self.typescript_files))
+        missing = 0
+        for kind, files in kinds:
+            cached = self.cache.paths(kind) if self.cache else set()
+            missing += sum(1 for file_path in files if str(file_path) not in changes and str(file_path) not in cached)
+        
+        self.file_results.clear()
+        for kind, files in kinds:
+            # With a complete cache, unchanged files still go through _run_extraction
+            # so stale entries, e.g. from a cache older than ref, are re-extracted.
+            pending = files if not missing else [p for p in files if str(p) in changes]
+            for file_path, result, error in self._run_extraction(kind, pending, prune=False):
+                self._record_result(kind, file_path, result, error, merge=False)
+        self._rebuild_records()
+        
+        counts = defaultdict(int)
+        for status in changes.values():
+            counts[status] += 1
+        print(f"✓ {len(changes)} changed source files "
+              f"({counts['added']} added, {counts['modified']} modified, {counts['deleted']} deleted)")
+        if missing:
+            print(f"  ⚠ {missing} unchanged files are not in the cache; only the changed files were analyzed")
+        
+        before = scope.read_before([path for path, status in changes.items() if status != "added"])
+        symbol_diff = {
+            "ref": ref,
+            "files": {status: sorted(p for p, s in changes.items() if s == status)
+                      for status in ("added", "modified", "deleted")},
+            "symbols": {"added": [], "removed": [], "changed": []},
+            "errors": [],
+            "unanalyzed_files": missing,
+        }
+        for path, status in sorted(changes.items()):
+            kind = "python" if path.endswith('.py') else "typescript"
+            old = new = None
+            if status != "added":
+                data = before.get(path)
+                if data is None:
+                    symbol_diff["errors"].append({"path": path, "revision": ref, "message": "not found in git"})
+                    continue
+                old, error, _ = _parse_source(kind, path, data, None)
+                if error:
+                    symbol_diff["errors"].append({"path": path, "revision": ref, "message": error})
+                    continue
+            if status != "deleted":
+                if (kind, path) not in self.file_results:
+                    continue
+                new = self.file_results[(kind, path)]
+                if new is None:
+                    symbol_diff["errors"].append({"path": path, "revision": "working tree",
+                                                  "message": "could not be parsed"})
+                    continue
+            _diff_symbols(path, _symbol_table(kind, old), _symbol_table(kind, new), symbol_diff["symbols"])
+        return symbol_diff
+
+    def _rebuild_records(self) -> None:
+        """Rebuild the report records from file_results in discovery order."""
+        self.functions.clear()
+        self.classes.clear()
+        self.services.clear()
+        self.components.clear()
+        for kind, files in (("python", self.python_files), ("typescript", self.typescript_files)):
+            for file_path in files:
+                records = self.file_results.get((kind, str(file_path)))
+                if records is not None:
+                    self._merge_records(kind, file_path, records)
+
+    def _record_result(self, kind: str, file_path: Path, records: Optional["FileRecords"],
+                       error: Optional[str], merge: bool = True) -> None:
+        """Report, stream and keep the extracted records of one file."""
+        if error:
+            print(f"  ⚠ Error parsing {file_path}: {error}")
+            if self.record_sink:
+                self.record_sink.write_error(str(file_path), error)
+        elif self.record_sink:
+            if kind == "python":
+                self.record_sink.write_python_module(str(file_path), records)
+            else:
+                self.record_sink.write_typescript_module(str(file_path), records)
+        if self.index:
+            if records is None:
+                self.index.remove_file(str(file_path))
+            else:
+                self.index.replace_file(kind, str(file_path), records)
+        
+        if not self.retain_records:
+            return
+        
+        # Failed files are remembered too, so a later reanalyze() skips them until they change.
+        if records is not None:
+            records.truncate_docstrings(self.REPORT_DOCSTRING_CHARS)
+        self.file_results[(kind, str(file_path))] = records
+        if merge and records is not None:
+            self._merge_records(kind, file_path, records)
+
+    def _merge_records(self, kind: str, file_path: Path, records: "FileRecords") -> None:
+        """Merge one file's records into the report records."""
+        if kind == "python":
+            module_key = f"climatemaps/{file_path}"
+            if records.functions:
+                self.functions[module_key].extend(records.functions)
+            if records.classes:
+                self.classes[module_key].extend(records.classes)
+            return
+        
+        file_key = str(file_path)
+        if records.service:
+            self.services[file_key] = records.service
+        if records.component:
+            self.components[file_key] = records.component
+        if records.functions:
+            self.functions[file_key] = list(records.functions)
+
+    def _run_extraction(self, kind: str, files: List[Path],
+                        prune: bool = True) -> Iterator[Tuple[Path, Optional["FileRecords"], Optional[str]]]:
+        """Read and extract files, in a process pool when more than one job is configured.
+        
+        A serial run streams the files through a SourceLoader instead, so
+        reads overlap with parsing. Results are yielded in the order of ``files`` regardless of which worker
+        finished first, so merging them produces the same report as a serial run.
+        Files whose cache entry is still valid are served from the cache without
+        being read. Files are handled EXTRACTION_BATCH at a time and each
+        batch's cache updates are written as soon as it has been yielded.
+        ``prune`` drops cache entries for files not in ``files`` and
+        must be off when only a subset of the project is extracted.
+        """
+        executor = None
+        ahead = deque()
+        try:
+            for start in range(0, len(files), self.EXTRACTION_BATCH):
+                slots, tasks, sizes = self._plan_batch(kind, files[start:start + self.EXTRACTION_BATCH])
+                if self.jobs > 1 and len(tasks) > 1:
+                    if executor is None:
+                        executor = ProcessPoolExecutor(max_workers=self.jobs)
+                    chunksize = max(1, len(tasks) // (self.jobs * 4))
+                    outcomes = executor.map(_extract_file, tasks, chunksize=chunksize)
                 else:
-                    self._extract_typescript_functions(content, str(file_path))
-            
-            except Exception as e:
-                print(f"  ⚠ Error parsing {file_path}: {e}")
-
-    def _extract_typescript_service(self, content: str, file_path: str) -> None:
-        """Extract Angular service information."""
-        class_match = re.search(r'export class (\w+)', content)
-        if class_match:
-            class_name = class_match.group(1)
-            methods = re.findall(r'^\s{2}(\w+)\s*\([^)]*\)\s*(?::|:.*?{)', content, re.MULTILINE)
-            
-            self.services[file_path] = {
-                "name": class_name,
-                "methods": list(set(methods)),
-                "file": file_path
-            }
+                    outcomes = self._load_and_extract(kind, tasks, sizes)
+                # Keep one batch queued ahead so the workers stay busy while this one is drained.
+                ahead.append((slots, outcomes))
+                if len(ahead) > 1:
+                    yield from self._collect_batch(kind, *ahead.popleft())
+            while ahead:
+                yield from self._collect_batch(kind, *ahead.popleft())
+        finally:
+            if executor:
+                executor.shutdown()
+        
+        if self.cache and prune:
+            self.cache.prune(kind, [str(file_path) for file_path in files])
 
-    def _extract_angular_component(self, content: str, file_path: str) -> None:
-        """Extract Angular component information."""
-        class_match = re.search(r'export class (\w+)', content)
-        if class_match:
-            class_name = class_match.group(1)
-            decorator = re.search(r'@Component\({([^}]+)}\)', content, re.DOTALL)
+    def _plan_batch(self, kind: str, files: List[Path]) -> Tuple[List[Tuple], List[Tuple], List[int]]:
+        """Stat a batch of files and split off those whose cache entry is still valid."""
+        slots = []
+        tasks = []
+        sizes = []
+        for file_path in files:
+            key = str(file_path)
+            entry = self.cache.get(kind, key) if self.cache else None
+            try:
+                stat = os.stat(self.project_root / file_path)
+            except OSError:
+                stat = None
             
-            component_info = {
-                "name": class_name,
-                "file": file_path,
-                "selectors": re.findall(r"selector:\s*['\"]([^'\"]+)['\"]", content),
-                "templateUrl": re.findall(r"templateUrl:\s*['\"]([^'\"]+)['\"]", content),
-                "styleUrls": re.findall(r"styleUrls:\s*\[\s*['\"]([^'\"]+)['\"]", content)
-            }
+            if entry and stat and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                slots.append((file_path, entry, stat, False))
+            else:
+                slots.append((file_path, entry, stat, True))
+                tasks.append((str(self.project_root), kind, key, entry.digest if entry else None))
+                sizes.append(stat.st_size if stat else 0)
+        return slots, tasks, sizes
+
+    def _collect_batch(self, kind: str, slots: List[Tuple], outcomes: Iterator["ExtractionOutcome"]
+                       ) -> Iterator[Tuple[Path, Optional["FileRecords"], Optional[str]]]:
+        """Yield the results of one batch in order, then write its cache updates.
+        
+        Updates are encoded before each result is yielded, since the
+        consumer truncates the docstrings of the records it keeps.
+        """
+        updates = [] if self.cache else None
+        for file_path, entry, stat, needs_extraction in slots:
+            if not needs_extraction:
+                if self.profiler:
+                    self.profiler.record_cache_hit()
+                yield file_path, entry.records(), None
+                continue
             
-            self.components[file_path] = component_info
-
-    def _extract_typescript_functions(self, content: str, file_path: str) -> None:
-        """Extract TypeScript functions."""
-        # Find exported functions
-        functions = re.findall(
-            r'export\s+(?:async\s+)?function\s+(\w+)\s*\(([^)]*)\)',
-            content
-        )
+            outcome = next(outcomes)
+            if self.profiler:
+                self.profiler.record_file(kind, str(file_path), outcome.wall_s, outcome.cpu_s, outcome.bytes_read)
+            result, error, digest = outcome.result, outcome.error, outcome.digest
+            if error:
+                yield file_path, None, error
+                continue
+            if result is None:
+                # Content hash matched the cache entry; only the stat changed.
+                result = entry.records()
+                encoded = entry.encoded
+            else:
+                encoded = AnalysisCache.encode(kind, result) if updates is not None else None
+            if updates is not None and stat:
+                updates.append((str(file_path), stat.st_mtime_ns, stat.st_size, digest, encoded))
+            yield file_path, result, None
         
-        if functions:
-            self.functions[file_path] = [
-                {
-                    "name": name,
-                    "parameters": params.split(','),
-                    "type": "Function"
-                }
-                for name, params in functions
-            ]
+        if updates:
+            self.cache.store(kind, updates)
 
-    def generate_report(self, output_file: str = None) -> str:
-        """Generate comprehensive analysis report."""
+    def _load_and_extract(self, kind: str, tasks: List[Tuple[str, str, str, Optional[str]]],
+                          sizes: List[int]) -> Iterator["ExtractionOutcome"]:
+        """Parse files in this process while a SourceLoader reads the next ones."""
+        loader = SourceLoader(self.project_root, read_ahead=self.read_ahead, max_bytes=self.read_ahead_bytes)
+        known_digests = {file_path: digest for _, _, file_path, digest in tasks}
+        for source in loader.load((file_path, size) for (_, _, file_path, _), size in zip(tasks, sizes)):
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            if source.error:
+                result, error, digest = None, source.error, None
+            else:
+                result, error, digest = _parse_source(kind, source.file_path, source.data,
+                                                      known_digests[source.file_path])
+            yield ExtractionOutcome(source.file_path, result, error, digest,
+                                    source.read_s + time.perf_counter() - wall_start,
+                                    time.process_time() - cpu_start, len(source.data))
+
+    def generate_report(self, output_file: str = None, sections: Optional[List[str]] = None,
+                        diff: bool = False) -> str:
+        """Generate comprehensive analysis report.
+        
+        ``sections`` limits the report to the named entries of
+        REPORT_SECTIONS; only those are rendered. Each section is produced
+        lazily and written to ``output_file`` as soon as it is rendered.
+        
+        With ``diff`` the previous report in ``output_file`` is kept as the
+        base: the requested sections are re-rendered and replace their old
+        text, every other section is copied over unchanged, and the file is
+        not rewritten at all when nothing changed.
+        """
         print("\n📊 Generating Analysis Report...")
         
-        report = []
-        report.append("=" * 80)
-        report.append("PROJECT ANALYSIS REPORT: World Crop Monitor 1.0")
-        report.append("=" * 80)
-        report.append("")
-        
-        # 1. Technology Stack Overview
-        report.append("1. TECHNOLOGY STACK OVERVIEW")
-        report.append("-" * 80)
-        report.append("")
-        report.append("Backend Technology:")
-        report.append(f"  • Node.js Application (Express.js)")
-        report.append(f"  • Server: backend/server.js")
-        report.append("")
-        report.append("Frontend Technology:")
-        report.append(f"  • Angular (Latest)")
-        report.append(f"  • TypeScript")
-        report.append(f"  • SCSS for styling")
-        report.append(f"  • ESLint for code quality")
-        report.append("")
-        report.append("Backend API Technology:")
-        report.append(f"  • Python 3.9+")
-        report.append(f"  • Flask-based REST API")
-        report.append(f"  • Docker containerized")
-        report.append("")
+        requested = list(self.REPORT_SECTIONS) if sections is None else list(sections)
+        unknown = [name for name in requested if name not in self.REPORT_SECTIONS]
+        if unknown:
+            raise ValueError(f"Unknown report section(s): {', '.join(unknown)}")
+        
+        previous = None
+        if diff and output_file and Path(output_file).exists():
+            previous = self._split_report(Path(output_file).read_text(encoding='utf-8'))
+        
+        # (name, text) pairs in report order; text is None until rendered.
+        parts = [("header", "\n".join(self._report_header()))]
+        for name in self.REPORT_SECTIONS:
+            if name in requested:
+                parts.append((name, None))
+            elif previous and name in previous:
+                parts.append((name, previous[name]))
+        parts.append(("footer", "\n".join(self._report_footer())))
+        
+        def render() -> Iterator[str]:
+            for index, (name, text) in enumerate(parts):
+                if text is None:
+                    text = "\n".join(getattr(self, f"_report_{name}")())
+                    parts[index] = (name, text)
+                yield text
+        
+        if previous is not None:
+            for _ in render():
+                pass
+            changed = [name for name, text in parts if previous.get(name) != text]
+            report_text = "\n".join(text for _, text in parts)
+            if not changed:
+                print(f"\n✓ Report {output_file} is up to date")
+            else:
+                _write_atomic(Path(output_file), report_text)
+                print(f"\n✓ Report saved to {output_file} (changed: {', '.join(changed)})")
+            return report_text
+        
+        if output_file:
+            with _atomic_writer(Path(output_file)) as f:
+                for index, text in enumerate(render()):
+                    if index:
+                        f.write("\n")
+                    f.write(text)
+            print(f"\n✓ Report saved to {output_file}")
+        else:
+            for _ in render():
+                pass
+        
+        return "\n".join(text for _, text in parts)
+
+    @classmethod
+    def _split_report(cls, text: str) -> Optional[Dict[str, str]]:
+        """Split a report written by generate_report() back into its sections.
+        
+        Returns ``None`` when ``text`` does not look like such a report.
+        """
+        footer_start = text.rfind("\n" + "=" * 80 + "\nEnd of Analysis Report")
+        if not text.startswith("=" * 80 + "\nPROJECT ANALYSIS REPORT") or footer_start < 0:
+            return None
+        
+        starts = []
+        position = 0
+        for name, heading in cls.REPORT_SECTIONS.items():
+            found = text.find(f"\n{heading}\n" + "-" * 80, position)
+            if found >= 0:
+                starts.append((name, found + 1))
+                position = found + 1
+        
+        boundaries = [("header", 0)] + starts + [("footer", footer_start + 1)]
+        parts = {}
+        for (name, begin), (_, end) in zip(boundaries, boundaries[1:]):
+            parts[name] = text[begin:end - 1]
+        parts["footer"] = text[footer_start + 1:]
+        return parts
+
+    def _report_heading(self, name: str) -> Iterator[str]:
+        yield self.REPORT_SECTIONS[name]
+        yield "-" * 80
+
+    def _report_header(self) -> Iterator[str]:
+        yield "=" * 80
+        yield "PROJECT ANALYSIS REPORT: World Crop Monitor 1.0"
+        yield "=" * 80
+        yield ""
+
+    def _report_footer(self) -> Iterator[str]:
+        yield "=" * 80
+        yield "End of Analysis Report"
+        yield "=" * 80
+
+    def _report_stack(self) -> Iterator[str]:
+        """Section 1: languages, frameworks and declared dependencies."""
+        yield from self._report_heading("stack")
+        yield ""
+        yield "Backend Technology:"
+        yield f"  • Node.js Application (Express.js)"
+        yield f"  • Server: backend/server.js"
+        yield ""
+        yield "Frontend Technology:"
+        yield f"  • Angular (Latest)"
+        yield f"  • TypeScript"
+        yield f"  • SCSS for styling"
+        yield f"  • ESLint for code quality"
+        yield ""
+        yield "Backend API Technology:"
+        yield f"  • Python 3.9+"
+        yield f"  • Flask-based REST API"
+        yield f"  • Docker containerized"
+        yield ""
         
         # Backend Dependencies
         if self.tech_stack["dependencies"].get("Backend"):
-            report.append("Backend Dependencies:")
+            yield "Backend Dependencies:"
             for dep in self.tech_stack["dependencies"]["Backend"]:
-                report.append(f"  • {dep}")
-            report.append("")
+                yield f"  • {dep}"
+            yield ""
         
         # Frontend Dependencies
         if self.tech_stack["dependencies"].get("Frontend"):
-            report.append("Frontend Dependencies (Key):")
+            yield "Frontend Dependencies (Key):"
             key_deps = [d for d in self.tech_stack["dependencies"]["Frontend"][:10]]
             for dep in key_deps:
-                report.append(f"  • {dep}")
+                yield f"  • {dep}"
             if len(self.tech_stack["dependencies"]["Frontend"]) > 10:
-                report.append(f"  ... and {len(self.tech_stack['dependencies']['Frontend']) - 10} more")
-            report.append("")
+                yield f"  ... and {len(self.tech_stack['dependencies']['Frontend']) - 10} more"
+            yield ""
         
         # Python Dependencies
         if self.tech_stack["dependencies"].get("Python"):
-            report.append("Python API Dependencies:")
+            yield "Python API Dependencies:"
             for dep in self.tech_stack["dependencies"]["Python"][:15]:
-                report.append(f"  • {dep}")
+                yield f"  • {dep}"
             if len(self.tech_stack["dependencies"]["Python"]) > 15:
-                report.append(f"  ... and {len(self.tech_stack['dependencies']['Python']) - 15} more")
-            report.append("")
-        
-        # 2. Project Architecture
-        report.append("\n2. PROJECT ARCHITECTURE")
-        report.append("-" * 80)
-        report.append("")
-        report.append("Directory Structure:")
-        report.append("  backend/")
-        report.append("    └── server.js - Express.js backend server")
-        report.append("")
-        report.append("  climatemaps/")
-        report.append("    ├── api/ - Python REST API with Flask")
-        report.append("    │   ├── main.py - API entry point")
-        report.append("    │   ├── middleware.py - Request/response middleware")
-        report.append("    │   └── cache.py - Caching layer")
-        report.append("    ├── client/ - Angular frontend application")
-        report.append("    │   └── src/")
-        report.append("    │       ├── app/ - Angular components and services")
-        report.append("    │       ├── assets/ - Static assets")
-        report.append("    │       ├── styles/ - Global SCSS styles")
-        report.append("    │       └── environments/ - Environment configs")
-        report.append("    └── climatemaps/ - Core Python modules")
-        report.append("        ├── contour.py - Contour generation")
-        report.append("        ├── tile.py - Tile server integration")
-        report.append("        ├── data.py - Data processing")
-        report.append("        └── datasets.py - Dataset management")
-        report.append("")
-        report.append("  Data Layer:")
-        report.append("    └── data/")
-        report.append("        ├── raw/ - Raw GeoJSON and boundary data")
-        report.append("        └── tiles/ - Vector tiles for visualization")
-        report.append("")
-        report.append("  Infrastructure:")
-        report.append("    └── infra/")
-        report.append("        └── openclimatemap.nginx.conf - Nginx configuration")
-        report.append("")
-        
-        # 3. Python Functions and Classes
-        report.append("\n3. PYTHON FUNCTIONS & CLASSES")
-        report.append("-" * 80)
-        report.append("")
+                yield f"  ... and {len(self.tech_stack['dependencies']['Python']) - 15} more"
+            yield ""
+
+    def _report_architecture(self) -> Iterator[str]:
+        """Section 2: directory layout."""
+        yield from self._report_heading("architecture")
+        yield ""
+        yield "Directory Structure:"
+        yield "  backend/"
+        yield "    └── server.js - Express.js backend server"
+        yield ""
+        yield "  climatemaps/"
+        yield "    ├── api/ - Python REST API with Flask"
+        yield "    │   ├── main.py - API entry point"
+        yield "    │   ├── middleware.py - Request/response middleware"
+        yield "    │   └── cache.py - Caching layer"
+        yield "    ├── client/ - Angular frontend application"
+        yield "    │   └── src/"
+        yield "    │       ├── app/ - Angular components and services"
+        yield "    │       ├── assets/ - Static assets"
+        yield "    │       ├── styles/ - Global SCSS styles"
+        yield "    │       └── environments/ - Environment configs"
+        yield "    └── climatemaps/ - Core Python modules"
+        yield "        ├── contour.py - Contour generation"
+        yield "        ├── tile.py - Tile server integration"
+        yield "        ├── data.py - Data processing"
+        yield "        └── datasets.py - Dataset management"
+        yield ""
+        yield "  Data Layer:"
+        yield "    └── data/"
+        yield "        ├── raw/ - Raw GeoJSON and boundary data"
+        yield "        └── tiles/ - Vector tiles for visualization"
+        yield ""
+        yield "  Infrastructure:"
+        yield "    └── infra/"
+        yield "        └── openclimatemap.nginx.conf - Nginx configuration"
+        yield ""
+
+    def _report_python(self) -> Iterator[str]:
+        """Section 3: Python classes and functions."""
+        yield from self._report_heading("python")
+        yield ""
         
         if self.classes:
-            report.append("Classes Found:")
+            yield "Classes Found:"
             for file_path, classes in sorted(self.classes.items()):
-                report.append(f"\n  File: {file_path}")
+                yield f"\n  File: {file_path}"
                 for cls in classes:
-                    report.append(f"    Class: {cls['name']}")
-                    report.append(f"      Docstring: {cls['docstring'][:100]}")
-                    if cls['methods']:
-                        report.append(f"      Methods ({len(cls['methods'])}):")
-                        for method in cls['methods'][:5]:
-                            report.append(f"        • {method['name']}({', '.join(method['args'])})")
-                        if len(cls['methods']) > 5:
-                            report.append(f"        ... and {len(cls['methods']) - 5} more methods")
-                    report.append("")
+                    yield f"    Class: {cls.name}"
+                    yield f"      Docstring: {_report_docstring(cls)[:100]}"
+                    if cls.methods:
+                        yield f"      Methods ({len(cls.methods)}):"
+                        for method in cls.methods[:5]:
+                            yield f"        • {method.name}({', '.join(method.args)})"
+                        if len(cls.methods) > 5:
+                            yield f"        ... and {len(cls.methods) - 5} more methods"
+                    yield ""
         
         if self.functions:
-            report.append("\nFunctions Found:")
+            yield "\nFunctions Found:"
             for file_path, functions in sorted(self.functions.items()):
                 if file_path.endswith('.py'):
-                    report.append(f"\n  File: {file_path}")
+                    yield f"\n  File: {file_path}"
                     for func in functions[:8]:
-                        report.append(f"    • {func['name']}({', '.join(func['args'])})")
-                        report.append(f"      {func['docstring'][:80]}...")
+                        yield f"    • {func.name}({', '.join(func.args)})"
+                        yield f"      {_report_docstring(func)[:80]}..."
                     if len(functions) > 8:
-                        report.append(f"    ... and {len(functions) - 8} more functions")
-        
-        # 4. Angular Components & Services
-        report.append("\n\n4. ANGULAR COMPONENTS & SERVICES")
-        report.append("-" * 80)
-        report.append("")
+                        yield f"    ... and {len(functions) - 8} more functions"
+
+    def _report_components(self) -> Iterator[str]:
+        """Section 4: Angular components and services."""
+        yield from self._report_heading("components")
+        yield ""
         
         if self.components:
-            report.append("Components:")
+            yield "Components:"
             for file_path, component in sorted(self.components.items()):
-                report.append(f"\n  {component['name']}")
-                report.append(f"    File: {file_path}")
+                yield f"\n  {component['name']}"
+                yield f"    File: {file_path}"
                 if component['selectors']:
-                    report.append(f"    Selector: {component['selectors'][0]}")
+                    yield f"    Selector: {component['selectors'][0]}"
                 if component['templateUrl']:
-                    report.append(f"    Template: {component['templateUrl'][0]}")
+                    yield f"    Template: {component['templateUrl'][0]}"
                 if component['styleUrls']:
-                    report.append(f"    Styles: {', '.join(component['styleUrls'])}")
+                    yield f"    Styles: {', '.join(component['styleUrls'])}"
         
         if self.services:
-            report.append("\n\nServices:")
+            yield "\n\nServices:"
             for file_path, service in sorted(self.services.items()):
-                report.append(f"\n  {service['name']}")
-                report.append(f"    File: {file_path}")
+                yield f"\n  {service['name']}"
+                yield f"    File: {file_path}"
                 if service['methods']:
-                    report.append(f"    Methods: {', '.join(service['methods'][:5])}")
+                    yield f"    Methods: {', '.join(service['methods'][:5])}"
                     if len(service['methods']) > 5:
-                        report.append(f"             ... and {len(service['methods']) - 5} more")
-        
-        # 5. Core Modules Documentation
-        report.append("\n\n5. CORE PYTHON MODULES")
-        report.append("-" * 80)
-        report.append("")
+                        yield f"             ... and {len(service['methods']) - 5} more"
+
+    def _report_core_modules(self) -> Iterator[str]:
+        """Section 5: core Python modules."""
+        yield from self._report_heading("core_modules")
+        yield ""
         
         core_modules = {
             "contour.py": "Contour/isoline generation from climate data",
@@ -375,90 +702,74 @@ class ProjectAnalyzer:
         }
         
         for module, description in core_modules.items():
-            report.append(f"  • {module}")
-            report.append(f"    └─ {description}")
-        
-        report.append("")
-        
-        # 6. Key Features
-        report.append("\n6. KEY FEATURES IMPLEMENTED")
-        report.append("-" * 80)
-        report.append("")
-        report.append("Climate Visualization:")
-        report.append("  • Interactive global map with climate data visualization")
-        report.append("  • Support for multiple climate variables (temperature, precipitation)")
-        report.append("  • CMIP5/CMIP6 climate scenario support")
-        report.append("  • High-resolution tile-based rendering")
-        report.append("")
-        report.append("Crop Stress Monitoring:")
-        report.append("  • Multi-indicator stress tracking")
-        report.append("  • Risk classification (Critical, High, Medium, Low)")
-        report.append("  • Trend analysis and historical tracking")
-        report.append("  • Data export (JSON/CSV)")
-        report.append("")
-        report.append("Technical Features:")
-        report.append("  • Geospatial data processing (NetCDF, GeoTIFF)")
-        report.append("  • Vector tile optimization")
-        report.append("  • Caching layer for performance")
-        report.append("  • Docker containerization")
-        report.append("  • Nginx reverse proxy")
-        report.append("")
-        
-        # 7. Data Flow
-        report.append("\n7. DATA FLOW")
-        report.append("-" * 80)
-        report.append("")
-        report.append("User Request → Angular Frontend → Express Backend → Python API")
-        report.append("                                                        ↓")
-        report.append("                                              Data Processing")
-        report.append("                                              (GeoGrid, Tile Generation)")
-        report.append("                                                        ↓")
-        report.append("                                              Vector Tile Server")
-        report.append("                                                        ↓")
-        report.append("                                              Client Visualization")
-        report.append("")
-        
-        # 8. Summary Statistics
-        report.append("\n8. CODEBASE STATISTICS")
-        report.append("-" * 80)
-        report.append("")
-        report.append(f"Python Files: {len(self.python_files)}")
-        report.append(f"TypeScript Files: {len(self.typescript_files)}")
-        report.append(f"JavaScript Files: {len(self.javascript_files)}")
-        report.append(f"Total Python Functions: {sum(len(v) for k, v in self.functions.items() if k.endswith('.py'))}")
-        report.append(f"Total Python Classes: {sum(len(v) for v in self.classes.values())}")
-        report.append(f"Angular Components: {len(self.components)}")
-        report.append(f"Angular Services: {len(self.services)}")
-        report.append("")
-        
-        # 9. Development Scripts
-        report.append("\n9. AVAILABLE SCRIPTS")
-        report.append("-" * 80)
-        report.append("")
-        report.append("  • scripts/create_contour.py - Generate contour lines from data")
-        report.append("  • scripts/create_ensemble_mean.py - Compute ensemble averages")
-        report.append("  • scripts/create_tileserver_config.py - Generate tile server config")
-        report.append("  • scripts/download_tiles.sh - Download pre-rendered tiles")
-        report.append("  • scripts/deploy.sh - Full deployment pipeline")
-        report.append("  • scripts/deploy_backend.sh - Backend deployment")
-        report.append("  • scripts/deploy_client.sh - Frontend deployment")
-        report.append("")
-        
-        report.append("=" * 80)
-        report.append("End of Analysis Report")
-        report.append("=" * 80)
-        
-        report_text = "\n".join(report)
-        
-        # Save to file if specified
-        if output_file:
-            output_path = Path(output_file)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(report_text)
-            print(f"\n✓ Report saved to {output_file}")
+            yield f"  • {module}"
+            yield f"    └─ {description}"
         
-        return report_text
+        yield ""
+
+    def _report_features(self) -> Iterator[str]:
+        """Section 6: key features."""
+        yield from self._report_heading("features")
+        yield ""
+        yield "Climate Visualization:"
+        yield "  • Interactive global map with climate data visualization"
+        yield "  • Support for multiple climate variables (temperature, precipitation)"
+        yield "  • CMIP5/CMIP6 climate scenario support"
+        yield "  • High-resolution tile-based rendering"
+        yield ""
+        yield "Crop Stress Monitoring:"
+        yield "  • Multi-indicator stress tracking"
+        yield "  • Risk classification (Critical, High, Medium, Low)"
+        yield "  • Trend analysis and historical tracking"
+        yield "  • Data export (JSON/CSV)"
+        yield ""
+        yield "Technical Features:"
+        yield "  • Geospatial data processing (NetCDF, GeoTIFF)"
+        yield "  • Vector tile optimization"
+        yield "  • Caching layer for performance"
+        yield "  • Docker containerization"
+        yield "  • Nginx reverse proxy"
+        yield ""
+
+    def _report_data_flow(self) -> Iterator[str]:
+        """Section 7: request data flow."""
+        yield from self._report_heading("data_flow")
+        yield ""
+        yield "User Request → Angular Frontend → Express Backend → Python API"
+        yield "                                                        ↓"
+        yield "                                              Data Processing"
+        yield "                                              (GeoGrid, Tile Generation)"
+        yield "                                                        ↓"
+        yield "                                              Vector Tile Server"
+        yield "                                                        ↓"
+        yield "                                              Client Visualization"
+        yield ""
+
+    def _report_stats(self) -> Iterator[str]:
+        """Section 8: file and symbol counts."""
+        yield from self._report_heading("stats")
+        yield ""
+        yield f"Python Files: {len(self.python_files)}"
+        yield f"TypeScript Files: {len(self.typescript_files)}"
+        yield f"JavaScript Files: {len(self.javascript_files)}"
+        yield f"Total Python Functions: {sum(len(v) for k, v in self.functions.items() if k.endswith('.py'))}"
+        yield f"Total Python Classes: {sum(len(v) for v in self.classes.values())}"
+        yield f"Angular Components: {len(self.components)}"
+        yield f"Angular Services: {len(self.services)}"
+        yield ""
+
+    def _report_scripts(self) -> Iterator[str]:
+        """Section 9: development scripts."""
+        yield from self._report_heading("scripts")
+        yield ""
+        yield "  • scripts/create_contour.py - Generate contour lines from data"
+        yield "  • scripts/create_ensemble_mean.py - Compute ensemble averages"
+        yield "  • scripts/create_tileserver_config.py - Generate tile server config"
+        yield "  • scripts/download_tiles.sh - Download pre-rendered tiles"
+        yield "  • scripts/deploy.sh - Full deployment pipeline"
+        yield "  • scripts/deploy_backend.sh - Backend deployment"
+        yield "  • scripts/deploy_client.sh - Frontend deployment"
+        yield ""
 
     def generate_json_report(self, output_file: str = None) -> Dict[str, Any]:
         """Generate structured JSON report for programmatic access."""
@@ -496,10 +807,10 @@ class ProjectAnalyzer:
             "python_modules": {
                 str(k): [
                     {
-                        "name": f["name"],
-                        "type": f.get("type", "Function"),
-                        "args": f.get("args", []),
-                        "docstring": f.get("docstring", "")[:100]
+                        "name": f.name,
+                        "type": f.type,
+                        "args": list(f.args),
+                        "docstring": _report_docstring(f)[:100]
                     }
                     for f in v[:5]
                 ]
@@ -526,38 +837,1728 @@ class ProjectAnalyzer:
         }
         
         if output_file:
-            output_path = Path(output_file)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(json_report, f, indent=2)
+            _write_atomic(Path(output_file), json.dumps(json_report, indent=2))
             print(f"✓ JSON report saved to {output_file}")
         
         return json_report
 
 
+class AnalysisProfiler:
+    """Collects per-phase and per-file timings for a single analysis run.
+    
+    Phase CPU time includes worker processes that were reaped within the
+    phase. Per-file numbers are measured inside whichever process extracted
+    the file. Optionally wraps the run in cProfile and/or tracemalloc.
+    """
+    
+    def __init__(self, top_n: int = 20, use_cprofile: bool = False, use_tracemalloc: bool = False):
+        self.top_n = top_n
+        self.phases = []
+        self.files = []
+        self.cache_hits = 0
+        self.bytes_read = 0
+        self.profile = cProfile.Profile() if use_cprofile else None
+        self.use_tracemalloc = use_tracemalloc
+        self.tracemalloc_snapshot = None
+    
+    def start(self) -> None:
+        if self.use_tracemalloc:
+            tracemalloc.start()
+        if self.profile:
+            self.profile.enable()
+    
+    def stop(self) -> None:
+        if self.profile:
+            self.profile.disable()
+        if self.use_tracemalloc:
+            self.tracemalloc_snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+    
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time one analysis phase."""
+        files_before = len(self.files) + self.cache_hits
+        bytes_before = self.bytes_read
+        times_before = os.times()
+        wall_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall_s = time.perf_counter() - wall_start
+            times_after = os.times()
+            cpu_s = sum(after - before for after, before in zip(times_after[:4], times_before[:4]))
+            files = len(self.files) + self.cache_hits - files_before
+            self.phases.append({
+                "phase": name,
+                "wall_s": round(wall_s, 6),
+                "cpu_s": round(cpu_s, 6),
+                "files": files,
+                "bytes_read": self.bytes_read - bytes_before,
+                "files_per_s": round(files / wall_s, 1) if files and wall_s else None
+            })
+    
+    def record_file(self, kind: str, file_path: str, wall_s: float, cpu_s: float, bytes_read: int) -> None:
+        self.files.append((wall_s, cpu_s, bytes_read, kind, file_path))
+        self.bytes_read += bytes_read
+    
+    def record_cache_hit(self) -> None:
+        self.cache_hits += 1
+    
+    def summary(self) -> Dict[str, Any]:
+        """Return the collected measurements as a JSON-serializable dict."""
+        slowest = heapq.nlargest(self.top_n, self.files)
+        data = {
+            "phases": self.phases,
+            "totals": {
+                "wall_s": round(sum(p["wall_s"] for p in self.phases), 6),
+                "cpu_s": round(sum(p["cpu_s"] for p in self.phases), 6),
+                "files_extracted": len(self.files),
+                "cache_hits": self.cache_hits,
+                "bytes_read": self.bytes_read
+            },
+            "slowest_files": [
+                {"path": path, "kind": kind, "wall_s": round(wall_s, 6), "cpu_s": round(cpu_s, 6), "bytes": size}
+                for wall_s, cpu_s, size, kind, path in slowest
+            ]
+        }
+        if self.tracemalloc_snapshot:
+            data["top_allocations"] = [
+                {"location": str(stat.traceback), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in self.tracemalloc_snapshot.statistics("lineno")[:self.top_n]
+            ]
+        return data
+    
+    def write(self, sidecar_file: str) -> None:
+        """Write the JSON sidecar, plus pstats/tracemalloc dumps beside it when enabled."""
+        sidecar_path = Path(sidecar_file)
+        _write_atomic(sidecar_path, json.dumps(self.summary(), indent=2))
+        if self.profile:
+            self.profile.dump_stats(str(sidecar_path.with_suffix(".prof")))
+        if self.tracemalloc_snapshot:
+            self.tracemalloc_snapshot.dump(str(sidecar_path.with_suffix(".tracemalloc")))
+
+
+class AnalysisWatcher:
+    """Keeps a ProjectAnalyzer resident and refreshes the reports on change.
+    
+    The tree is polled by re-running discovery and comparing mtime/size of
+    every source file with the previous pass; only added or modified files
+    are extracted again, only their rows in the index are rewritten, and only
+    the report sections fed by what changed are rendered again.
+    """
+    
+    def __init__(self, analyzer: ProjectAnalyzer, report_file: str, json_file: str, interval: float = 1.0,
+                 sections: Optional[List[str]] = None):
+        self.analyzer = analyzer
+        self.report_file = report_file
+        self.json_file = json_file
+        self.interval = interval
+        # The analyzer updates its index file by file; the watcher only brackets each pass.
+        self.index = analyzer.index
+        self.sections = sections
+        self.snapshot = {}
+    
+    def run(self) -> None:
+        """Run the initial analysis, then poll until interrupted."""
+        self.analyzer.discover_files()
+        self.analyzer.analyze_tech_stack()
+        if self.index:
+            self.index.begin(reset=True)
+        self.analyzer.analyze_python_files()
+        self.analyzer.analyze_typescript_files()
+        if self.index:
+            self.index.commit()
+        self.snapshot = self._take_snapshot()
+        self._write_reports()
+        
+        print(f"\n👀 Watching {self.analyzer.project_root} for changes (Ctrl+C to stop)...")
+        try:
+            while True:
+                time.sleep(self.interval)
+                self.poll()
+        except KeyboardInterrupt:
+            print("\n✋ Watch stopped")
+    
+    def poll(self) -> bool:
+        """Check the tree once; returns True if the reports were rewritten."""
+        previous = self.snapshot
+        self.analyzer.discover_files(quiet=True)
+        current = self._take_snapshot()
+        
+        changed = {path for path, signature in current.items() if previous.get(path) != signature}
+        removed = previous.keys() - current.keys()
+        self.snapshot = current
+        if not changed and not removed:
+            return False
+        
+        print(f"\n🔄 {len(changed)} changed, {len(removed)} removed")
+        dirty = {self._source_kind(path) for path in changed | removed}
+        stack = json.dumps(self.analyzer.tech_stack, sort_keys=True)
+        self.analyzer.analyze_tech_stack()
+        if json.dumps(self.analyzer.tech_stack, sort_keys=True) != stack:
+            dirty.add("stack")
+        if self.index:
+            self.index.begin()
+        self.analyzer.reanalyze(changed)
+        if self.index:
+            self.index.commit()
+        self._write_reports(dirty)
+        return True
+    
+    @staticmethod
+    def _source_kind(path: str) -> str:
+        if path.endswith('.py'):
+            return "python"
+        return "typescript" if path.endswith('.ts') else "javascript"
+    
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for file_path in self.analyzer.python_files + self.analyzer.typescript_files + self.analyzer.javascript_files:
+            try:
+                stat = os.stat(self.analyzer.project_root / file_path)
+            except OSError:
+                continue
+            snapshot[str(file_path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+    
+    def _write_reports(self, dirty: Optional[Set[str]] = None) -> None:
+        """Write the reports; with ``dirty`` only sections fed by those inputs are re-rendered.
+        
+        The report is left untouched when a change does not affect its text.
+        """
+        sections = self.sections
+        if dirty is not None and Path(self.report_file).exists():
+            sections = [name for name, inputs in ProjectAnalyzer.SECTION_INPUTS.items()
+                        if inputs & dirty and (self.sections is None or name in self.sections)]
+        self.analyzer.generate_report(self.report_file, sections=sections, diff=True)
+        self.analyzer.generate_json_report(self.json_file)
+
+
+class IgnoreRules:
+    """Compiled gitignore-style patterns from one ignore file.
+    
+    Patterns are matched against POSIX paths relative to ``base``, the
+    directory that contains the ignore file. The last matching pattern wins,
+    and ``!pattern`` re-includes a path excluded by an earlier one.
+    """
+    
+    def __init__(self, base: str, lines: List[str]):
+        self.base = base
+        self.rules = []
+        for line in lines:
+            rule = self._compile(line)
+            if rule:
+                self.rules.append(rule)
+    
+    @classmethod
+    def from_file(cls, path: Path, base: str) -> Optional["IgnoreRules"]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rules = cls(base, f.read().splitlines())
+        except (OSError, UnicodeDecodeError):
+            return None
+        return rules if rules.rules else None
+    
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """Return True if ignored, False if re-included, None if no pattern matched."""
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        
+        verdict = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                verdict = not negate
+        return verdict
+    
+    @staticmethod
+    def _compile(line: str) -> Optional[Tuple["re.Pattern", bool, bool]]:
+        pattern = line.rstrip()
+        if not pattern or pattern.startswith('#'):
+            return None
+        
+        negate = pattern.startswith('!')
+        if negate:
+            pattern = pattern[1:]
+        elif pattern.startswith('\\'):
+            pattern = pattern[1:]
+        
+        dir_only = pattern.endswith('/')
+        pattern = pattern.rstrip('/')
+        if not pattern:
+            return None
+        
+        # A slash anywhere but the end anchors the pattern to the ignore file's directory.
+        anchored = '/' in pattern
+        pattern = pattern.lstrip('/')
+        
+        regex = []
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**/', i):
+                regex.append('(?:.*/)?')
+                i += 3
+            elif pattern.startswith('**', i):
+                regex.append('.*')
+                i += 2
+            elif pattern[i] == '*':
+                regex.append('[^/]*')
+                i += 1
+            elif pattern[i] == '?':
+                regex.append('[^/]')
+                i += 1
+            elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+                end = pattern.index(']', i + 1)
+                body = pattern[i + 1:end]
+                if body.startswith('!'):
+                    body = '^' + body[1:]
+                regex.append(f'[{body}]')
+                i = end + 1
+            else:
+                regex.append(re.escape(pattern[i]))
+                i += 1
+        
+        prefix = '' if anchored else '(?:.*/)?'
+        return re.compile(prefix + ''.join(regex)), negate, dir_only
+
+
+class SourceDiscovery:
+    """Finds candidate source files below a project root.
+    
+    Inside a git work tree ``git ls-files`` supplies the file list, which
+    already honors .gitignore. Otherwise the tree is walked with os.scandir,
+    applying .gitignore files as they are found and pruning ignored
+    directories before descending into them. In both modes the project-level
+    ``.analysisignore`` file and any extra patterns are applied on top.
+    """
+    
+    SOURCE_SUFFIXES = ('.py', '.ts', '.js')
+    SKIP_DIRS = frozenset(['node_modules', 'venv', 'env', '__pycache__', '.venv', '.git', '.angular'])
+    CONFIG_FILE = ".analysisignore"
+    
+    def __init__(self, project_root: Path, mode: str = "auto", extra_excludes: Optional[List[str]] = None):
+        self.project_root = Path(project_root)
+        self.mode = mode
+        self.used_mode = mode
+        
+        self.project_rules = []
+        config = IgnoreRules.from_file(self.project_root / self.CONFIG_FILE, "")
+        if config:
+            self.project_rules.append(config)
+        if extra_excludes:
+            self.project_rules.append(IgnoreRules("", extra_excludes))
+    
+    def discover(self) -> List[str]:
+        """Return the POSIX relative paths of all source files, sorted."""
+        files = None
+        if self.mode in ("auto", "git"):
+            files = self._git_ls_files()
+            if files is None and self.mode == "git":
+                raise RuntimeError(f"{self.project_root} is not inside a git work tree")
+        
+        if files is None:
+            self.used_mode = "walk"
+            files = self._walk()
+        else:
+            self.used_mode = "git"
+        
+        return sorted(files)
+    
+    def _git_ls_files(self) -> Optional[List[str]]:
+        # One git process: -t prefixes each entry with a status tag, and tracked
+        # files deleted from the working tree are listed again tagged "R".
+        try:
+            listed = subprocess.run(
+                ["git", "ls-files", "-z", "-t", "--cached", "--deleted", "--others", "--exclude-standard"],
+                cwd=self.project_root, capture_output=True, check=True
+            ).stdout
+        except (OSError, subprocess.CalledProcessError):
+            return None
+        
+        entries = [entry for entry in listed.decode('utf-8', 'surrogateescape').split('\0') if entry]
+        missing = {entry[2:] for entry in entries if entry[0] == "R"}
+        dir_verdicts = {}
+        files = []
+        for rel_path in dict.fromkeys(entry[2:] for entry in entries):
+            if not rel_path.endswith(self.SOURCE_SUFFIXES) or rel_path in missing:
+                continue
+            if self._inside_excluded_dir(rel_path, dir_verdicts):
+                continue
+            if self._is_ignored(self.project_rules, rel_path, is_dir=False):
+                continue
+            files.append(rel_path)
+        return files
+    
+    def is_excluded(self, rel_path: str) -> bool:
+        """Whether ``rel_path`` falls under a skipped directory or an exclude pattern.
+        
+        .gitignore is not consulted; paths reported by git are already past it.
+        """
+        if self._inside_excluded_dir(rel_path, {}):
+            return True
+        return self._is_ignored(self.project_rules, rel_path, is_dir=False)
+    
+    def _inside_excluded_dir(self, rel_path: str, dir_verdicts: Dict[str, bool]) -> bool:
+        parts = rel_path.split('/')[:-1]
+        for depth in range(1, len(parts) + 1):
+            directory = '/'.join(parts[:depth])
+            excluded = dir_verdicts.get(directory)
+            if excluded is None:
+                excluded = parts[depth - 1] in self.SKIP_DIRS or self._is_ignored(self.project_rules, directory, is_dir=True)
+                dir_verdicts[directory] = excluded
+            if excluded:
+                return True
+        return False
+    
+    def _walk(self) -> List[str]:
+        files = []
+        root_rules = list(self.project_rules)
+        gitignore = IgnoreRules.from_file(self.project_root / ".gitignore", "")
+        if gitignore:
+            root_rules.insert(0, gitignore)
+        
+        stack = [("", root_rules)]
+        while stack:
+            rel_dir, rules = stack.pop()
+            directory = self.project_root / rel_dir if rel_dir else self.project_root
+            try:
+                with os.scandir(directory) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            
+            if rel_dir:
+                nested = IgnoreRules.from_file(directory / ".gitignore", rel_dir)
+                if nested:
+                    # Nested .gitignore files apply before the project config.
+                    rules = [r for r in rules if r not in self.project_rules] + [nested] + self.project_rules
+            
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                # DirEntry caches the file type from the directory listing, so
+                # no extra stat call is made for regular files and directories.
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in self.SKIP_DIRS or self._is_ignored(rules, rel_path, is_dir=True):
+                        continue
+                    stack.append((rel_path, rules))
+                elif entry.name.endswith(self.SOURCE_SUFFIXES):
+                    if not self._is_ignored(rules, rel_path, is_dir=False):
+                        files.append(rel_path)
+        return files
+    
+    @staticmethod
+    def _is_ignored(rules: List[IgnoreRules], rel_path: str, is_dir: bool) -> bool:
+        verdict = None
+        for rule_set in rules:
+            matched = rule_set.match(rel_path, is_dir)
+            if matched is not None:
+                verdict = matched
+        return bool(verdict)
+
+
+class GitDiffScope:
+    """Source files that changed between a git revision and the working tree."""
+    
+    ANALYZED_SUFFIXES = ('.py', '.ts')
+    STATUSES = {"A": "added", "M": "modified", "T": "modified", "D": "deleted"}
+    
+    def __init__(self, project_root: Path, ref: str, discovery: SourceDiscovery):
+        self.project_root = Path(project_root)
+        self.ref = ref
+        self.discovery = discovery
+    
+    def changes(self) -> Dict[str, str]:
+        """Map each changed source file to ``added``, ``modified`` or ``deleted``.
+        
+        Committed, staged and unstaged changes all count, as do untracked
+        files. Renames are reported as a deletion plus an addition. Paths are
+        POSIX and relative to the project root.
+        """
+        diff = self._git("diff", "--name-status", "-z", "--no-renames", "--relative", self.ref, "--")
+        untracked = self._git("ls-files", "-z", "--others", "--exclude-standard")
+        
+        changes = {}
+        fields = diff.decode('utf-8', 'surrogateescape').split('\0')
+        for status, rel_path in zip(fields[0::2], fields[1::2]):
+            if status[:1] in self.STATUSES:
+                changes[rel_path] = self.STATUSES[status[:1]]
+        for rel_path in untracked.decode('utf-8', 'surrogateescape').split('\0'):
+            if rel_path:
+                changes[rel_path] = "added"
+        
+        return {
+            rel_path: status for rel_path, status in changes.items()
+            if rel_path.endswith(self.ANALYZED_SUFFIXES) and not self.discovery.is_excluded(rel_path)
+        }
+    
+    def read_before(self, paths: List[str]) -> Dict[str, bytes]:
+        """Contents of ``paths`` at the revision, read with one git process.
+        
+        Paths that do not exist there are left out.
+        """
+        if not paths:
+            return {}
+        request = "".join(f"{self.ref}:./{rel_path}\n" for rel_path in paths).encode('utf-8', 'surrogateescape')
+        output = self._git("cat-file", "--batch", input=request)
+        
+        contents = {}
+        position = 0
+        for rel_path in paths:
+            header_end = output.index(b"\n", position)
+            header = output[position:header_end]
+            position = header_end + 1
+            if header.endswith((b" missing", b" ambiguous")):
+                # "<name> missing" or "<name> ambiguous", with no content following;
+                # the name may itself contain spaces.
+                continue
+            _, object_type, size = header.rsplit(b" ", 2)
+            size = int(size)
+            if object_type == b"blob":
+                contents[rel_path] = output[position:position + size]
+            position += size + 1
+        return contents
+    
+    def _git(self, *args: str, input: Optional[bytes] = None) -> bytes:
+        try:
+            return subprocess.run(["git", *args], cwd=self.project_root, input=input,
+                                  capture_output=True, check=True).stdout
+        except OSError as e:
+            raise RuntimeError(f"cannot run git: {e}") from e
+        except subprocess.CalledProcessError as e:
+            message = e.stderr.decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"git {args[0]} against {self.ref!r} failed: {message}") from e
+
+
+def _symbol_table(kind: str, records: Optional["FileRecords"]) -> Dict[str, Tuple[str, str]]:
+    """Map each symbol of one file to ``(kind, signature)``."""
+    table = {}
+    if records is None:
+        return table
+    
+    if kind == "python":
+        for func in records.functions:
+            table[func.qualname] = (_python_kind("function", func), f"({', '.join(func.args)})")
+        for cls in records.classes:
+            table[cls.qualname] = ("class", "")
+            for method in cls.methods:
+                table[method.qualname] = (_python_kind("method", method), f"({', '.join(method.args)})")
+        return table
+    
+    service = records.service
+    if service:
+        table[service["name"]] = ("service", "")
+        for method in service["methods"]:
+            table[f"{service['name']}.{method}"] = ("method", "")
+    component = records.component
+    if component:
+        table[component["name"]] = ("component", ", ".join(component["selectors"]))
+    for func in records.functions:
+        table[func.name] = ("function", f"({','.join(func.parameters)})")
+    return table
+
+
+def _python_kind(kind: str, func: "FunctionRecord") -> str:
+    return f"async {kind}" if func.is_async else kind
+
+
+def _diff_symbols(path: str, before: Dict[str, Tuple[str, str]], after: Dict[str, Tuple[str, str]],
+                  symbols: Dict[str, List[Dict[str, str]]]) -> None:
+    """Append the symbols added, removed and changed in one file to ``symbols``."""
+    for qualname, (kind, signature) in after.items():
+        if qualname not in before:
+            symbols["added"].append({"path": path, "kind": kind, "qualname": qualname, "signature": signature})
+        elif before[qualname] != (kind, signature):
+            old_kind, old_signature = before[qualname]
+            symbols["changed"].append({"path": path, "qualname": qualname,
+                                       "before": f"{old_kind} {qualname}{old_signature}",
+                                       "after": f"{kind} {qualname}{signature}"})
+    for qualname, (kind, signature) in before.items():
+        if qualname not in after:
+            symbols["removed"].append({"path": path, "kind": kind, "qualname": qualname, "signature": signature})
+
+
+class SymbolRecord:
+    """Compact base record for a Python definition kept for the reports.
+    
+    Names and argument names are interned so repeated ones share storage.
+    The docstring is the text the extractor read from the file's own bytes,
+    so the source is never opened again after extraction, or None when there
+    is none; reports render the placeholder themselves. Records the analyzer
+    keeps have it cut to the prefix the reports show. Records are built
+    by the extractor directly; plain dicts only exist at the cache and NDJSON
+    boundary, via to_result() and from_result().
+    """
+    
+    __slots__ = ("name", "qualname", "lineno", "docstring")
+    
+    def __init__(self, name: str, qualname: str, lineno: int, docstring: Optional[str]):
+        self.name = sys.intern(name)
+        self.qualname = sys.intern(qualname)
+        self.lineno = lineno
+        self.docstring = docstring
+
+
+class FunctionRecord(SymbolRecord):
+    """A module-level or nested Python function."""
+    
+    __slots__ = ("args", "is_async")
+    type = "Function"
+    
+    def __init__(self, name: str, qualname: str, lineno: int, docstring: Optional[str],
+                 args: Tuple[str, ...], is_async: bool):
+        super().__init__(name, qualname, lineno, docstring)
+        self.args = tuple(sys.intern(arg) for arg in args)
+        self.is_async = is_async
+    
+    def __reduce__(self):
+        # Rebuild through __init__ so names are interned again in the receiving process.
+        return FunctionRecord, (self.name, self.qualname, self.lineno, self.docstring, self.args, self.is_async)
+    
+    @classmethod
+    def from_result(cls, func: Dict[str, Any]) -> "FunctionRecord":
+        return cls(func["name"], func["qualname"], func["lineno"], func["docstring"], func["args"], func["async"])
+    
+    def to_result(self) -> Dict[str, Any]:
+        return {"name": self.name, "qualname": self.qualname, "lineno": self.lineno, "args": list(self.args),
+                "docstring": self.docstring, "async": self.is_async}
+
+
+class ClassRecord(SymbolRecord):
+    """A Python class and its methods."""
+    
+    __slots__ = ("methods",)
+    
+    def __init__(self, name: str, qualname: str, lineno: int, docstring: Optional[str],
+                 methods: Tuple[FunctionRecord, ...]):
+        super().__init__(name, qualname, lineno, docstring)
+        self.methods = methods
+    
+    def __reduce__(self):
+        return ClassRecord, (self.name, self.qualname, self.lineno, self.docstring, self.methods)
+    
+    @classmethod
+    def from_result(cls, class_info: Dict[str, Any]) -> "ClassRecord":
+        methods = tuple(FunctionRecord.from_result(method) for method in class_info["methods"])
+        return cls(class_info["name"], class_info["qualname"], class_info["lineno"], class_info["docstring"],
+                   methods)
+    
+    def to_result(self) -> Dict[str, Any]:
+        return {"name": self.name, "qualname": self.qualname, "lineno": self.lineno, "docstring": self.docstring,
+                "methods": [method.to_result() for method in self.methods]}
+
+
+class TypeScriptFunctionRecord:
+    """An exported TypeScript function; these carry no args or docstring."""
+    
+    __slots__ = ("name", "parameters")
+    type = "Function"
+    args = ()
+    docstring = ""
+    
+    def __init__(self, name: str, parameters: Tuple[str, ...]):
+        self.name = sys.intern(name)
+        self.parameters = tuple(parameters)
+    
+    def __reduce__(self):
+        return TypeScriptFunctionRecord, (self.name, self.parameters)
+    
+    @classmethod
+    def from_result(cls, func: Dict[str, Any]) -> "TypeScriptFunctionRecord":
+        return cls(func["name"], func["parameters"])
+    
+    def to_result(self) -> Dict[str, Any]:
+        return {"name": self.name, "parameters": list(self.parameters), "type": self.type}
+
+
+class FileRecords:
+    """The records extracted from one file, shared with the report lists.
+    
+    This is what the extractors produce and what ProjectAnalyzer keeps per
+    file, so a file's symbols are held once no matter how many views use them.
+    """
+    
+    __slots__ = ("functions", "classes", "service", "component")
+    
+    def __init__(self, functions: tuple, classes: Tuple[ClassRecord, ...],
+                 service: Optional[Dict[str, Any]], component: Optional[Dict[str, Any]]):
+        self.functions = functions
+        self.classes = classes
+        self.service = service
+        self.component = component
+    
+    def __reduce__(self):
+        return FileRecords, (self.functions, self.classes, self.service, self.component)
+    
+    @classmethod
+    def from_result(cls, kind: str, result: Dict[str, Any]) -> "FileRecords":
+        """Build the records of one Python or TypeScript file from their to_result() form."""
+        if kind == "python":
+            return cls(tuple(FunctionRecord.from_result(f) for f in result["functions"]),
+                       tuple(ClassRecord.from_result(c) for c in result["classes"]), None, None)
+        return cls(tuple(TypeScriptFunctionRecord.from_result(f) for f in result.get("functions") or ()), (),
+                   result.get("service"), result.get("component"))
+    
+    def to_result(self, kind: str) -> Dict[str, Any]:
+        """The plain JSON-serializable form stored in the cache."""
+        if kind == "python":
+            return {"functions": [func.to_result() for func in self.functions],
+                    "classes": [cls.to_result() for cls in self.classes]}
+        result = {}
+        if self.service:
+            result["service"] = self.service
+        if self.component:
+            result["component"] = self.component
+        if self.functions:
+            result["functions"] = [func.to_result() for func in self.functions]
+        return result
+    
+    def truncate_docstrings(self, length: int) -> None:
+        """Cut every Python docstring down to its first ``length`` characters."""
+        for func in self.functions:
+            if func.docstring:
+                func.docstring = func.docstring[:length]
+        for cls in self.classes:
+            if cls.docstring:
+                cls.docstring = cls.docstring[:length]
+            for method in cls.methods:
+                if method.docstring:
+                    method.docstring = method.docstring[:length]
+
+
+class NDJSONReportWriter:
+    """Streams analysis results as newline-delimited JSON.
+    
+    Each file produces a ``module`` record followed by one record per class,
+    function, method, service or component, without any truncation. The
+    stream is flushed after every file so consumers can follow it while the
+    scan is still running.
+    """
+    
+    def __init__(self, stream: TextIO, owns_stream: bool = False):
+        self.stream = stream
+        self.owns_stream = owns_stream
+    
+    @classmethod
+    def open(cls, path: str) -> "NDJSONReportWriter":
+        """Open a writer on ``path``, or on stdout when ``path`` is ``-``."""
+        if path == "-":
+            return cls(sys.stdout)
+        output_path = Path(path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        return cls(open(output_path, 'w', encoding='utf-8'), owns_stream=True)
+    
+    def write_python_module(self, file_path: str, records: "FileRecords") -> None:
+        self._write({
+            "kind": "module",
+            "path": file_path,
+            "language": "python",
+            "functions": len(records.functions),
+            "classes": len(records.classes)
+        })
+        for func in records.functions:
+            self._write({"kind": "function", "path": file_path, **func.to_result(), "type": func.type})
+        for cls in records.classes:
+            self._write({
+                "kind": "class",
+                "path": file_path,
+                "name": cls.name,
+                "qualname": cls.qualname,
+                "lineno": cls.lineno,
+                "docstring": cls.docstring,
+                "methods": len(cls.methods)
+            })
+            for method in cls.methods:
+                self._write({"kind": "method", "path": file_path, "class": cls.qualname, **method.to_result()})
+        self.stream.flush()
+    
+    def write_typescript_module(self, file_path: str, records: "FileRecords") -> None:
+        self._write({
+            "kind": "module",
+            "path": file_path,
+            "language": "typescript",
+            "functions": len(records.functions),
+            "services": 1 if records.service else 0,
+            "components": 1 if records.component else 0
+        })
+        if records.service:
+            self._write({"kind": "service", "path": file_path, **records.service})
+        if records.component:
+            self._write({"kind": "component", "path": file_path, **records.component})
+        for func in records.functions:
+            self._write({"kind": "function", "path": file_path, **func.to_result()})
+        self.stream.flush()
+    
+    def write_error(self, file_path: str, error: str) -> None:
+        self._write({"kind": "error", "path": file_path, "message": error})
+        self.stream.flush()
+    
+    def close(self) -> None:
+        if self.owns_stream:
+            self.stream.close()
+        else:
+            self.stream.flush()
+    
+    def _write(self, record: Dict[str, Any]) -> None:
+        self.stream.write(json.dumps(record, ensure_ascii=False))
+        self.stream.write("\n")
+
+
+class CacheEntry(NamedTuple):
+    """Cached extraction result for a single file.
+    
+    The result stays encoded until records() is called, so looking an entry
+    up to compare its stat or digest costs no JSON decoding.
+    """
+    kind: str
+    mtime_ns: int
+    size: int
+    digest: str
+    encoded: str
+    
+    def records(self) -> "FileRecords":
+        return FileRecords.from_result(self.kind, json.loads(self.encoded))
+
+
+class AnalysisCache:
+    """Persistent per-file extraction cache backed by SQLite.
+    
+    Entries are keyed on the file path and validated by mtime/size first; when
+    those differ the content hash decides whether the file really changed.
+    """
+    
+    # Bump whenever the shape of extraction results changes.
+    VERSION = 7
+    
+    def __init__(self, cache_path: str):
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.cache_path))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != str(self.VERSION):
+            self.conn.execute("DROP TABLE IF EXISTS files")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(self.VERSION),))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, kind TEXT NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "size INTEGER NOT NULL, digest TEXT NOT NULL, result TEXT NOT NULL)"
+        )
+        self.conn.commit()
+    
+    def get(self, kind: str, path: str) -> Optional[CacheEntry]:
+        """Look up the entry for one file, or None if it has none."""
+        row = self.conn.execute(
+            "SELECT mtime_ns, size, digest, result FROM files WHERE path = ? AND kind = ?", (path, kind)
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(kind, *row)
+    
+    def paths(self, kind: str) -> Set[str]:
+        """Paths of every file of this kind that has an entry."""
+        return {path for (path,) in self.conn.execute("SELECT path FROM files WHERE kind = ?", (kind,))}
+    
+    @staticmethod
+    def encode(kind: str, records: "FileRecords") -> str:
+        """Serialize one file's records for store()."""
+        return json.dumps(records.to_result(kind))
+    
+    def store(self, kind: str, updates: List[Tuple[str, int, int, str, str]]) -> None:
+        """Insert or refresh entries for freshly extracted files, with results already encode()d."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO files (path, kind, mtime_ns, size, digest, result) VALUES (?, ?, ?, ?, ?, ?)",
+            [(path, kind, mtime_ns, size, digest, result) for path, mtime_ns, size, digest, result in updates]
+        )
+        self.conn.commit()
+    
+    def remove(self, paths: List[str]) -> None:
+        """Drop the entries of the given files."""
+        self.conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in paths])
+        self.conn.commit()
+    
+    def prune(self, kind: str, live_paths: List[str]) -> None:
+        """Drop entries for files of this kind that no longer exist."""
+        live = set(live_paths)
+        stale = [
+            (path,) for (path,) in self.conn.execute("SELECT path FROM files WHERE kind = ?", (kind,))
+            if path not in live
+        ]
+        if stale:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", stale)
+            self.conn.commit()
+    
+    def close(self) -> None:
+        self.conn.close()
+
+
+def _write_atomic(output_path: Path, text: str) -> None:
+    """Write ``text`` to ``output_path`` via a temporary file and rename.
+    
+    Readers never observe a partially written report.
+    """
+    with _atomic_writer(output_path) as f:
+        f.write(text)
+
+
+@contextlib.contextmanager
+def _atomic_writer(output_path: Path) -> Iterator[TextIO]:
+    """Like _write_atomic, for output that is written a piece at a time."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{output_path.name}.", dir=output_path.parent)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            yield f
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class SymbolIndex:
+    """Persistent, queryable index of the symbols found by the analyzer.
+    
+    Symbols live in an SQLite table with B-tree indexes on name, qualified
+    name, path, kind and component selector, plus an FTS5 table over names
+    and docstrings when the SQLite build supports it. Lookups never touch
+    the source files.
+    
+    The index is written file by file as the analyzer produces results:
+    begin() opens a transaction (``reset`` starts from an empty index),
+    replace_file() and remove_file() update one file's rows, and commit()
+    publishes the lot.
+    """
+    
+    VERSION = 2
+    COLUMNS = ("kind", "name", "qualname", "parent", "path", "lineno", "language", "signature", "docstring")
+    # Bound parameters per "IN (...)" lookup, well under SQLite's limit.
+    LOOKUP_BATCH = 500
+    
+    def __init__(self, index_path: str):
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Transactions are managed explicitly by begin()/commit()/rollback().
+        self.conn = sqlite3.connect(str(self.index_path), isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.has_fts = self._table_exists("symbols_fts")
+        self._next_id = 1
+    
+    def begin(self, reset: bool = False) -> None:
+        """Start a batch of updates; with ``reset`` the index is emptied first."""
+        self.conn.execute("BEGIN")
+        if reset or not self._table_exists("symbols"):
+            self._create_schema()
+        self._next_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM symbols").fetchone()[0]
+    
+    def commit(self) -> int:
+        """Publish the updates made since begin(); returns the number of symbols."""
+        count = self.conn.execute("SELECT COUNT(*) FROM symbols").fetchone()[0]
+        self.conn.execute("COMMIT")
+        return count
+    
+    def rollback(self) -> None:
+        """Discard the updates made since begin(), keeping the index as it was."""
+        self.conn.execute("ROLLBACK")
+        self.has_fts = self._table_exists("symbols_fts")
+    
+    def replace_file(self, kind: str, file_path: str, records: "FileRecords") -> None:
+        """Replace the rows of one file with its current records."""
+        self.remove_file(file_path)
+        rows = []
+        selectors = []
+        if kind == "python":
+            self._python_rows(file_path, records, rows)
+        else:
+            self._typescript_rows(file_path, records, rows, selectors)
+        if not rows:
+            return
+        
+        first_id = self._next_id
+        self._next_id += len(rows)
+        self.conn.executemany(
+            f"INSERT INTO symbols (id, {', '.join(self.COLUMNS)}) VALUES (?{', ?' * len(self.COLUMNS)})",
+            [(first_id + position, *row) for position, row in enumerate(rows)]
+        )
+        self.conn.executemany("INSERT INTO selectors (symbol_id, selector) VALUES (?, ?)",
+                              [(first_id + position, selector) for position, selector in selectors])
+        if self.has_fts:
+            self.conn.executemany(
+                "INSERT INTO symbols_fts (rowid, name, qualname, docstring) VALUES (?, ?, ?, ?)",
+                [(first_id + position, row[1], row[2], row[8]) for position, row in enumerate(rows)]
+            )
+    
+    def remove_file(self, file_path: str) -> None:
+        """Drop every row of one file."""
+        ids = [symbol_id for (symbol_id,) in self.conn.execute("SELECT id FROM symbols WHERE path = ?", (file_path,))]
+        if not ids:
+            return
+        for start in range(0, len(ids), self.LOOKUP_BATCH):
+            batch = ids[start:start + self.LOOKUP_BATCH]
+            placeholders = ", ".join("?" * len(batch))
+            self.conn.execute(f"DELETE FROM selectors WHERE symbol_id IN ({placeholders})", batch)
+            if self.has_fts:
+                self.conn.execute(f"DELETE FROM symbols_fts WHERE rowid IN ({placeholders})", batch)
+        self.conn.execute("DELETE FROM symbols WHERE path = ?", (file_path,))
+    
+    def find(self, name: Optional[str] = None, path: Optional[str] = None, kind: Optional[str] = None,
+             selector: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Look symbols up by name/qualified name, file, kind and component selector.
+        
+        ``name`` and ``path`` accept ``*``/``?`` glob wildcards; without them
+        the match is exact and uses the indexes.
+        """
+        clauses = []
+        params = []
+        if name:
+            op = "GLOB" if _is_glob(name) else "="
+            clauses.append(f"(s.name {op} ? OR s.qualname {op} ?)")
+            params.extend([name, name])
+        if path:
+            clauses.append(f"s.path {'GLOB' if _is_glob(path) else '='} ?")
+            params.append(path)
+        if kind:
+            clauses.append("s.kind = ?")
+            params.append(kind)
+        if selector:
+            clauses.append(
+                f"s.id IN (SELECT symbol_id FROM selectors WHERE selector {'GLOB' if _is_glob(selector) else '='} ?)"
+            )
+            params.append(selector)
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._select(f"SELECT s.* FROM symbols s {where} ORDER BY s.path, s.lineno LIMIT ?", params + [limit])
+    
+    def search(self, text: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Full-text search over names, qualified names and docstrings.
+        
+        Every whitespace-separated term must match; a trailing ``*`` makes a
+        term a prefix. Other characters are taken literally.
+        """
+        query = _fts_query(text)
+        if not query:
+            return []
+        if self.has_fts:
+            try:
+                return self._select(
+                    "SELECT s.* FROM symbols_fts f JOIN symbols s ON s.id = f.rowid "
+                    "WHERE symbols_fts MATCH ? ORDER BY f.rank LIMIT ?",
+                    [query, limit]
+                )
+            except sqlite3.OperationalError:
+                # A term FTS5 still rejects; fall back to LIKE.
+                pass
+        pattern = f"%{text.strip()}%"
+        return self._select(
+            "SELECT s.* FROM symbols s WHERE s.name LIKE ? OR s.qualname LIKE ? OR s.docstring LIKE ? "
+            "ORDER BY s.path, s.lineno LIMIT ?",
+            [pattern, pattern, pattern, limit]
+        )
+    
+    def close(self) -> None:
+        self.conn.close()
+    
+    def _create_schema(self) -> None:
+        for statement in (
+            "DROP TABLE IF EXISTS symbols_fts",
+            "DROP TABLE IF EXISTS selectors",
+            "DROP TABLE IF EXISTS symbols",
+            "DROP TABLE IF EXISTS meta",
+            "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+            "CREATE TABLE symbols ("
+            "id INTEGER PRIMARY KEY, kind TEXT NOT NULL, name TEXT NOT NULL, qualname TEXT NOT NULL, "
+            "parent TEXT, path TEXT NOT NULL, lineno INTEGER, language TEXT NOT NULL, "
+            "signature TEXT, docstring TEXT)",
+            "CREATE TABLE selectors (symbol_id INTEGER NOT NULL REFERENCES symbols(id), selector TEXT NOT NULL)",
+            "CREATE INDEX symbols_name ON symbols(name)",
+            "CREATE INDEX symbols_qualname ON symbols(qualname)",
+            "CREATE INDEX symbols_path ON symbols(path)",
+            "CREATE INDEX symbols_kind ON symbols(kind)",
+            "CREATE INDEX selectors_selector ON selectors(selector)",
+            "CREATE INDEX selectors_symbol ON selectors(symbol_id)",
+        ):
+            self.conn.execute(statement)
+        self.conn.execute("INSERT INTO meta (key, value) VALUES ('version', ?)", (str(self.VERSION),))
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE symbols_fts USING fts5(name, qualname, docstring)")
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; search() falls back to LIKE.
+            self.has_fts = False
+    
+    def _select(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        if not self._table_exists("symbols"):
+            return []
+        records = []
+        by_id = {}
+        for row in self.conn.execute(sql, params):
+            record = dict(row)
+            record["selectors"] = []
+            by_id[record.pop("id")] = record
+            records.append(record)
+        
+        # One query per result set for the selectors, instead of one per row.
+        ids = list(by_id)
+        for start in range(0, len(ids), self.LOOKUP_BATCH):
+            batch = ids[start:start + self.LOOKUP_BATCH]
+            for symbol_id, selector in self.conn.execute(
+                f"SELECT symbol_id, selector FROM selectors WHERE symbol_id IN ({', '.join('?' * len(batch))}) "
+                "ORDER BY rowid", batch
+            ):
+                by_id[symbol_id]["selectors"].append(selector)
+        return records
+    
+    def _table_exists(self, name: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?", (name,)
+        ).fetchone() is not None
+    
+    @staticmethod
+    def _python_rows(file_path: str, records: "FileRecords", rows: List[Tuple]) -> None:
+        for func in records.functions:
+            rows.append(("function", func.name, func.qualname, None, file_path,
+                         func.lineno, "python", ", ".join(func.args), func.docstring))
+        for cls in records.classes:
+            rows.append(("class", cls.name, cls.qualname, None, file_path,
+                         cls.lineno, "python", None, cls.docstring))
+            for method in cls.methods:
+                rows.append(("method", method.name, method.qualname, cls.qualname, file_path,
+                             method.lineno, "python", ", ".join(method.args), method.docstring))
+    
+    @staticmethod
+    def _typescript_rows(file_path: str, records: "FileRecords", rows: List[Tuple], selectors: List[Tuple]) -> None:
+        """Append rows, and ``(row position, selector)`` pairs for the component's selectors."""
+        service = records.service
+        if service:
+            rows.append(("service", service["name"], service["name"], None, file_path,
+                         None, "typescript", None, None))
+            for method in service["methods"]:
+                rows.append(("method", method, f"{service['name']}.{method}", service["name"],
+                             file_path, None, "typescript", None, None))
+        component = records.component
+        if component:
+            rows.append(("component", component["name"], component["name"], None, file_path,
+                         None, "typescript", None, None))
+            selectors.extend((len(rows) - 1, selector) for selector in component["selectors"])
+        for func in records.functions:
+            rows.append(("function", func.name, func.name, None, file_path,
+                         None, "typescript", ",".join(func.parameters), None))
+
+
+def _report_docstring(record: Any) -> str:
+    """Docstring text for the reports, with a placeholder for symbols without one."""
+    return "No documentation" if record.docstring is None else record.docstring
+
+
+def _is_glob(pattern: str) -> bool:
+    return any(char in pattern for char in "*?[")
+
+
+def _fts_query(text: str) -> str:
+    """Turn user text into an FTS5 query: each term a quoted phrase, ``term*`` a prefix."""
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*") and len(term) > 1
+        term = term.rstrip("*") if prefix else term
+        terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+class ExtractionOutcome(NamedTuple):
+    """What a worker reports back for one file."""
+    file_path: str
+    result: Optional["FileRecords"]
+    error: Optional[str]
+    digest: Optional[str]
+    wall_s: float
+    cpu_s: float
+    bytes_read: int
+
+
+def _extract_file(task: Tuple[str, str, str, Optional[str]]) -> ExtractionOutcome:
+    """Read and extract a single source file.
+    
+    Module-level so it can be pickled and run in a worker process. Errors are
+    returned rather than raised so one bad file does not abort the pool. When
+    the content hash equals ``known_digest`` the file is not parsed and the
+    result is ``None``.
+    """
+    project_root, kind, file_path, known_digest = task
+    cpu_start = time.process_time()
+    source = _read_source(project_root, file_path)
+    wall_start = time.perf_counter()
+    if source.error:
+        result, error, digest = None, source.error, None
+    else:
+        result, error, digest = _parse_source(kind, file_path, source.data, known_digest)
+    
+    return ExtractionOutcome(file_path, result, error, digest, source.read_s + time.perf_counter() - wall_start,
+                             time.process_time() - cpu_start, len(source.data))
+
+
+class LoadedSource(NamedTuple):
+    """Raw bytes of one file, or why they could not be read."""
+    file_path: str
+    data: bytes
+    error: Optional[str]
+    read_s: float
+
+
+def _read_source(project_root: str, file_path: str) -> LoadedSource:
+    start = time.perf_counter()
+    try:
+        with open(Path(project_root) / file_path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return LoadedSource(file_path, b"", f"cannot read file: {e.strerror or e}", time.perf_counter() - start)
+    return LoadedSource(file_path, data, None, time.perf_counter() - start)
+
+
+def _parse_source(kind: str, file_path: str, data: bytes,
+                  known_digest: Optional[str]) -> Tuple[Optional["FileRecords"], Optional[str], str]:
+    """Decode and extract one file's bytes; returns ``(result, error, digest)``."""
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == known_digest:
+        return None, None, digest
+    
+    try:
+        content = data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        return None, f"not valid UTF-8 at byte {e.start}: {e.reason}", digest
+    content = content.replace('\r\n', '\n').replace('\r', '\n')
+    
+    try:
+        if kind == "python":
+            result = _extract_python_components(ast.parse(content))
+        else:
+            result = FileRecords.from_result(kind, _extract_typescript_components(content, file_path))
+    except SyntaxError as e:
+        where = f" at line {e.lineno}" if e.lineno else ""
+        return None, f"syntax error{where}: {e.msg}", digest
+    except (ValueError, RecursionError, MemoryError) as e:
+        # ast.parse() rejects NUL bytes with ValueError and gives up on very deep nesting.
+        return None, f"cannot parse: {type(e).__name__}: {e}", digest
+    return result, None, digest
+
+
+class SourceLoader:
+    """Reads files on a thread pool ahead of the code consuming them.
+    
+    ``load()`` yields files in request order while up to ``read_ahead`` later
+    files are already being read. Reads are also held back once the files
+    read but not yet consumed add up to ``max_bytes``, so memory stays bounded
+    however far the consumer falls behind; a single file larger than the cap
+    is still read on its own.
+    """
+    
+    def __init__(self, project_root: Path, read_ahead: int = 32, max_bytes: int = 64 * 1024 * 1024,
+                 threads: Optional[int] = None):
+        self.project_root = str(project_root)
+        self.read_ahead = max(1, read_ahead)
+        self.max_bytes = max_bytes
+        self.threads = threads or min(self.read_ahead, 8)
+    
+    def load(self, files: Iterable[Tuple[str, int]]) -> Iterator[LoadedSource]:
+        """Yield a LoadedSource for each ``(path, expected size)`` in ``files``."""
+        pending = deque()
+        bytes_in_flight = 0
+        requests = iter(files)
+        upcoming = next(requests, None)
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            while upcoming is not None or pending:
+                while upcoming is not None and len(pending) < self.read_ahead and (
+                        not pending or bytes_in_flight + upcoming[1] <= self.max_bytes):
+                    file_path, size = upcoming
+                    pending.append((pool.submit(_read_source, self.project_root, file_path), size))
+                    bytes_in_flight += size
+                    upcoming = next(requests, None)
+                
+                future, size = pending.popleft()
+                yield future.result()
+                bytes_in_flight -= size
+
+
+class PythonSymbolExtractor(ast.NodeVisitor):
+    """Collects functions and classes from a module in a single traversal.
+    
+    Only statement bodies are descended into, since definitions cannot appear
+    inside expressions. Methods are recorded on their class only, nested
+    classes are recorded alongside top-level ones, and every record carries a
+    ``__qualname__``-style qualified name.
+    """
+    
+    _BODY_FIELDS = ("body", "orelse", "finalbody", "handlers", "cases")
+    
+    def __init__(self):
+        self.functions = []
+        self.classes = []
+        # (qualname, the class's method list or None) for each enclosing definition
+        self._scope = []
+    
+    def generic_visit(self, node: ast.AST) -> None:
+        for field in self._BODY_FIELDS:
+            for child in getattr(node, field, None) or ():
+                self.visit(child)
+    
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self._visit_function(node, is_async=False)
+    
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        self._visit_function(node, is_async=True)
+    
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        qualname = self._qualname(node.name)
+        methods = []
+        # Claim the slot first so nested classes are listed after this one.
+        position = len(self.classes)
+        self.classes.append(None)
+        
+        self._scope.append((qualname, methods))
+        self.generic_visit(node)
+        self._scope.pop()
+        
+        self.classes[position] = ClassRecord(node.name, qualname, node.lineno,
+                                             ast.get_docstring(node), tuple(methods))
+    
+    def _visit_function(self, node: ast.AST, is_async: bool) -> None:
+        qualname = self._qualname(node.name)
+        enclosing_methods = self._scope[-1][1] if self._scope else None
+        
+        record = FunctionRecord(node.name, qualname, node.lineno, ast.get_docstring(node),
+                                [arg.arg for arg in node.args.args], is_async)
+        if enclosing_methods is not None:
+            enclosing_methods.append(record)
+        else:
+            self.functions.append(record)
+        
+        self._scope.append((f"{qualname}.<locals>", None))
+        self.generic_visit(node)
+        self._scope.pop()
+    
+    def _qualname(self, name: str) -> str:
+        return f"{self._scope[-1][0]}.{name}" if self._scope else name
+
+
+def _extract_python_components(tree: ast.AST) -> "FileRecords":
+    """Extract functions and classes from Python AST."""
+    extractor = PythonSymbolExtractor()
+    extractor.visit(tree)
+    return FileRecords(tuple(extractor.functions), tuple(extractor.classes), None, None)
+
+
+# A single alternation scanned left to right with finditer. Every branch
+# starts with a literal character, so the regex engine skips plain code
+# without trying each branch, and every repetition is either bounded or
+# cannot overlap the next token, so the scan is linear even on minified or
+# unterminated input. Declarations are only recognized at the start of a
+# line; strings and comments are consumed whole so their contents never
+# produce matches.
+_TS_TOKEN = re.compile(r"""
+    //[^\n]*
+  | /\*[\s\S]*?(?:\*/|\Z)
+  | '[^'\\\n]*(?:\\.[^'\\\n]*)*'?
+  | "[^"\\\n]*(?:\\.[^"\\\n]*)*"?
+  | `[^`\\]*(?:\\[\s\S][^`\\]*)*`?
+  | @(?P<decorator>Component|Injectable)\b
+  | \n(?P<indent>[ \t]*)(?:
+        export\s+(?:default\s+)?(?:abstract\s+)?class\s+(?P<class_name>[A-Za-z_$][\w$]*)
+      | export\s+(?:default\s+)?(?:async\s+)?function\s*\*?\s*(?P<function>(?P<function_name>[A-Za-z_$][\w$]*)
+            \s*(?:<[^>\n]{0,256}>)?\s*\((?P<params>[^)]{0,4096})\))
+      | (?:(?:public|private|protected|static|async|override|readonly|abstract)[ \t]+)*
+            (?P<member>[A-Za-z_$][\w$]*)[ \t]*(?:<[^>\n]{0,256}>)?[ \t]*\(
+    )
+""", re.VERBOSE)
+
+# Component metadata keys, scanned only over the text between @Component and
+# its class, so they are found wherever the decorator puts them, one-line
+# decorators included.
+_TS_COMPONENT_KEY = re.compile(r"""
+    //[^\n]*
+  | /\*[\s\S]*?(?:\*/|\Z)
+  | (?<![\w$.])(?:
+        selector\s*:\s*(?P<selector>'[^'\n]{0,1024}'|"[^"\n]{0,1024}")
+      | templateUrl\s*:\s*(?P<template_url>'[^'\n]{0,1024}'|"[^"\n]{0,1024}")
+      | styleUrls?\s*:\s*(?P<style_urls>\[[^\]]{0,4096}\]|'[^'\n]{0,1024}'|"[^"\n]{0,1024}")
+    )
+  | '[^'\\\n]*(?:\\.[^'\\\n]*)*'?
+  | "[^"\\\n]*(?:\\.[^"\\\n]*)*"?
+  | `[^`\\]*(?:\\[\s\S][^`\\]*)*`?
+""", re.VERBOSE)
+
+_TS_QUOTED = re.compile(r"""'([^'\n]*)'|"([^"\n]*)\"""")
+
+_TS_NOT_METHODS = frozenset(["constructor", "if", "for", "while", "switch", "catch", "return", "function", "super"])
+
+
+def _extract_typescript_components(content: str, file_path: str) -> Dict[str, Any]:
+    """Extract services, components and exported functions in one pass over a TypeScript file.
+    
+    The first exported class is the file's primary class. It is a component
+    or service according to its @Component/@Injectable decorator, falling
+    back to the ``.component.ts``/``.service.ts`` file name. Its methods are
+    the member declarations at the indentation of the first member of the
+    class body.
+    """
+    class_name = None
+    class_kind = None
+    pending_decorator = None
+    decorator_end = 0
+    in_class = False
+    member_indent = None
+    
+    methods = []
+    functions = []
+    selectors = []
+    template_urls = []
+    style_urls = []
+    
+    # The leading newline lets declarations on the first line match too.
+    text = "\n" + content
+    for match in _TS_TOKEN.finditer(text):
+        group = match.lastgroup
+        if group is None:
+            continue
+        
+        if group == "member":
+            if in_class:
+                indent = match.group("indent")
+                # The first member (usually the constructor) fixes the body indentation.
+                if member_indent is None:
+                    member_indent = indent
+                if indent == member_indent and match.group("member") not in _TS_NOT_METHODS:
+                    methods.append(match.group("member"))
+        elif group == "decorator":
+            pending_decorator = match.group("decorator")
+            decorator_end = match.end()
+        elif group == "class_name":
+            if class_name is None:
+                class_name = match.group("class_name")
+                class_kind = pending_decorator
+                in_class = True
+                if class_kind == "Component":
+                    _collect_component_keys(text, decorator_end, match.start(),
+                                            selectors, template_urls, style_urls)
+            else:
+                in_class = False
+            pending_decorator = None
+        elif group == "function":
+            # A top-level function means the primary class body has ended.
+            if not match.group("indent"):
+                in_class = False
+            functions.append({
+                "name": match.group("function_name"),
+                "parameters": match.group("params").split(','),
+                "type": "Function"
+            })
+    
+    if class_kind is None and class_name:
+        if 'service.ts' in file_path:
+            class_kind = "Injectable"
+        elif 'component.ts' in file_path:
+            class_kind = "Component"
+    
+    result = {}
+    if class_kind == "Injectable":
+        result["service"] = {
+            "name": class_name,
+            "methods": list(dict.fromkeys(methods)),
+            "file": file_path
+        }
+    elif class_kind == "Component":
+        result["component"] = {
+            "name": class_name,
+            "file": file_path,
+            "selectors": selectors,
+            "templateUrl": template_urls,
+            "styleUrls": style_urls
+        }
+    if functions:
+        result["functions"] = functions
+    return result
+
+
+def _collect_component_keys(text: str, start: int, end: int, selectors: List[str],
+                            template_urls: List[str], style_urls: List[str]) -> None:
+    """Collect selector/templateUrl/styleUrls values from the @Component arguments in ``text[start:end]``."""
+    for match in _TS_COMPONENT_KEY.finditer(text, start, end):
+        group = match.lastgroup
+        if group == "selector":
+            selectors.append(match.group("selector")[1:-1])
+        elif group == "template_url":
+            template_urls.append(match.group("template_url")[1:-1])
+        elif group == "style_urls":
+            value = match.group("style_urls")
+            if value.startswith('['):
+                style_urls.extend(single or double for single, double in _TS_QUOTED.findall(value))
+            else:
+                style_urls.append(value[1:-1])
+
+
 def main():
     """Main entry point."""
-    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "query":
+        _query_main(sys.argv[2:])
+        return
+    
+    parser = argparse.ArgumentParser(
+        description="Analyze the World Crop Monitor codebase.",
+        epilog="Run 'analyze_project.py query --help' to look up symbols in an existing index."
+    )
+    parser.add_argument("project_root", nargs="?", default=".", help="Project root to analyze")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of worker processes for parsing (0 = one per CPU)")
+    parser.add_argument("--read-ahead", type=int, default=32, metavar="FILES",
+                        help="Files read ahead of the parser in serial runs (default: 32)")
+    parser.add_argument("--read-ahead-mb", type=int, default=64, metavar="MB",
+                        help="Cap on bytes read but not yet parsed in serial runs (default: 64)")
+    parser.add_argument("--cache", default=None,
+                        help="Path of the incremental analysis cache (default: PROJECT_ANALYSIS.cache.db in the project root)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every file and do not touch the cache")
+    parser.add_argument("--ndjson", metavar="PATH", default=None,
+                        help="Stream every module, class and function as NDJSON to PATH ('-' for stdout)")
+    parser.add_argument("--ndjson-only", action="store_true",
+                        help="With --ndjson, skip the Markdown/JSON reports and keep no records in memory")
+    parser.add_argument("--discovery", choices=["auto", "git", "walk"], default="auto",
+                        help="File discovery strategy: git ls-files, a directory walk, or git when available")
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="Extra gitignore-style pattern to exclude (repeatable)")
+    parser.add_argument("--since", metavar="REF", default=None,
+                        help="Only analyze files changed since git revision REF, reuse cached results for the "
+                             "rest and write the symbol changes to PROJECT_ANALYSIS.diff.json")
+    parser.add_argument("--watch", action="store_true",
+                        help="Stay resident and refresh the reports whenever source files change")
+    parser.add_argument("--watch-interval", type=float, default=1.0, metavar="SECONDS",
+                        help="Polling interval for --watch (default: 1.0)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Record per-phase and per-file timings in PROJECT_ANALYSIS.profile.json")
+    parser.add_argument("--profile-top", type=int, default=20, metavar="N",
+                        help="Number of slowest files to list in the profile (default: 20)")
+    parser.add_argument("--profile-dump", action="append", choices=["cprofile", "tracemalloc"], default=[],
+                        help="With --profile, also dump cProfile stats (.prof) or a tracemalloc snapshot (repeatable)")
+    parser.add_argument("--index", default=None,
+                        help="Path of the symbol index (default: PROJECT_ANALYSIS.index.db in the project root)")
+    parser.add_argument("--no-index", action="store_true", help="Do not build the symbol index")
+    parser.add_argument("--sections", type=_section_list, default=None, metavar="NAMES",
+                        help="Comma-separated report sections to render "
+                             f"({', '.join(ProjectAnalyzer.REPORT_SECTIONS)}; default: all)")
+    parser.add_argument("--diff-report", action="store_true",
+                        help="Update the existing PROJECT_ANALYSIS.md in place, rewriting only changed sections")
+    args = parser.parse_args()
+    
+    if args.profile_dump and not args.profile:
+        parser.error("--profile-dump requires --profile")
+    if args.profile and args.watch:
+        parser.error("--profile cannot be combined with --watch")
+    if args.ndjson_only and not args.ndjson:
+        parser.error("--ndjson-only requires --ndjson")
+    if args.watch and args.ndjson_only:
+        parser.error("--watch needs the Markdown/JSON reports and cannot be combined with --ndjson-only")
+    if args.since and (args.watch or args.ndjson_only):
+        parser.error("--since cannot be combined with --watch or --ndjson-only")
     
-    project_root = sys.argv[1] if len(sys.argv) > 1 else "."
+    project_root = args.project_root
     
+    # The NDJSON stream owns stdout when writing to '-'; progress goes to stderr.
+    record_sink = NDJSONReportWriter.open(args.ndjson) if args.ndjson else None
+    progress = contextlib.redirect_stdout(sys.stderr) if args.ndjson == "-" else contextlib.nullcontext()
+    
+    with progress:
+        _run_analysis(args, project_root, record_sink)
+    
+    if record_sink:
+        record_sink.close()
+
+
+def _run_analysis(args: argparse.Namespace, project_root: str, record_sink: Optional[NDJSONReportWriter]) -> None:
+    """Run the analysis phases and write the requested reports."""
     print("🚀 Starting Project Analysis...\n")
     
-    analyzer = ProjectAnalyzer(project_root)
-    analyzer.discover_files()
-    analyzer.analyze_tech_stack()
-    analyzer.analyze_python_files()
-    analyzer.analyze_typescript_files()
+    cache = None
+    if not args.no_cache:
+        cache = AnalysisCache(args.cache or f"{project_root}/PROJECT_ANALYSIS.cache.db")
+    
+    profiler = None
+    if args.profile:
+        profiler = AnalysisProfiler(top_n=args.profile_top, use_cprofile="cprofile" in args.profile_dump,
+                                    use_tracemalloc="tracemalloc" in args.profile_dump)
     
-    # Generate reports
-    text_report = analyzer.generate_report(f"{project_root}/PROJECT_ANALYSIS.md")
-    json_report = analyzer.generate_json_report(f"{project_root}/PROJECT_ANALYSIS.json")
+    def phase(name: str):
+        return profiler.phase(name) if profiler else contextlib.nullcontext()
+    
+    index = None
+    if not args.no_index and not args.ndjson_only:
+        index = SymbolIndex(args.index or f"{project_root}/PROJECT_ANALYSIS.index.db")
+    
+    analyzer = ProjectAnalyzer(project_root, jobs=args.jobs, cache=cache,
+                               record_sink=record_sink, retain_records=not args.ndjson_only,
+                               discovery_mode=args.discovery, excludes=args.exclude, profiler=profiler,
+                               read_ahead=args.read_ahead, read_ahead_bytes=args.read_ahead_mb * 1024 * 1024,
+                               index=index)
+    
+    if args.watch:
+        watcher = AnalysisWatcher(analyzer, f"{project_root}/PROJECT_ANALYSIS.md",
+                                  f"{project_root}/PROJECT_ANALYSIS.json", interval=args.watch_interval,
+                                  sections=args.sections)
+        try:
+            watcher.run()
+        finally:
+            if cache:
+                cache.close()
+            if index:
+                index.close()
+        return
+    
+    if profiler:
+        profiler.start()
+    
+    with phase("discover_files"):
+        analyzer.discover_files()
+    with phase("analyze_tech_stack"):
+        analyzer.analyze_tech_stack()
+    if index:
+        index.begin(reset=True)
+    symbol_diff = None
+    partial = False
+    if args.since:
+        with phase("analyze_since"):
+            symbol_diff = analyzer.analyze_since(args.since)
+        _write_atomic(Path(f"{project_root}/PROJECT_ANALYSIS.diff.json"), json.dumps(symbol_diff, indent=2))
+        _print_symbol_diff(symbol_diff)
+        if symbol_diff["unanalyzed_files"]:
+            # Records only cover the changed files; publishing them would replace
+            # the whole-tree reports and index with partial ones.
+            print("\n⚠ The cache does not cover the unchanged files, so PROJECT_ANALYSIS.md, "
+                  "PROJECT_ANALYSIS.json and the index are left as they were. "
+                  "Run a full analysis once to fill the cache.")
+            if index:
+                index.rollback()
+                index.close()
+                index = None
+            partial = True
+    else:
+        with phase("analyze_python_files"):
+            analyzer.analyze_python_files()
+        with phase("analyze_typescript_files"):
+            analyzer.analyze_typescript_files()
+    
+    if cache:
+        cache.close()
+    
+    if index:
+        with phase("build_index"):
+            symbol_count = index.commit()
+        index.close()
+        print(f"\n🔎 Indexed {symbol_count} symbols")
+    
+    if not args.ndjson_only and not partial:
+        # Generate reports
+        with phase("generate_report"):
+            text_report = analyzer.generate_report(f"{project_root}/PROJECT_ANALYSIS.md",
+                                                   sections=args.sections, diff=args.diff_report)
+        with phase("generate_json_report"):
+            json_report = analyzer.generate_json_report(f"{project_root}/PROJECT_ANALYSIS.json")
+    
+    if profiler:
+        profiler.stop()
+        profiler.write(f"{project_root}/PROJECT_ANALYSIS.profile.json")
+        print("\n⏱  Phase timings:")
+        for entry in profiler.phases:
+            print(f"  • {entry['phase']}: {entry['wall_s']:.3f}s wall, {entry['cpu_s']:.3f}s CPU")
+    
+    if args.ndjson_only or partial:
+        print("\n✅ Analysis Complete!")
+        print()
+        if args.ndjson:
+            print(f"  🧾 NDJSON: {args.ndjson}")
+        if partial:
+            print(f"  🔀 Symbol changes: PROJECT_ANALYSIS.diff.json")
+        if profiler:
+            print(f"  ⏱  Profile: PROJECT_ANALYSIS.profile.json")
+        return
     
     print("\n" + text_report)
     print("\n✅ Analysis Complete!")
     print(f"\nReports generated:")
     print(f"  📄 Markdown: PROJECT_ANALYSIS.md")
     print(f"  📊 JSON: PROJECT_ANALYSIS.json")
+    if args.ndjson:
+        print(f"  🧾 NDJSON: {args.ndjson}")
+    if symbol_diff:
+        print(f"  🔀 Symbol changes: PROJECT_ANALYSIS.diff.json")
+    if index:
+        print(f"  🔎 Index: {index.index_path.name}")
+    if profiler:
+        print(f"  ⏱  Profile: PROJECT_ANALYSIS.profile.json")
+
+
+def _print_symbol_diff(symbol_diff: Dict[str, Any]) -> None:
+    symbols = symbol_diff["symbols"]
+    print(f"\n🔀 Symbol changes since {symbol_diff['ref']}: {len(symbols['added'])} added, "
+          f"{len(symbols['removed'])} removed, {len(symbols['changed'])} changed")
+    for entry in symbols["added"]:
+        print(f"  + {entry['kind']} {entry['qualname']}{entry['signature']}  ({entry['path']})")
+    for entry in symbols["removed"]:
+        print(f"  - {entry['kind']} {entry['qualname']}{entry['signature']}  ({entry['path']})")
+    for entry in symbols["changed"]:
+        print(f"  ~ {entry['before']} → {entry['after']}  ({entry['path']})")
+    for entry in symbol_diff["errors"]:
+        print(f"  ⚠ {entry['path']} ({entry['revision']}): {entry['message']}")
+
+
+def _section_list(value: str) -> List[str]:
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ProjectAnalyzer.REPORT_SECTIONS]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(
+            f"unknown section(s) {', '.join(unknown) or value!r}; "
+            f"choose from {', '.join(ProjectAnalyzer.REPORT_SECTIONS)}"
+        )
+    return names
+
+
+def _query_main(argv: List[str]) -> None:
+    """Entry point for the ``query`` subcommand."""
+    parser = argparse.ArgumentParser(prog="analyze_project.py query",
+                                     description="Look up symbols in the index built by a previous analysis run.")
+    parser.add_argument("project_root", nargs="?", default=".", help="Project root that was analyzed")
+    parser.add_argument("--index", default=None,
+                        help="Path of the symbol index (default: PROJECT_ANALYSIS.index.db in the project root)")
+    parser.add_argument("-n", "--name", help="Symbol name or qualified name (glob wildcards allowed)")
+    parser.add_argument("-f", "--file", help="Source file path relative to the project root (glob wildcards allowed)")
+    parser.add_argument("-k", "--kind", choices=["function", "method", "class", "service", "component"],
+                        help="Restrict to one kind of symbol")
+    parser.add_argument("-s", "--selector", help="Angular component selector (glob wildcards allowed)")
+    parser.add_argument("-q", "--search", help="Full-text search over names and docstrings")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum number of results (default: 50)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args(argv)
+    
+    index_path = Path(args.index or f"{args.project_root}/PROJECT_ANALYSIS.index.db")
+    if not index_path.exists():
+        parser.error(f"no index at {index_path}; run analyze_project.py on the project first")
+    
+    index = SymbolIndex(str(index_path))
+    try:
+        if args.search:
+            results = index.search(args.search, limit=args.limit)
+        else:
+            results = index.find(name=args.name, path=args.file, kind=args.kind,
+                                 selector=args.selector, limit=args.limit)
+    finally:
+        index.close()
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    
+    for record in results:
+        location = f"{record['path']}:{record['lineno']}" if record["lineno"] else record["path"]
+        signature = f"({record['signature']})" if record["signature"] is not None else ""
+        extra = f"  [{', '.join(record['selectors'])}]" if record["selectors"] else ""
+        print(f"{record['kind']:<10} {record['qualname']}{signature}  {location}{extra}")
+    if not results:
+        print("No matching symbols")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,231 @@
+// Streaming export of tabular data
+//
+// Rows come from a (lazy) iterable and are encoded chunk by chunk, so memory
+// use does not grow with the number of rows and the client receives the
+// first bytes as soon as the first chunk is encoded. Supported formats:
+//   csv    - header line plus one line per row
+//   ndjson - one JSON object per line
+//   json   - a JSON array of objects
+//   bin    - compact columnar binary (see encodeBinary below)
+// Any format can be gzip-compressed on the fly.
+
+const os = require('os');
+const zlib = require('zlib');
+const { Readable, pipeline } = require('stream');
+
+const FORMATS = {
+    csv: { contentType: 'text/csv; charset=utf-8', extension: 'csv' },
+    ndjson: { contentType: 'application/x-ndjson', extension: 'ndjson' },
+    json: { contentType: 'application/json', extension: 'json' },
+    bin: { contentType: 'application/octet-stream', extension: 'wcmx' }
+};
+
+// Text chunks are flushed once they reach this size
+const CHUNK_BYTES = 64 * 1024;
+// Rows per block in the binary format
+const BINARY_BLOCK_ROWS = 4096;
+
+const BINARY_MAGIC = Buffer.from('WCMX');
+const BINARY_VERSION = 1;
+const NUMERIC_TYPES = { f64: Float64Array, i32: Int32Array, i16: Int16Array };
+const NUMERIC_READERS = {
+    f64: (buffer, offset) => buffer.readDoubleLE(offset),
+    i32: (buffer, offset) => buffer.readInt32LE(offset),
+    i16: (buffer, offset) => buffer.readInt16LE(offset)
+};
+
+function csvValue(value, type) {
+    if (type === 'str') {
+        return `"${String(value ?? '').replace(/"/g, '""')}"`;
+    }
+    return value ?? '';
+}
+
+// Group short strings into chunks of about CHUNK_BYTES
+function* chunked(pieces) {
+    let buffer = '';
+    for (const piece of pieces) {
+        buffer += piece;
+        if (buffer.length >= CHUNK_BYTES) {
+            yield buffer;
+            buffer = '';
+        }
+    }
+    if (buffer) {
+        yield buffer;
+    }
+}
+
+function* encodeCsv(columns, rows) {
+    yield `${columns.map(column => column.header || column.name).join(',')}\n`;
+    for (const row of rows) {
+        yield `${columns.map(column => csvValue(row[column.name], column.type)).join(',')}\n`;
+    }
+}
+
+function* encodeNdjson(columns, rows) {
+    for (const row of rows) {
+        yield `${JSON.stringify(pick(columns, row))}\n`;
+    }
+}
+
+function* encodeJsonArray(columns, rows) {
+    let separator = '[';
+    for (const row of rows) {
+        yield separator + JSON.stringify(pick(columns, row));
+        separator = ',';
+    }
+    yield separator === '[' ? '[]' : ']';
+}
+
+function pick(columns, row) {
+    const record = {};
+    for (const column of columns) {
+        record[column.name] = row[column.name];
+    }
+    return record;
+}
+
+// Columnar binary format, all integers little-endian:
+//   header: "WCMX", uint8 version, uint32 schema length, schema JSON
+//           ([{ name, type }] with type f64, i32, i16 or str)
+//   blocks: uint32 row count, then each column in schema order:
+//           numeric - row count values of its type
+//           str     - uint32 offsets (row count + 1) into the UTF-8 bytes, then the bytes
+//   end:    uint32 0
+function* encodeBinary(columns, rows) {
+    const schema = Buffer.from(JSON.stringify(columns.map(({ name, type }) => ({ name, type }))));
+    const header = Buffer.alloc(9);
+    BINARY_MAGIC.copy(header, 0);
+    header.writeUInt8(BINARY_VERSION, 4);
+    header.writeUInt32LE(schema.length, 5);
+    yield Buffer.concat([header, schema]);
+
+    let block = [];
+    for (const row of rows) {
+        block.push(row);
+        if (block.length === BINARY_BLOCK_ROWS) {
+            yield encodeBinaryBlock(columns, block);
+            block = [];
+        }
+    }
+    if (block.length) {
+        yield encodeBinaryBlock(columns, block);
+    }
+    yield Buffer.alloc(4);
+}
+
+function encodeBinaryBlock(columns, block) {
+    const count = Buffer.alloc(4);
+    count.writeUInt32LE(block.length, 0);
+    const parts = [count];
+
+    for (const column of columns) {
+        if (column.type === 'str') {
+            const strings = block.map(row => Buffer.from(String(row[column.name] ?? '')));
+            const offsets = new Uint32Array(block.length + 1);
+            strings.forEach((bytes, i) => {
+                offsets[i + 1] = offsets[i] + bytes.length;
+            });
+            parts.push(littleEndian(offsets), ...strings);
+        } else {
+            const values = NUMERIC_TYPES[column.type].from(block, row => row[column.name]);
+            parts.push(littleEndian(values));
+        }
+    }
+    return Buffer.concat(parts);
+}
+
+function littleEndian(typedArray) {
+    const bytes = Buffer.from(typedArray.buffer, typedArray.byteOffset, typedArray.byteLength);
+    if (os.endianness() === 'LE') {
+        return bytes;
+    }
+    const copy = Buffer.from(bytes);
+    const size = typedArray.BYTES_PER_ELEMENT;
+    return size === 2 ? copy.swap16() : size === 4 ? copy.swap32() : copy.swap64();
+}
+
+// Decode a complete binary export into an array of row objects
+function decodeBinary(buffer) {
+    if (!buffer.subarray(0, 4).equals(BINARY_MAGIC)) {
+        throw new Error('Not a WCMX export');
+    }
+    const schemaLength = buffer.readUInt32LE(5);
+    const columns = JSON.parse(buffer.subarray(9, 9 + schemaLength).toString('utf8'));
+    const rows = [];
+    let offset = 9 + schemaLength;
+
+    for (;;) {
+        const count = buffer.readUInt32LE(offset);
+        offset += 4;
+        if (count === 0) {
+            return rows;
+        }
+        const block = Array.from({ length: count }, () => ({}));
+        for (const { name, type } of columns) {
+            if (type === 'str') {
+                const offsets = [];
+                for (let i = 0; i <= count; i++) {
+                    offsets.push(buffer.readUInt32LE(offset + i * 4));
+                }
+                offset += (count + 1) * 4;
+                block.forEach((row, i) => {
+                    row[name] = buffer.subarray(offset + offsets[i], offset + offsets[i + 1]).toString('utf8');
+                });
+                offset += offsets[count];
+            } else {
+                const size = NUMERIC_TYPES[type].BYTES_PER_ELEMENT;
+                block.forEach((row, i) => {
+                    row[name] = NUMERIC_READERS[type](buffer, offset + i * size);
+                });
+                offset += count * size;
+            }
+        }
+        rows.push(...block);
+    }
+}
+
+function encode(format, columns, rows) {
+    switch (format) {
+        case 'csv':
+            return chunked(encodeCsv(columns, rows));
+        case 'ndjson':
+            return chunked(encodeNdjson(columns, rows));
+        case 'json':
+            return chunked(encodeJsonArray(columns, rows));
+        case 'bin':
+            return encodeBinary(columns, rows);
+        default:
+            throw new Error(`Unsupported export format: ${format}`);
+    }
+}
+
+// Stream `rows` to the response in `format`.
+//
+// With ?gzip=1 the client gets a .gz file; otherwise the body is gzipped
+// transparently when the client accepts gzip.
+function streamExport(req, res, { format, columns, rows, filename }) {
+    const { contentType, extension } = FORMATS[format];
+    const gzipFile = req.query.gzip === '1' || req.query.gzip === 'true';
+    const gzipTransport = !gzipFile && req.acceptsEncodings('gzip', 'identity') === 'gzip';
+
+    res.setHeader('Content-Type', gzipFile ? 'application/gzip' : contentType);
+    res.setHeader('Content-Disposition',
+        `attachment; filename="${filename}.${extension}${gzipFile ? '.gz' : ''}"`);
+    res.setHeader('Vary', 'Accept-Encoding');
+    if (gzipTransport) {
+        res.setHeader('Content-Encoding', 'gzip');
+    }
+
+    const source = Readable.from(encode(format, columns, rows), { objectMode: false });
+    const stages = gzipFile || gzipTransport ? [source, zlib.createGzip(), res] : [source, res];
+    // Headers are sent with the first chunk; later errors can only abort the response
+    pipeline(...stages, error => {
+        if (error && error.code !== 'ERR_STREAM_PREMATURE_CLOSE') {
+            console.error(`Export of ${filename}.${extension} failed:`, error);
+        }
+    });
+}
+
+module.exports = { FORMATS, streamExport, decodeBinary, encode };
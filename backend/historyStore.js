@@ -0,0 +1,376 @@
+// Append-only columnar store of daily stress indicators
+//
+// Each series (a named region or a grid cell) is a set of typed-array
+// columns, one value per day, persisted as one file per column under
+// `dir/<series>/`. New days are only ever appended. Alongside the columns
+// the store keeps prefix sums of the overall score and its square, both
+// day by day and week by week, so the averages, changes and volatility of
+// any period are a handful of array lookups rather than a pass over the
+// points. At most `maxSeries` series are kept on disk; the least recently
+// used one is deleted to make room for a new one.
+//
+// Requests never wait on writes: new rows are appended to memory and
+// written behind, through a queue per series that also orders deletions
+// and rewrites. The stored series are listed once, when the store is
+// created.
+
+const fs = require('fs');
+const path = require('path');
+const { LRUCache } = require('./lruCache');
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+const FIELDS = ['drought', 'heat', 'vegetation', 'rainfall', 'overall', 'temperature', 'precipitation'];
+// Prefix sums are kept for daily and weekly sampling
+const STRIDES = [1, 7];
+
+// Points and spacing of each supported period; the query returns points + 1
+// values, the last one being today
+const PERIODS = {
+    '7days': { points: 7, intervalDays: 1 },
+    '14days': { points: 14, intervalDays: 1 },
+    '1month': { points: 30, intervalDays: 1 },
+    '3months': { points: 12, intervalDays: 7 },
+    '6months': { points: 26, intervalDays: 7 },
+    '1year': { points: 52, intervalDays: 7 },
+    'custom': { points: 30, intervalDays: 1 }
+};
+const DEFAULT_PERIOD = PERIODS['14days'];
+
+function dayNumber(date) {
+    return Math.floor(date.getTime() / DAY_MS);
+}
+
+function dayString(day) {
+    return new Date(day * DAY_MS).toISOString().split('T')[0];
+}
+
+// Columns and prefix sums of one series, grown by doubling
+class SeriesColumns {
+    constructor(capacity = 512) {
+        this.length = 0;
+        // Rows [0, persisted) are on disk; the files are rewritten from
+        // scratch when they cannot be trusted (a failed or partial write)
+        this.persisted = 0;
+        this.needsRewrite = false;
+        this.days = new Int32Array(capacity);
+        this.columns = {};
+        for (const field of FIELDS) {
+            this.columns[field] = new Int16Array(capacity);
+        }
+        this.sums = {};
+        this.squares = {};
+        for (const stride of STRIDES) {
+            this.sums[stride] = new Float64Array(capacity);
+            this.squares[stride] = new Float64Array(capacity);
+        }
+    }
+
+    get lastDay() {
+        return this.length ? this.days[this.length - 1] : null;
+    }
+
+    append(day, values) {
+        if (this.length === this.days.length) {
+            this.grow(this.days.length * 2);
+        }
+        const i = this.length;
+        this.days[i] = day;
+        for (const field of FIELDS) {
+            this.columns[field][i] = values[field];
+        }
+        const overall = this.columns.overall[i];
+        for (const stride of STRIDES) {
+            const previous = i >= stride ? i - stride : -1;
+            this.sums[stride][i] = overall + (previous >= 0 ? this.sums[stride][previous] : 0);
+            this.squares[stride][i] = overall * overall + (previous >= 0 ? this.squares[stride][previous] : 0);
+        }
+        this.length++;
+    }
+
+    grow(capacity) {
+        const resize = (array) => {
+            const larger = new array.constructor(capacity);
+            larger.set(array.subarray(0, this.length));
+            return larger;
+        };
+        this.days = resize(this.days);
+        for (const field of FIELDS) {
+            this.columns[field] = resize(this.columns[field]);
+        }
+        for (const stride of STRIDES) {
+            this.sums[stride] = resize(this.sums[stride]);
+            this.squares[stride] = resize(this.squares[stride]);
+        }
+    }
+
+    // Sum of `count` overall values (or their squares) ending at `last`, `stride` rows apart
+    sampledSum(last, count, stride, squared = false) {
+        if (count <= 0) {
+            return 0;
+        }
+        const prefix = squared ? this.squares[stride] : this.sums[stride];
+        const before = last - count * stride;
+        return prefix[last] - (before >= 0 ? prefix[before] : 0);
+    }
+}
+
+class HistoryStore {
+    // `generateDay(date)` supplies the indicators for a day with no recorded data
+    constructor({ dir, generateDay, retentionDays = 400, maxLoadedSeries = 500, maxSeries = 5000 }) {
+        this.dir = dir;
+        this.generateDay = generateDay;
+        this.retentionDays = retentionDays;
+        this.maxSeries = maxSeries;
+        this.loaded = new LRUCache({ maxEntries: maxLoadedSeries, ttlMs: Infinity });
+        // Series being read from disk, so concurrent requests share one read
+        this.loading = new Map();
+        // Tail of the write queue of each series with pending writes
+        this.writes = new Map();
+        // Series on disk, least recently used first
+        this.stored = new Map();
+        this.ready = this.listStored().then(keys => {
+            // Series used while listing stay the most recent
+            const used = Array.from(this.stored.keys());
+            this.stored = new Map(keys.map(key => [key, true]));
+            for (const key of used) {
+                this.stored.delete(key);
+                this.stored.set(key, true);
+            }
+            this.evict();
+        });
+    }
+
+    // Points, comparison and statistics of one series over a period
+    async query(seriesKey, period, now = new Date()) {
+        const series = await this.series(seriesKey, now);
+        const { points, intervalDays } = PERIODS[period] || DEFAULT_PERIOD;
+        const count = Math.min(points + 1, Math.floor((series.length - 1) / intervalDays) + 1);
+        const last = series.length - 1;
+        const rowOf = (point) => last - (count - 1 - point) * intervalDays;
+
+        // Sum of the overall scores of points [start, end)
+        const sumPoints = (start, end, squared = false) =>
+            series.sampledSum(rowOf(end - 1), end - start, intervalDays, squared);
+
+        const historical = [];
+        let maxStress = -Infinity;
+        let minStress = Infinity;
+        for (let point = 0; point < count; point++) {
+            const row = rowOf(point);
+            const entry = { date: dayString(series.days[row]) };
+            for (const field of FIELDS) {
+                entry[field] = series.columns[field][row];
+            }
+            maxStress = Math.max(maxStress, entry.overall);
+            minStress = Math.min(minStress, entry.overall);
+            historical.push(entry);
+        }
+
+        const recentCount = Math.min(7, count);
+        const recentAvg = sumPoints(count - recentCount, count) / recentCount;
+        const olderAvg = sumPoints(0, recentCount) / recentCount;
+        const mean = sumPoints(0, count) / count;
+        const variance = Math.max(0, sumPoints(0, count, true) / count - mean * mean);
+
+        return {
+            historical,
+            comparison: {
+                weeklyChange: Math.round(recentAvg - sumPoints(Math.max(0, count - 14), Math.max(0, count - 7)) / 7),
+                monthlyChange: count >= 28 ? Math.round(recentAvg - sumPoints(0, 7) / 7) : null,
+                yearlyChange: null,
+                trend: recentAvg > olderAvg + 5 ? 'increasing' : recentAvg < olderAvg - 5 ? 'decreasing' : 'stable'
+            },
+            statistics: {
+                maxStress,
+                minStress,
+                avgStress: Math.round(mean),
+                volatility: count < 2 ? 0 : Math.round(Math.sqrt(variance))
+            }
+        };
+    }
+
+    // Iterator over every stored day of a series, oldest first
+    async rows(seriesKey, now = new Date()) {
+        const series = await this.series(seriesKey, now);
+        const length = series.length;
+        return (function* () {
+            for (let row = 0; row < length; row++) {
+                const entry = { date: dayString(series.days[row]) };
+                for (const field of FIELDS) {
+                    entry[field] = series.columns[field][row];
+                }
+                yield entry;
+            }
+        })();
+    }
+
+    // Load a series, creating it or appending the days up to `now` as needed
+    async series(seriesKey, now = new Date()) {
+        this.touch(seriesKey);
+        let series = this.loaded.get(seriesKey);
+        if (!series) {
+            let loading = this.loading.get(seriesKey);
+            if (!loading) {
+                loading = this.load(seriesKey)
+                    .then(loadedSeries => {
+                        this.loaded.set(seriesKey, loadedSeries);
+                        return loadedSeries;
+                    })
+                    .finally(() => this.loading.delete(seriesKey));
+                this.loading.set(seriesKey, loading);
+            }
+            series = await loading;
+        }
+
+        const today = dayNumber(now);
+        if (series.lastDay === null || series.lastDay < today) {
+            const first = series.lastDay === null ? today - this.retentionDays + 1 : series.lastDay + 1;
+            for (let day = first; day <= today; day++) {
+                series.append(day, this.generateDay(new Date(day * DAY_MS)));
+            }
+            this.enqueue(seriesKey, () => this.persist(seriesKey, series), series);
+        }
+        return series;
+    }
+
+    // Wait for every queued write
+    async flush() {
+        while (this.writes.size) {
+            await Promise.all(this.writes.values());
+        }
+    }
+
+    seriesDir(seriesKey) {
+        return path.join(this.dir, encodeURIComponent(seriesKey));
+    }
+
+    // Mark a series as used, deleting the least recently used ones beyond maxSeries
+    touch(seriesKey) {
+        this.stored.delete(seriesKey);
+        this.stored.set(seriesKey, true);
+        this.evict();
+    }
+
+    evict() {
+        while (this.stored.size > this.maxSeries) {
+            const oldest = this.stored.keys().next().value;
+            this.stored.delete(oldest);
+            this.loaded.delete(oldest);
+            this.enqueue(oldest, () => fs.promises.rm(this.seriesDir(oldest), { recursive: true, force: true }));
+        }
+    }
+
+    // Run `task` after the queued writes of a series. A failed write is
+    // logged and makes `series` rewrite its files on its next write.
+    enqueue(seriesKey, task, series = null) {
+        const write = (this.writes.get(seriesKey) || Promise.resolve())
+            .then(task)
+            .catch(error => {
+                console.error(`History write failed for ${seriesKey}: ${error.message}`);
+                if (series) {
+                    series.needsRewrite = true;
+                }
+            })
+            .finally(() => {
+                if (this.writes.get(seriesKey) === write) {
+                    this.writes.delete(seriesKey);
+                }
+            });
+        this.writes.set(seriesKey, write);
+        return write;
+    }
+
+    // Keys of the series on disk, least recently appended first
+    async listStored() {
+        let names;
+        try {
+            names = await fs.promises.readdir(this.dir);
+        } catch (error) {
+            return [];
+        }
+        const modified = async (name) => {
+            try {
+                return (await fs.promises.stat(path.join(this.dir, name, 'days.i32'))).mtimeMs;
+            } catch (error) {
+                return 0;
+            }
+        };
+        // Skips anything not named by seriesDir()
+        const entries = await Promise.all(names
+            .filter(name => /^(?:[^%]|%[0-9A-F]{2})+$/.test(name))
+            .map(async name => ({ key: decodeURIComponent(name), mtimeMs: await modified(name) })));
+        return entries
+            .sort((a, b) => a.mtimeMs - b.mtimeMs)
+            .map(entry => entry.key);
+    }
+
+    async load(seriesKey) {
+        // Pending writes (or the deletion of an evicted copy) land first
+        await this.writes.get(seriesKey);
+        const series = new SeriesColumns();
+        const dir = this.seriesDir(seriesKey);
+
+        const read = async (name, Type) => {
+            let buffer;
+            try {
+                buffer = await fs.promises.readFile(path.join(dir, name));
+            } catch (error) {
+                if (error.code === 'ENOENT') {
+                    return new Type(0);
+                }
+                throw error;
+            }
+            // Copied, since a pooled buffer is not necessarily aligned for the typed array
+            const array = new Type(Math.floor(buffer.length / Type.BYTES_PER_ELEMENT));
+            new Uint8Array(array.buffer).set(buffer.subarray(0, array.byteLength));
+            return array;
+        };
+        const days = await read('days.i32', Int32Array);
+        const columns = {};
+        await Promise.all(FIELDS.map(async field => {
+            columns[field] = await read(`${field}.i16`, Int16Array);
+        }));
+
+        // An interrupted append can leave columns of different lengths; keep the complete rows
+        const length = Math.min(days.length, ...FIELDS.map(field => columns[field].length));
+        for (let i = 0; i < length; i++) {
+            const values = {};
+            for (const field of FIELDS) {
+                values[field] = columns[field][i];
+            }
+            series.append(days[i], values);
+        }
+        series.persisted = length;
+        if (FIELDS.some(field => columns[field].length !== length) || days.length !== length) {
+            series.needsRewrite = true;
+            this.enqueue(seriesKey, () => this.persist(seriesKey, series), series);
+        }
+        return series;
+    }
+
+    // Append the rows not yet on disk to every column file, or rewrite the
+    // files from scratch if they cannot be trusted
+    async persist(seriesKey, series) {
+        const dir = this.seriesDir(seriesKey);
+        const rewrite = series.needsRewrite;
+        const start = rewrite ? 0 : series.persisted;
+        const end = series.length;
+        if (start === end && !rewrite) {
+            return;
+        }
+        if (rewrite) {
+            await fs.promises.rm(dir, { recursive: true, force: true });
+        }
+        await fs.promises.mkdir(dir, { recursive: true });
+        const bytes = (array) => Buffer.from(array.buffer, array.byteOffset + start * array.BYTES_PER_ELEMENT,
+            (end - start) * array.BYTES_PER_ELEMENT);
+        await Promise.all([
+            fs.promises.appendFile(path.join(dir, 'days.i32'), bytes(series.days)),
+            ...FIELDS.map(field => fs.promises.appendFile(path.join(dir, `${field}.i16`), bytes(series.columns[field])))
+        ]);
+        series.persisted = end;
+        series.needsRewrite = false;
+    }
+}
+
+module.exports = { HistoryStore, PERIODS };
@@ -0,0 +1,49 @@
+// Size-bounded cache with per-entry expiry.
+//
+// A Map keeps insertion order, so re-inserting an entry on every read moves it
+// to the back and the first key is always the least recently used one.
+
+class LRUCache {
+    constructor({ maxEntries = 1000, ttlMs = 60 * 1000 } = {}) {
+        this.maxEntries = maxEntries;
+        this.ttlMs = ttlMs;
+        this.entries = new Map();
+    }
+
+    // Return the cached value, or undefined if it is missing or expired
+    get(key) {
+        const entry = this.entries.get(key);
+        if (!entry) {
+            return undefined;
+        }
+        if (entry.expiresAt <= Date.now()) {
+            this.entries.delete(key);
+            return undefined;
+        }
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+        return entry.value;
+    }
+
+    set(key, value, ttlMs = this.ttlMs) {
+        this.entries.delete(key);
+        this.entries.set(key, { value, expiresAt: Date.now() + ttlMs });
+        while (this.entries.size > this.maxEntries) {
+            this.entries.delete(this.entries.keys().next().value);
+        }
+    }
+
+    delete(key) {
+        return this.entries.delete(key);
+    }
+
+    clear() {
+        this.entries.clear();
+    }
+
+    get size() {
+        return this.entries.size;
+    }
+}
+
+module.exports = { LRUCache };
@@ -0,0 +1,133 @@
+// Deterministic local stand-in for the Open-Meteo forecast API
+//
+// Answers /v1/forecast with the same shape as Open-Meteo, including
+// multi-location requests, so the server can run and be tested offline.
+// The weather is derived from the coordinates alone: the same location
+// always gets the same values.
+//
+// Run standalone:  node backend/openMeteoStub.js --port 8089
+// then start the server with OPEN_METEO_URL=http://localhost:8089/v1/forecast
+
+const http = require('http');
+
+// Small seeded PRNG (mulberry32) so values depend only on the seed
+function seededRandom(seed) {
+    let state = seed >>> 0;
+    return () => {
+        state = (state + 0x6D2B79F5) >>> 0;
+        let t = state;
+        t = Math.imul(t ^ (t >>> 15), t | 1);
+        t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+}
+
+function hashLocation(lat, lon) {
+    let hash = 2166136261;
+    for (const char of `${lat},${lon}`) {
+        hash = Math.imul(hash ^ char.charCodeAt(0), 16777619);
+    }
+    return hash >>> 0;
+}
+
+function round1(value) {
+    return Math.round(value * 10) / 10;
+}
+
+// Build an Open-Meteo style forecast for one location
+function stubForecast(lat, lon, pastDays = 14, forecastDays = 14) {
+    const random = seededRandom(hashLocation(lat, lon));
+    const days = pastDays + forecastDays;
+    // Warmer towards the equator, wetter in the tropics and mid-latitudes
+    const baseTemp = 32 - Math.abs(lat) * 0.45;
+    const wetness = Math.abs(lat) < 23.5 ? 6 : Math.abs(lat) < 40 ? 2 : 4;
+
+    const start = new Date();
+    start.setUTCDate(start.getUTCDate() - pastDays);
+    const time = [];
+    const temperatureMax = [];
+    const temperatureMin = [];
+    const precipitation = [];
+    for (let i = 0; i < days; i++) {
+        const day = new Date(start);
+        day.setUTCDate(start.getUTCDate() + i);
+        time.push(day.toISOString().slice(0, 10));
+        const max = baseTemp + random() * 8;
+        temperatureMax.push(round1(max));
+        temperatureMin.push(round1(max - 6 - random() * 6));
+        precipitation.push(random() < 0.4 ? round1(random() * wetness * 2) : 0);
+    }
+
+    return {
+        latitude: lat,
+        longitude: lon,
+        timezone: 'GMT',
+        current: {
+            time: new Date().toISOString().slice(0, 16),
+            temperature_2m: round1(baseTemp + random() * 5),
+            precipitation: round1(random() * 2),
+            relative_humidity_2m: Math.round(40 + random() * 50)
+        },
+        daily: {
+            time,
+            temperature_2m_max: temperatureMax,
+            temperature_2m_min: temperatureMin,
+            precipitation_sum: precipitation
+        }
+    };
+}
+
+function parseList(value) {
+    return String(value || '').split(',').filter(Boolean).map(Number);
+}
+
+// Create (but do not start) the stub server; `latencyMs` delays every response
+function createOpenMeteoStub({ latencyMs = 0 } = {}) {
+    const server = http.createServer((req, res) => {
+        const url = new URL(req.url, 'http://localhost');
+        server.requestCount++;
+
+        if (url.pathname !== '/v1/forecast') {
+            res.writeHead(404, { 'Content-Type': 'application/json' });
+            res.end(JSON.stringify({ error: true, reason: 'Not found' }));
+            return;
+        }
+
+        const latitudes = parseList(url.searchParams.get('latitude'));
+        const longitudes = parseList(url.searchParams.get('longitude'));
+        if (latitudes.length === 0 || latitudes.length !== longitudes.length || latitudes.some(Number.isNaN) ||
+            longitudes.some(Number.isNaN)) {
+            res.writeHead(400, { 'Content-Type': 'application/json' });
+            res.end(JSON.stringify({ error: true, reason: 'latitude and longitude must be lists of equal length' }));
+            return;
+        }
+
+        const pastDays = Number(url.searchParams.get('past_days') || 0);
+        const forecastDays = Number(url.searchParams.get('forecast_days') || 7);
+        const forecasts = latitudes.map((lat, i) => stubForecast(lat, longitudes[i], pastDays, forecastDays));
+        const body = JSON.stringify(forecasts.length === 1 ? forecasts[0] : forecasts);
+
+        setTimeout(() => {
+            res.writeHead(200, { 'Content-Type': 'application/json' });
+            res.end(body);
+        }, latencyMs);
+    });
+    server.requestCount = 0;
+    return server;
+}
+
+module.exports = { createOpenMeteoStub, stubForecast, seededRandom };
+
+if (require.main === module) {
+    const args = process.argv.slice(2);
+    const option = (name, fallback) => {
+        const index = args.indexOf(name);
+        return index >= 0 ? Number(args[index + 1]) : fallback;
+    };
+    const port = option('--port', Number(process.env.STUB_PORT) || 8089);
+    const latencyMs = option('--latency', 0);
+
+    createOpenMeteoStub({ latencyMs }).listen(port, () => {
+        console.log(`Open-Meteo stub running on http://localhost:${port}/v1/forecast`);
+    });
+}
@@ -0,0 +1,83 @@
+// Shared cache for computed API responses
+//
+// Entries are keyed by endpoint name and request parameters and kept in one
+// LRU-bounded store. Each endpoint has its own policy:
+//   ttlMs   - how long an entry is served as fresh
+//   staleMs - how much longer it may be served while it is recomputed in
+//             the background (stale-while-revalidate)
+// Concurrent requests for a key that is being computed wait for that single
+// computation instead of starting their own.
+
+const { LRUCache } = require('./lruCache');
+
+class ResponseCache {
+    constructor({ maxEntries = 1000 } = {}) {
+        this.store = new LRUCache({ maxEntries });
+        this.inFlight = new Map();
+        this.stats = { hits: 0, stale: 0, misses: 0, coalesced: 0, refreshErrors: 0 };
+    }
+
+    // Build a cache key from an endpoint name and its parameters
+    static key(name, params = {}) {
+        const parts = Object.keys(params)
+            .sort()
+            .filter(param => params[param] !== undefined && params[param] !== null)
+            .map(param => `${param}=${params[param]}`);
+        return `${name}?${parts.join('&')}`;
+    }
+
+    // Resolve to { value, status } where status is HIT, STALE or MISS
+    async get(key, compute, { ttlMs, staleMs = 0 }) {
+        const entry = this.store.get(key);
+        const now = Date.now();
+
+        if (entry && entry.freshUntil > now) {
+            this.stats.hits++;
+            return { value: entry.value, status: 'HIT' };
+        }
+
+        if (entry) {
+            this.stats.stale++;
+            if (!this.inFlight.has(key)) {
+                this.refresh(key, compute, { ttlMs, staleMs }).catch(error => {
+                    this.stats.refreshErrors++;
+                    console.error(`Background refresh of ${key} failed:`, error);
+                });
+            }
+            return { value: entry.value, status: 'STALE' };
+        }
+
+        if (this.inFlight.has(key)) {
+            this.stats.coalesced++;
+            return { value: await this.inFlight.get(key), status: 'MISS' };
+        }
+
+        this.stats.misses++;
+        return { value: await this.refresh(key, compute, { ttlMs, staleMs }), status: 'MISS' };
+    }
+
+    refresh(key, compute, { ttlMs, staleMs }) {
+        // compute runs on a later tick, so the entry is registered before it
+        // can settle and the cleanup below always finds it, even when compute
+        // throws synchronously.
+        const promise = Promise.resolve()
+            .then(compute)
+            .then(value => {
+                this.store.set(key, { value, freshUntil: Date.now() + ttlMs }, ttlMs + staleMs);
+                return value;
+            })
+            .finally(() => {
+                if (this.inFlight.get(key) === promise) {
+                    this.inFlight.delete(key);
+                }
+            });
+        this.inFlight.set(key, promise);
+        return promise;
+    }
+
+    clear() {
+        this.store.clear();
+    }
+}
+
+module.exports = { ResponseCache };
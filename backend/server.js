@@ -2,64 +2,117 @@ const express = require('express');
 const cors = require('cors');
 const fs = require('fs');
 const path = require('path');
+const { WeatherClient } = require('./weather');
+const { ResponseCache } = require('./responseCache');
+const { HistoryStore } = require('./historyStore');
+const { FORMATS: EXPORT_FORMATS, streamExport } = require('./exportStream');
+const { PointIndex, isValidCoordinate } = require('./spatialIndex');
+const { locationZones, heatmapCells, heatmapPoints, getSeasonalFactor, calculateRegionalStress } = require('./stressModel');
+const { TileStore } = require('./tilePyramid');
 
 const app = express();
 const PORT = process.env.PORT || 3000;
 
 app.use(cors());
-app.use(express.json());
+// Bulk lookups post up to MAX_LOOKUP_POINTS coordinates
+app.use(express.json({ limit: '2mb' }));
 app.use(express.static(path.join(__dirname, '../frontend')));
 
-// Regional crop stress data cache
-let cropStressData = null;
-let lastUpdated = null;
+// Shared Open-Meteo client: batched requests, pooled connections, cached responses
+const weatherClient = new WeatherClient();
+
+// Per-endpoint cache policy: served fresh for ttlMs, then served stale for up
+// to staleMs more while it is recomputed in the background. Each policy has
+// its own store of at most maxEntries, so an endpoint with unbounded keys
+// (one per coordinate) cannot evict the single crop-stress or heat map entry.
+const CACHE_POLICIES = {
+    cropStress: { ttlMs: 24 * 60 * 60 * 1000, staleMs: 7 * 24 * 60 * 60 * 1000, maxEntries: 1 },
+    heatmap: { ttlMs: 15 * 60 * 1000, staleMs: 60 * 60 * 1000, maxEntries: 1 },
+    historical: { ttlMs: 10 * 60 * 1000, staleMs: 60 * 60 * 1000, maxEntries: 200 },
+    historicalCoords: { ttlMs: 10 * 60 * 1000, staleMs: 60 * 60 * 1000, maxEntries: 1000 }
+};
+
+// Computed responses, one store per policy above
+const responseCaches = Object.fromEntries(
+    Object.entries(CACHE_POLICIES).map(([name, policy]) => [name, new ResponseCache({ maxEntries: policy.maxEntries })])
+);
+
+const CROP_STRESS_KEY = ResponseCache.key('crop-stress');
+
+// Key agricultural regions monitored with live weather data
+const MONITORED_REGIONS = [
+    { name: 'Sahel Region', lat: 15.0, lon: 5.0, country: 'Multiple' },
+    { name: 'East Africa', lat: 0.0, lon: 38.0, country: 'Kenya/Ethiopia' },
+    { name: 'South Asia', lat: 23.0, lon: 80.0, country: 'India' },
+    { name: 'Southeast Asia', lat: 14.0, lon: 100.0, country: 'Thailand/Vietnam' },
+    { name: 'Southern Africa', lat: -25.0, lon: 25.0, country: 'South Africa' },
+    { name: 'Central America', lat: 15.0, lon: -90.0, country: 'Guatemala/Honduras' },
+    { name: 'West Africa', lat: 8.0, lon: -10.0, country: 'Nigeria/Ghana' },
+    { name: 'Middle East', lat: 30.0, lon: 45.0, country: 'Iraq/Syria' },
+    { name: 'Australia', lat: -25.0, lon: 135.0, country: 'Australia' },
+    { name: 'Brazil', lat: -15.0, lon: -55.0, country: 'Brazil' },
+    { name: 'Ukraine', lat: 49.0, lon: 32.0, country: 'Ukraine' },
+    { name: 'United States', lat: 38.0, lon: -100.0, country: 'USA' }
+];
+
+// Grid spacing of the heat map endpoint, in degrees
+const HEATMAP_RESOLUTION = 15;
+
+// Precomputed spatial lookups: nearest monitored region and nearest heat
+// map cell (the climate zone / land type raster is in stressModel)
+const regionIndex = new PointIndex(MONITORED_REGIONS);
+const MONITORED_REGION_NAMES = new Set(MONITORED_REGIONS.map(region => region.name));
+const heatmapCellIndex = new PointIndex(heatmapCells(HEATMAP_RESOLUTION));
+const MAX_LOOKUP_POINTS = 10000;
+
+// Heat map tile pyramid, built offline with backend/tilePyramid.js
+const tileStore = new TileStore({
+    dir: process.env.TILES_DIR || path.join(__dirname, '../data/tiles/heatmap')
+});
+
+// Look a response up in the store of the named policy, computing it on a miss
+function getCached(policyName, key, compute) {
+    return responseCaches[policyName].get(key, compute, CACHE_POLICIES[policyName]);
+}
+
+// Serve a cached response, computing it on a miss
+async function sendCached(res, policyName, key, compute) {
+    const { value, status } = await getCached(policyName, key, compute);
+    res.setHeader('X-Cache', status);
+    res.json(value);
+}
 
 // API endpoint to get crop stress data
 app.get('/api/crop-stress', async (req, res) => {
     try {
-        // Return cached data if available and recent (within 24 hours)
-        if (cropStressData && lastUpdated && (Date.now() - lastUpdated) < 24 * 60 * 60 * 1000) {
-            return res.json(cropStressData);
-        }
-
-        // Fetch weather data from Open-Meteo for key agricultural regions
-        const regions = [
-            { name: 'Sahel Region', lat: 15.0, lon: 5.0, country: 'Multiple' },
-            { name: 'East Africa', lat: 0.0, lon: 38.0, country: 'Kenya/Ethiopia' },
-            { name: 'South Asia', lat: 23.0, lon: 80.0, country: 'India' },
-            { name: 'Southeast Asia', lat: 14.0, lon: 100.0, country: 'Thailand/Vietnam' },
-            { name: 'Southern Africa', lat: -25.0, lon: 25.0, country: 'South Africa' },
-            { name: 'Central America', lat: 15.0, lon: -90.0, country: 'Guatemala/Honduras' },
-            { name: 'West Africa', lat: 8.0, lon: -10.0, country: 'Nigeria/Ghana' },
-            { name: 'Middle East', lat: 30.0, lon: 45.0, country: 'Iraq/Syria' },
-            { name: 'Australia', lat: -25.0, lon: 135.0, country: 'Australia' },
-            { name: 'Brazil', lat: -15.0, lon: -55.0, country: 'Brazil' },
-            { name: 'Ukraine', lat: 49.0, lon: 32.0, country: 'Ukraine' },
-            { name: 'United States', lat: 38.0, lon: -100.0, country: 'USA' }
-        ];
-
-        const stressData = await calculateCropStress(regions);
-        
-        // Cache the data
-        cropStressData = stressData;
-        lastUpdated = Date.now();
-
-        res.json(stressData);
+        await sendCached(res, 'cropStress', CROP_STRESS_KEY, computeCropStress);
     } catch (error) {
         console.error('Error fetching crop stress data:', error);
         res.status(500).json({ error: 'Failed to fetch crop stress data' });
     }
 });
 
+// Compute crop stress for the key agricultural regions
+async function computeCropStress() {
+    // Fetch weather data from Open-Meteo for key agricultural regions
+    return await calculateCropStress(MONITORED_REGIONS);
+}
+
 // API endpoint to get historical data for comparison with date range
 app.get('/api/historical/:region', async (req, res) => {
     const { region } = req.params;
     const { period = '14days', customDate } = req.query;
     
+    // Only monitored regions have a history; anything else would create a new series
+    if (!MONITORED_REGION_NAMES.has(region)) {
+        return res.status(400).json({ error: 'Unknown region. See /api/regions for the monitored regions.' });
+    }
+    
     try {
         // Fetch historical data with specified period
-        const historicalData = await generateHistoricalData(region, period, customDate);
-        res.json(historicalData);
+        const key = ResponseCache.key('historical', { region, period, customDate });
+        await sendCached(res, 'historical', key,
+            () => generateHistoricalData(region, period, customDate));
     } catch (error) {
         console.error('Error fetching historical data:', error);
         res.status(500).json({ error: 'Failed to fetch historical data' });
@@ -68,19 +121,22 @@ app.get('/api/historical/:region', async (req, res) => {
 
 // API endpoint to get historical data for any coordinates
 app.get('/api/historical-coords', async (req, res) => {
-    const { lat, lon, period = '14days' } = req.query;
+    const { period = '14days' } = req.query;
+    const lat = parseFloat(req.query.lat);
+    const lon = parseFloat(req.query.lon);
     
-    if (!lat || !lon) {
-        return res.status(400).json({ error: 'Latitude and longitude are required' });
+    if (!isValidCoordinate(lat, lon)) {
+        return res.status(400).json({ error: 'Valid latitude and longitude are required' });
     }
     
     try {
-        const historicalData = await generateHistoricalDataFromCoords(
-            parseFloat(lat),
-            parseFloat(lon),
-            period
-        );
-        res.json(historicalData);
+        // Coordinates are rounded to the two decimals shown in the response,
+        // so nearby requests share one cache entry
+        const latitude = Number(lat.toFixed(2));
+        const longitude = Number(lon.toFixed(2));
+        const key = ResponseCache.key('historical-coords', { lat: latitude, lon: longitude, period });
+        await sendCached(res, 'historicalCoords', key,
+            () => generateHistoricalDataFromCoords(latitude, longitude, period));
     } catch (error) {
         console.error('Error fetching historical data:', error);
         res.status(500).json({ error: 'Failed to fetch historical data' });
@@ -90,14 +146,53 @@ app.get('/api/historical-coords', async (req, res) => {
 // API endpoint to get heat map data
 app.get('/api/heatmap', async (req, res) => {
     try {
-        const heatmapData = await generateHeatmapData();
-        res.json(heatmapData);
+        await sendCached(res, 'heatmap', ResponseCache.key('heatmap'), generateHeatmapData);
     } catch (error) {
         console.error('Error fetching heatmap data:', error);
         res.status(500).json({ error: 'Failed to fetch heatmap data' });
     }
 });
 
+// API endpoint for the zoom levels and bounds of the heat map tiles
+app.get('/api/tiles/heatmap/metadata.json', (req, res) => {
+    const metadata = tileStore.metadata();
+    
+    if (!metadata) {
+        return res.status(404).json({ error: 'Heat map tiles have not been built' });
+    }
+    
+    res.setHeader('Cache-Control', 'no-cache');
+    res.json(metadata);
+});
+
+// API endpoint to get one heat map tile; empty tiles are 204 No Content
+app.get('/api/tiles/heatmap/:z/:x/:y.wcmt', (req, res) => {
+    const metadata = tileStore.metadata();
+    
+    if (!metadata) {
+        return res.status(404).json({ error: 'Heat map tiles have not been built' });
+    }
+    
+    const [z, x, y] = [req.params.z, req.params.x, req.params.y]
+        .map(value => (/^\d+$/.test(value) ? Number(value) : NaN));
+    if (![z, x, y].every(Number.isInteger) || z < metadata.minZoom || z > metadata.maxZoom ||
+        x < 0 || y < 0 || x >= 2 ** z || y >= 2 ** z) {
+        return res.status(404).json({ error: 'No such tile' });
+    }
+    
+    // Tiles change only when the pyramid is rebuilt: clients revalidate
+    // with If-None-Match and get 304 Not Modified until then
+    res.setHeader('Cache-Control', 'public, max-age=300, must-revalidate');
+    const tile = tileStore.get(z, x, y);
+    if (!tile) {
+        return res.status(204).end();
+    }
+    
+    res.setHeader('Content-Type', 'application/octet-stream');
+    res.setHeader('ETag', tile.etag);
+    res.send(tile.body);
+});
+
 // API endpoint for user's current location
 app.get('/api/current-location', async (req, res) => {
     const { lat, lon } = req.query;
@@ -115,6 +210,37 @@ app.get('/api/current-location', async (req, res) => {
     }
 });
 
+// API endpoint to classify coordinates and find the nearest region and heat map cell
+app.get('/api/lookup', (req, res) => {
+    const lat = parseFloat(req.query.lat);
+    const lon = parseFloat(req.query.lon);
+    
+    if (!isValidCoordinate(lat, lon)) {
+        return res.status(400).json({ error: 'Valid latitude and longitude are required' });
+    }
+    
+    res.json(lookupLocation(lat, lon));
+});
+
+// Bulk variant: body { points: [{ lat, lon }, ...] }, results in the same order
+app.post('/api/lookup', (req, res) => {
+    const points = req.body && req.body.points;
+    
+    if (!Array.isArray(points) || points.length === 0) {
+        return res.status(400).json({ error: 'A non-empty points array is required' });
+    }
+    if (points.length > MAX_LOOKUP_POINTS) {
+        return res.status(400).json({ error: `At most ${MAX_LOOKUP_POINTS} points per request` });
+    }
+    
+    const results = points.map(point => {
+        const lat = parseFloat(point && point.lat);
+        const lon = parseFloat(point && point.lon);
+        return isValidCoordinate(lat, lon) ? lookupLocation(lat, lon) : { error: 'Invalid coordinates' };
+    });
+    res.json({ count: results.length, results });
+});
+
 // API endpoint to get region details
 app.get('/api/regions', (req, res) => {
     const regions = [
@@ -135,27 +261,113 @@ app.get('/api/regions', (req, res) => {
     res.json(regions);
 });
 
+// Columns of each exportable dataset
+const EXPORT_COLUMNS = {
+    'crop-stress': [
+        { name: 'name', header: 'Region', type: 'str' },
+        { name: 'country', header: 'Country', type: 'str' },
+        { name: 'riskLevel', header: 'Risk Level', type: 'str' },
+        { name: 'drought', header: 'Drought Index', type: 'i16' },
+        { name: 'heat', header: 'Heat Index', type: 'i16' },
+        { name: 'vegetation', header: 'Vegetation Stress', type: 'i16' },
+        { name: 'overall', header: 'Overall Stress', type: 'i16' },
+        { name: 'trend', header: 'Trend', type: 'str' },
+        { name: 'confidence', header: 'Confidence', type: 'i16' }
+    ],
+    heatmap: [
+        { name: 'lat', type: 'f64' },
+        { name: 'lon', type: 'f64' },
+        { name: 'intensity', type: 'i16' },
+        { name: 'drought', type: 'i16' },
+        { name: 'heat', type: 'i16' },
+        { name: 'vegetation', type: 'i16' },
+        { name: 'rainfall', type: 'i16' },
+        { name: 'temperature', type: 'i16' },
+        { name: 'precipitation', type: 'i16' },
+        { name: 'climateZone', type: 'str' },
+        { name: 'type', type: 'str' }
+    ],
+    history: [
+        { name: 'date', type: 'str' },
+        { name: 'drought', type: 'i16' },
+        { name: 'heat', type: 'i16' },
+        { name: 'vegetation', type: 'i16' },
+        { name: 'rainfall', type: 'i16' },
+        { name: 'overall', type: 'i16' },
+        { name: 'temperature', type: 'i16' },
+        { name: 'precipitation', type: 'i16' }
+    ]
+};
+
 // API endpoint for export functionality
-app.get('/api/export/:format', (req, res) => {
+// Query: dataset=crop-stress|heatmap|history, plus resolution (heatmap),
+// region or lat/lon (history) and gzip=1 for a compressed file
+app.get('/api/export/:format', async (req, res) => {
     const { format } = req.params;
+    const { dataset = 'crop-stress' } = req.query;
     
-    if (!cropStressData) {
-        return res.status(404).json({ error: 'No data available for export' });
+    if (!EXPORT_FORMATS[format]) {
+        return res.status(400).json({ error: 'Unsupported format. Use json, csv, ndjson or bin.' });
     }
-
-    if (format === 'json') {
-        res.setHeader('Content-Type', 'application/json');
-        res.setHeader('Content-Disposition', 'attachment; filename="crop-stress-data.json"');
-        res.json(cropStressData);
-    } else if (format === 'csv') {
-        res.setHeader('Content-Type', 'text/csv');
-        res.setHeader('Content-Disposition', 'attachment; filename="crop-stress-data.csv"');
-        
-        const csv = generateCSV(cropStressData);
-        res.send(csv);
+    if (!EXPORT_COLUMNS[dataset]) {
+        return res.status(400).json({ error: 'Unsupported dataset. Use crop-stress, heatmap or history.' });
+    }
+    
+    let rows;
+    if (dataset === 'crop-stress') {
+        // Same path as /api/crop-stress, so a cold cache computes the data
+        let cropStressData;
+        try {
+            ({ value: cropStressData } = await getCached('cropStress', CROP_STRESS_KEY, computeCropStress));
+        } catch (error) {
+            console.error('Error computing crop stress data for export:', error);
+            return res.status(500).json({ error: 'Failed to fetch crop stress data' });
+        }
+        if (format === 'json') {
+            // Small and nested; kept as the full response object
+            res.setHeader('Content-Type', 'application/json');
+            res.setHeader('Content-Disposition', 'attachment; filename="crop-stress-data.json"');
+            return res.json(cropStressData);
+        }
+        rows = cropStressData.regions.map(region => ({
+            name: region.name,
+            country: region.country,
+            riskLevel: region.riskLevel,
+            ...region.indicators,
+            overall: region.severity,
+            trend: region.trend,
+            confidence: region.confidence
+        }));
+    } else if (dataset === 'heatmap') {
+        const resolution = parseFloat(req.query.resolution || HEATMAP_RESOLUTION);
+        if (!(resolution >= 0.25 && resolution <= 90)) {
+            return res.status(400).json({ error: 'Resolution must be between 0.25 and 90 degrees' });
+        }
+        rows = heatmapPoints(resolution);
     } else {
-        res.status(400).json({ error: 'Unsupported format. Use json or csv.' });
+        const { region } = req.query;
+        const lat = parseFloat(req.query.lat);
+        const lon = parseFloat(req.query.lon);
+        let seriesKey;
+        if (region) {
+            if (!MONITORED_REGION_NAMES.has(region)) {
+                return res.status(400).json({ error: 'Unknown region. See /api/regions for the monitored regions.' });
+            }
+            seriesKey = `region:${region}`;
+        } else if (isValidCoordinate(lat, lon)) {
+            seriesKey = cellSeriesKey(lat, lon);
+        } else {
+            return res.status(400).json({ error: 'A monitored region or valid latitude and longitude are required' });
+        }
+        try {
+            rows = await historyStore.rows(seriesKey);
+        } catch (error) {
+            console.error('Error reading history data for export:', error);
+            return res.status(500).json({ error: 'Failed to read history data' });
+        }
     }
+    
+    streamExport(req, res, { format, columns: EXPORT_COLUMNS[dataset], rows, filename: `${dataset}-data` });
 });
 
 // Function to calculate crop stress based on weather data
@@ -167,10 +379,12 @@ async function calculateCropStress(regions) {
         regions: []
     };
 
-    for (const region of regions) {
+    // Fetch weather data for all regions from Open-Meteo in batched requests
+    const weatherResults = await weatherClient.fetchMany(regions);
+
+    for (const [index, region] of regions.entries()) {
         try {
-            // Fetch weather data from Open-Meteo
-            const weatherData = await fetchWeatherData(region.lat, region.lon);
+            const weatherData = weatherDataOrMock(weatherResults[index], region.name);
             
             // Calculate stress indicators
             const stressIndicators = calculateStressIndicators(weatherData, region);
@@ -198,6 +412,7 @@ async function calculateCropStress(regions) {
                 },
                 trend: stressIndicators.trend,
                 confidence: confidence,
+                simulated: Boolean(weatherData.simulated),
                 lastUpdated: new Date().toISOString(),
                 recommendations: generateRecommendations(riskLevel, region.name)
             });
@@ -211,21 +426,17 @@ async function calculateCropStress(regions) {
 
 // Fetch weather data from Open-Meteo API
 async function fetchWeatherData(lat, lon) {
-    try {
-        const response = await fetch(
-            `https://api.open-meteo.com/v1/forecast?latitude=${lat}&longitude=${lon}&current=temperature_2m,precipitation,relative_humidity_2m&daily=temperature_2m_max,temperature_2m_min,precipitation_sum&timezone=auto&past_days=14&forecast_days=14`
-        );
-        
-        if (!response.ok) {
-            throw new Error(`Open-Meteo API error: ${response.status}`);
-        }
-        
-        return await response.json();
-    } catch (error) {
-        console.error('Error fetching weather data:', error);
-        // Return mock data if API fails
-        return generateMockWeatherData();
+    const [result] = await weatherClient.fetchMany([{ lat, lon }]);
+    return weatherDataOrMock(result, `${lat}, ${lon}`);
+}
+
+// Unwrap a settled weather fetch, falling back to flagged mock data if it failed
+function weatherDataOrMock(result, label) {
+    if (result.status === 'fulfilled') {
+        return result.value;
     }
+    console.error(`Weather data unavailable for ${label}, using simulated data:`, result.reason.message);
+    return { ...generateMockWeatherData(), simulated: true };
 }
 
 // Generate mock weather data for demonstration
@@ -339,166 +550,92 @@ function generateRecommendations(riskLevel, regionName) {
     return recommendations[riskLevel] || recommendations.low;
 }
 
+// Persisted daily indicators per region and grid cell
+const historyStore = new HistoryStore({
+    dir: process.env.HISTORY_DIR || path.join(__dirname, '../data/history'),
+    generateDay: generateDailyIndicators,
+    maxSeries: Number(process.env.HISTORY_MAX_SERIES) || 5000
+});
+
 // Generate historical data for comparison with date range
-async function generateHistoricalData(region, period = '14days', customDate = null) {
-    const historicalData = [];
-    const now = new Date();
-    let numPoints = 14;
-    let intervalDays = 1;
-    
-    // Determine number of data points based on period
-    switch (period) {
-        case '7days':
-            numPoints = 7;
-            intervalDays = 1;
-            break;
-        case '14days':
-            numPoints = 14;
-            intervalDays = 1;
-            break;
-        case '1month':
-            numPoints = 30;
-            intervalDays = 1;
-            break;
-        case '3months':
-            numPoints = 12;
-            intervalDays = 7;
-            break;
-        case '6months':
-            numPoints = 26;
-            intervalDays = 7;
-            break;
-        case '1year':
-            numPoints = 52;
-            intervalDays = 7;
-            break;
-        case 'custom':
-            numPoints = 30;
-            intervalDays = 1;
-            break;
-        default:
-            numPoints = 14;
-            intervalDays = 1;
-    }
-    
-    for (let i = numPoints; i >= 0; i--) {
-        const date = new Date(now);
-        date.setDate(date.getDate() - (i * intervalDays));
-        
-        // Generate realistic seasonal patterns
-        const dayOfYear = Math.floor((date - new Date(date.getFullYear(), 0, 0)) / (1000 * 60 * 60 * 24));
-        const seasonalFactor = Math.sin((dayOfYear / 365) * 2 * Math.PI) * 0.3;
-        
-        historicalData.push({
-            date: date.toISOString().split('T')[0],
-            drought: Math.round(Math.max(0, Math.min(100, 35 + seasonalFactor * 20 + (Math.random() - 0.5) * 30))),
-            heat: Math.round(Math.max(0, Math.min(100, 40 + seasonalFactor * 25 + (Math.random() - 0.5) * 35))),
-            vegetation: Math.round(Math.max(0, Math.min(100, 45 + seasonalFactor * 20 + (Math.random() - 0.5) * 30))),
-            rainfall: Math.round(Math.max(0, Math.min(100, 30 + seasonalFactor * 30 + (Math.random() - 0.5) * 40))),
-            overall: Math.round(Math.max(0, Math.min(100, 38 + seasonalFactor * 22 + (Math.random() - 0.5) * 32))),
-            temperature: Math.round(20 + seasonalFactor * 10 + (Math.random() - 0.5) * 8),
-            precipitation: Math.round(Math.max(0, 50 + seasonalFactor * 40 + (Math.random() - 0.5) * 30))
-        });
-    }
-    
-    // Calculate trends
-    const recent = historicalData.slice(-7);
-    const older = historicalData.slice(0, 7);
-    const recentAvg = recent.reduce((sum, p) => sum + p.overall, 0) / recent.length;
-    const olderAvg = older.reduce((sum, p) => sum + p.overall, 0) / older.length;
+async function generateHistoricalData(region, period = '14days', customDate = null, seriesKey = `region:${region}`) {
+    const { historical, comparison, statistics } = await historyStore.query(seriesKey, period);
     
     return {
         region: region,
         period: period,
-        historical: historicalData,
-        comparison: {
-            weeklyChange: Math.round(recentAvg - (historicalData.slice(-14, -7).reduce((sum, p) => sum + p.overall, 0) / 7)),
-            monthlyChange: historicalData.length >= 28 ? Math.round(recentAvg - (historicalData.slice(0, 7).reduce((sum, p) => sum + p.overall, 0) / 7)) : null,
-            yearlyChange: null,
-            trend: recentAvg > olderAvg + 5 ? 'increasing' : recentAvg < olderAvg - 5 ? 'decreasing' : 'stable'
-        },
-        statistics: {
-            maxStress: Math.max(...historicalData.map(p => p.overall)),
-            minStress: Math.min(...historicalData.map(p => p.overall)),
-            avgStress: Math.round(historicalData.reduce((sum, p) => sum + p.overall, 0) / historicalData.length),
-            volatility: Math.round(calculateVolatility(historicalData))
-        }
+        historical: historical,
+        comparison: comparison,
+        statistics: statistics
+    };
+}
+
+// Indicators for a day that has no recorded history yet
+function generateDailyIndicators(date) {
+    // Generate realistic seasonal patterns
+    const dayOfYear = Math.floor((date - Date.UTC(date.getUTCFullYear(), 0, 0)) / (1000 * 60 * 60 * 24));
+    const seasonalFactor = Math.sin((dayOfYear / 365) * 2 * Math.PI) * 0.3;
+    
+    return {
+        drought: Math.round(Math.max(0, Math.min(100, 35 + seasonalFactor * 20 + (Math.random() - 0.5) * 30))),
+        heat: Math.round(Math.max(0, Math.min(100, 40 + seasonalFactor * 25 + (Math.random() - 0.5) * 35))),
+        vegetation: Math.round(Math.max(0, Math.min(100, 45 + seasonalFactor * 20 + (Math.random() - 0.5) * 30))),
+        rainfall: Math.round(Math.max(0, Math.min(100, 30 + seasonalFactor * 30 + (Math.random() - 0.5) * 40))),
+        overall: Math.round(Math.max(0, Math.min(100, 38 + seasonalFactor * 22 + (Math.random() - 0.5) * 32))),
+        temperature: Math.round(20 + seasonalFactor * 10 + (Math.random() - 0.5) * 8),
+        precipitation: Math.round(Math.max(0, 50 + seasonalFactor * 40 + (Math.random() - 0.5) * 30))
     };
 }
 
 // Generate historical data from coordinates
 async function generateHistoricalDataFromCoords(lat, lon, period = '14days') {
     // Determine climate zone based on coordinates
-    const climateZone = determineClimateZone(lat, lon);
+    const { climateZone } = locationZones.lookup(lat, lon);
     
     return await generateHistoricalData(
         `${lat.toFixed(2)}, ${lon.toFixed(2)} (${climateZone})`,
-        period
+        period,
+        null,
+        cellSeriesKey(lat, lon)
     );
 }
 
-// Determine climate zone from coordinates
-function determineClimateZone(lat, lon) {
-    const absLat = Math.abs(lat);
-    
-    if (absLat >= 0 && absLat < 23.5) {
-        return 'Tropical';
-    } else if (absLat >= 23.5 && absLat < 40) {
-        return 'Subtropical';
-    } else if (absLat >= 40 && absLat < 60) {
-        return 'Temperate';
-    } else {
-        return 'Boreal/Polar';
-    }
+// History is kept per 0.25° grid cell
+function cellSeriesKey(lat, lon) {
+    return `cell:${Math.floor(lat * 4) / 4},${Math.floor(lon * 4) / 4}`;
 }
 
-// Calculate volatility of stress data
-function calculateVolatility(data) {
-    if (data.length < 2) return 0;
-    const values = data.map(d => d.overall);
-    const mean = values.reduce((a, b) => a + b) / values.length;
-    const squaredDiffs = values.map(v => Math.pow(v - mean, 2));
-    const variance = squaredDiffs.reduce((a, b) => a + b) / values.length;
-    return Math.sqrt(variance);
+// Climate zone, nearest monitored region and nearest heat map cell of a point
+function lookupLocation(lat, lon) {
+    const { climateZone, landType, agricultural } = locationZones.lookup(lat, lon);
+    const region = regionIndex.nearest(lat, lon);
+    const cell = heatmapCellIndex.nearest(lat, lon);
+    
+    return {
+        coordinates: { latitude: lat, longitude: lon },
+        climateZone,
+        landType,
+        agricultural,
+        nearestRegion: {
+            name: region.item.name,
+            country: region.item.country,
+            distanceKm: Math.round(region.distanceKm)
+        },
+        nearestHeatmapCell: {
+            lat: cell.item.lat,
+            lon: cell.item.lon,
+            distanceKm: Math.round(cell.distanceKm)
+        },
+        historyCell: cellSeriesKey(lat, lon).slice('cell:'.length)
+    };
 }
 
 // Generate heat map data for global climate visualization
 async function generateHeatmapData() {
-    // Generate a grid of points for heat map visualization
-    const heatmapPoints = [];
-    const gridResolution = 15; // degrees
-    
-    for (let lat = -60; lat <= 80; lat += gridResolution) {
-        for (let lon = -180; lon <= 180; lon += gridResolution) {
-            // Skip areas with no agricultural significance
-            if (isNonAgriculturalZone(lat, lon)) continue;
-            
-            const climateZone = determineClimateZone(lat, lon);
-            const seasonalFactor = getSeasonalFactor();
-            
-            // Calculate stress based on climate zone and season
-            const stress = calculateRegionalStress(lat, climateZone, seasonalFactor);
-            
-            heatmapPoints.push({
-                lat: lat,
-                lon: lon,
-                intensity: stress.overall,
-                drought: stress.drought,
-                heat: stress.heat,
-                vegetation: stress.vegetation,
-                rainfall: stress.rainfall,
-                temperature: stress.temperature,
-                precipitation: stress.precipitation,
-                climateZone: climateZone,
-                type: getLandType(lat, lon)
-            });
-        }
-    }
-    
     return {
         timestamp: new Date().toISOString(),
-        resolution: `${gridResolution}°`,
-        points: heatmapPoints,
+        resolution: `${HEATMAP_RESOLUTION}°`,
+        points: Array.from(heatmapPoints(HEATMAP_RESOLUTION)),
         legend: {
             low: { min: 0, max: 29, color: '#388e3c', label: 'Low Stress' },
             medium: { min: 30, max: 49, color: '#fbc02d', label: 'Medium Stress' },
@@ -508,71 +645,6 @@ async function generateHeatmapData() {
     };
 }
 
-// Check if coordinates are non-agricultural zones
-function isNonAgriculturalZone(lat, lon) {
-    // Skip oceans and major deserts
-    const absLat = Math.abs(lat);
-    const absLon = Math.abs(lon);
-    
-    // High latitudes with ice
-    if (absLat > 75) return true;
-    
-    // Major desert regions
-    if (absLat >= 15 && absLat <= 35) {
-        if ((absLon >= 15 && absLon <= 40) || // Sahara
-            (absLon >= 110 && absLon <= 140) || // Australian desert
-            (absLon >= 65 && absLon <= 90)) { // Arabian desert
-            return true;
-        }
-    }
-    
-    return false;
-}
-
-// Get seasonal factor based on current date
-function getSeasonalFactor() {
-    const now = new Date();
-    const dayOfYear = Math.floor((now - new Date(now.getFullYear(), 0, 0)) / (1000 * 60 * 60 * 24));
-    return Math.sin((dayOfYear / 365) * 2 * Math.PI);
-}
-
-// Get land type based on coordinates
-function getLandType(lat, lon) {
-    const absLat = Math.abs(lat);
-    
-    if (absLat < 23.5) return 'Tropical';
-    if (absLat < 40) return 'Subtropical';
-    if (absLat < 60) return 'Temperate';
-    return 'Boreal';
-}
-
-// Calculate regional stress based on climate zone
-function calculateRegionalStress(lat, climateZone, seasonalFactor) {
-    // Base stress varies by climate zone
-    const baseStress = {
-        'Tropical': { drought: 35, heat: 55, vegetation: 40, rainfall: 30 },
-        'Subtropical': { drought: 45, heat: 60, vegetation: 45, rainfall: 35 },
-        'Temperate': { drought: 30, heat: 35, vegetation: 35, rainfall: 40 },
-        'Boreal/Polar': { drought: 20, heat: 15, vegetation: 25, rainfall: 45 }
-    };
-    
-    const base = baseStress[climateZone] || baseStress['Temperate'];
-    const seasonalVariation = seasonalFactor * 15;
-    
-    // Add some randomness
-    const randomVariation = () => (Math.random() - 0.5) * 20;
-    
-    return {
-        drought: Math.round(Math.max(0, Math.min(100, base.drought + seasonalVariation + randomVariation()))),
-        heat: Math.round(Math.max(0, Math.min(100, base.heat + seasonalVariation + randomVariation()))),
-        vegetation: Math.round(Math.max(0, Math.min(100, base.vegetation - seasonalVariation * 0.5 + randomVariation()))),
-        rainfall: Math.round(Math.max(0, Math.min(100, base.rainfall - seasonalVariation + randomVariation()))),
-        overall: Math.round(Math.max(0, Math.min(100, (base.drought + base.heat + base.vegetation) / 3 + seasonalVariation + randomVariation()))),
-        temperature: Math.round(15 + (Math.abs(lat) / 90) * 20 + seasonalFactor * 10 + randomVariation()),
-        precipitation: Math.round(Math.max(0, 50 + randomVariation() * 2))
-    };
-}
-
 // Get current location data
 async function getCurrentLocationData(lat, lon) {
     try {
@@ -583,7 +655,7 @@ async function getCurrentLocationData(lat, lon) {
         const stressIndicators = calculateStressIndicators(weatherData, { lat, lon });
         
         // Get climate zone
-        const climateZone = determineClimateZone(lat, lon);
+        const { climateZone } = locationZones.lookup(lat, lon);
         
         // Generate forecast
         const forecast = generateForecast(lat, lon);
@@ -622,7 +694,7 @@ async function getCurrentLocationData(lat, lon) {
 function generateForecast(lat, lon) {
     const forecast = [];
     const now = new Date();
-    const climateZone = determineClimateZone(lat, lon);
+    const { climateZone } = locationZones.lookup(lat, lon);
     
     for (let i = 0; i < 14; i++) {
         const date = new Date(now);
@@ -644,7 +716,7 @@ function generateForecast(lat, lon) {
 
 // Get mock current location data (fallback)
 function getMockCurrentLocationData(lat, lon) {
-    const climateZone = determineClimateZone(lat, lon);
+    const { climateZone } = locationZones.lookup(lat, lon);
     const stress = calculateRegionalStress(lat, climateZone, getSeasonalFactor());
     
     return {
@@ -672,17 +744,6 @@ function getMockCurrentLocationData(lat, lon) {
     };
 }
 
-// Generate CSV export
-function generateCSV(data) {
-    let csv = 'Region,Country,Risk Level,Drought Index,Heat Index,Vegetation Stress,Overall Stress,Trend,Confidence\n';
-    
-    for (const region of data.regions) {
-        csv += `"${region.name}","${region.country}","${region.riskLevel}",${region.indicators.drought},${region.indicators.heat},${region.indicators.vegetation},${region.severity},"${region.trend}",${region.confidence}\n`;
-    }
-    
-    return csv;
-}
-
 // Serve the main HTML file
 app.get('/', (req, res) => {
     res.sendFile(path.join(__dirname, '../frontend/index.html'));
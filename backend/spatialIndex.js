@@ -0,0 +1,209 @@
+// Spatial lookups for coordinates
+//
+// PointIndex answers nearest-point queries over a fixed set of locations
+// (monitored regions, heat map cells) with a KD-tree built on 3D unit
+// vectors, so distances are true great-circle distances with no special
+// cases at the antimeridian or the poles.
+//
+// ZoneRaster precomputes a classification function (climate zone, land
+// type, ...) on a regular lat/lon grid. A lookup is one array read; cells
+// that a boundary passes through are marked mixed and fall back to the
+// classification function, so results are always exact.
+
+const EARTH_RADIUS_KM = 6371;
+const DEG = Math.PI / 180;
+
+// Raster value of cells that must be classified point by point
+const MIXED = 255;
+
+function toUnitVector(lat, lon, out, offset) {
+    const cosLat = Math.cos(lat * DEG);
+    out[offset] = cosLat * Math.cos(lon * DEG);
+    out[offset + 1] = cosLat * Math.sin(lon * DEG);
+    out[offset + 2] = Math.sin(lat * DEG);
+}
+
+function isValidCoordinate(lat, lon) {
+    return Number.isFinite(lat) && Number.isFinite(lon) && Math.abs(lat) <= 90 && Math.abs(lon) <= 180;
+}
+
+class PointIndex {
+    // `items` need `lat` and `lon` properties; the index keeps references to them
+    constructor(items) {
+        this.items = Array.from(items);
+        const count = this.items.length;
+        this.coords = new Float64Array(count * 3);
+        this.items.forEach((item, i) => toUnitVector(item.lat, item.lon, this.coords, i * 3));
+
+        // Reorder `order` in place into an implicit tree: the node of the range
+        // [lo, hi] is its middle element, split on axis depth % 3
+        this.order = Uint32Array.from({ length: count }, (_, i) => i);
+        this.build(0, count - 1, 0);
+    }
+
+    get size() {
+        return this.items.length;
+    }
+
+    build(lo, hi, axis) {
+        if (hi <= lo) {
+            return;
+        }
+        const mid = (lo + hi) >> 1;
+        this.select(lo, hi, mid, axis);
+        this.build(lo, mid - 1, (axis + 1) % 3);
+        this.build(mid + 1, hi, (axis + 1) % 3);
+    }
+
+    // Quickselect: put the k-th smallest element of [lo, hi] on `axis` at k
+    select(lo, hi, k, axis) {
+        const { order, coords } = this;
+        const value = (i) => coords[order[i] * 3 + axis];
+        const swap = (i, j) => {
+            const tmp = order[i];
+            order[i] = order[j];
+            order[j] = tmp;
+        };
+        while (hi > lo) {
+            const pivot = value(k);
+            swap(k, hi);
+            let store = lo;
+            for (let i = lo; i < hi; i++) {
+                if (value(i) < pivot) {
+                    swap(i, store++);
+                }
+            }
+            swap(store, hi);
+            if (store === k) {
+                return;
+            }
+            if (store < k) {
+                lo = store + 1;
+            } else {
+                hi = store - 1;
+            }
+        }
+    }
+
+    // Closest item to a point as { item, distanceKm }, or null if the index is empty
+    nearest(lat, lon) {
+        if (this.items.length === 0) {
+            return null;
+        }
+        const target = new Float64Array(3);
+        toUnitVector(lat, lon, target, 0);
+        const best = { index: -1, distance: Infinity };
+        this.search(0, this.items.length - 1, 0, target, best);
+
+        // Squared chord length to great-circle distance
+        const chord = Math.sqrt(best.distance);
+        return {
+            item: this.items[best.index],
+            distanceKm: 2 * EARTH_RADIUS_KM * Math.asin(Math.min(1, chord / 2))
+        };
+    }
+
+    search(lo, hi, axis, target, best) {
+        if (hi < lo) {
+            return;
+        }
+        const mid = (lo + hi) >> 1;
+        const index = this.order[mid];
+        const offset = index * 3;
+        const dx = this.coords[offset] - target[0];
+        const dy = this.coords[offset + 1] - target[1];
+        const dz = this.coords[offset + 2] - target[2];
+        const distance = dx * dx + dy * dy + dz * dz;
+        if (distance < best.distance) {
+            best.distance = distance;
+            best.index = index;
+        }
+
+        const split = target[axis] - this.coords[offset + axis];
+        const next = (axis + 1) % 3;
+        const [near, far] = split < 0 ? [[lo, mid - 1], [mid + 1, hi]] : [[mid + 1, hi], [lo, mid - 1]];
+        this.search(near[0], near[1], next, target, best);
+        if (split * split < best.distance) {
+            this.search(far[0], far[1], next, target, best);
+        }
+    }
+}
+
+class ZoneRaster {
+    // `classify(lat, lon)` must return one of a small set of values (at most
+    // 255 distinct ones, compared by `keyOf`); boundaries narrower than half
+    // a cell could be missed, so keep `resolution` below the smallest feature
+    constructor(classify, { resolution = 0.5, keyOf = value => JSON.stringify(value) } = {}) {
+        this.classify = classify;
+        this.resolution = resolution;
+        this.rows = Math.round(180 / resolution);
+        this.cols = Math.round(360 / resolution);
+        this.values = [];
+        this.cells = new Uint8Array(this.rows * this.cols);
+
+        const codes = new Map();
+        const codeOf = (lat, lon) => {
+            const value = classify(lat, lon);
+            const key = keyOf(value);
+            let code = codes.get(key);
+            if (code === undefined) {
+                if (this.values.length === MIXED) {
+                    throw new Error('ZoneRaster supports at most 255 distinct values');
+                }
+                code = this.values.length;
+                codes.set(key, code);
+                this.values.push(value);
+            }
+            return code;
+        };
+
+        // Classify every grid vertex once; a cell is uniform when its four
+        // corners and its centre agree
+        const vertexCols = this.cols + 1;
+        let previous = new Uint8Array(vertexCols);
+        let current = new Uint8Array(vertexCols);
+        for (let col = 0; col < vertexCols; col++) {
+            previous[col] = codeOf(-90, -180 + col * resolution);
+        }
+        for (let row = 0; row < this.rows; row++) {
+            const top = -90 + (row + 1) * resolution;
+            for (let col = 0; col < vertexCols; col++) {
+                current[col] = codeOf(top, -180 + col * resolution);
+            }
+            const centerLat = top - resolution / 2;
+            for (let col = 0; col < this.cols; col++) {
+                const code = previous[col];
+                const uniform = code === previous[col + 1] && code === current[col] && code === current[col + 1] &&
+                    code === codeOf(centerLat, -180 + (col + 0.5) * resolution);
+                this.cells[row * this.cols + col] = uniform ? code : MIXED;
+            }
+            [previous, current] = [current, previous];
+        }
+    }
+
+    // Classification of a point; coordinates outside the grid are classified directly
+    lookup(lat, lon) {
+        const row = Math.floor((lat + 90) / this.resolution);
+        const col = Math.floor((lon + 180) / this.resolution);
+        if (row >= 0 && row < this.rows && col >= 0 && col < this.cols) {
+            const code = this.cells[row * this.cols + col];
+            if (code !== MIXED) {
+                return this.values[code];
+            }
+        }
+        return this.classify(lat, lon);
+    }
+
+    // Share of cells answered from the raster alone
+    get coverage() {
+        let uniform = 0;
+        for (const code of this.cells) {
+            if (code !== MIXED) {
+                uniform++;
+            }
+        }
+        return uniform / this.cells.length;
+    }
+}
+
+module.exports = { PointIndex, ZoneRaster, isValidCoordinate };
@@ -0,0 +1,157 @@
+// Synthetic stress model of the heat map grid
+//
+// Climate zones, seasonal factor and per-cell stress scores, shared by the
+// server and the offline tile build (backend/tilePyramid.js). crop_stress.py
+// is a vectorized NumPy version of the same formulas.
+
+const { ZoneRaster } = require('./spatialIndex');
+
+// Classification of every point (climate zone, land type, agricultural),
+// precomputed on a raster
+const locationZones = new ZoneRaster(classifyLocation, {
+    keyOf: zone => `${zone.climateZone}|${zone.landType}|${zone.agricultural}`
+});
+
+// Determine climate zone from coordinates
+function determineClimateZone(lat, lon) {
+    const absLat = Math.abs(lat);
+    
+    if (absLat >= 0 && absLat < 23.5) {
+        return 'Tropical';
+    } else if (absLat >= 23.5 && absLat < 40) {
+        return 'Subtropical';
+    } else if (absLat >= 40 && absLat < 60) {
+        return 'Temperate';
+    } else {
+        return 'Boreal/Polar';
+    }
+}
+
+// Classification of a point, precomputed into locationZones
+function classifyLocation(lat, lon) {
+    return {
+        climateZone: determineClimateZone(lat, lon),
+        landType: getLandType(lat, lon),
+        agricultural: !isNonAgriculturalZone(lat, lon)
+    };
+}
+
+// Yield the points of a heat map grid one at a time
+function* heatmapPoints(gridResolution) {
+    const seasonalFactor = getSeasonalFactor();
+    
+    for (const { lat, lon, climateZone, landType } of heatmapCells(gridResolution)) {
+        // Calculate stress based on climate zone and season
+        const stress = calculateRegionalStress(lat, climateZone, seasonalFactor);
+        
+        yield {
+            lat: lat,
+            lon: lon,
+            intensity: stress.overall,
+            drought: stress.drought,
+            heat: stress.heat,
+            vegetation: stress.vegetation,
+            rainfall: stress.rainfall,
+            temperature: stress.temperature,
+            precipitation: stress.precipitation,
+            climateZone: climateZone,
+            type: landType
+        };
+    }
+}
+
+// Yield the agricultural cells of a heat map grid
+function* heatmapCells(gridResolution) {
+    // Step by index so fractional resolutions do not accumulate rounding error
+    const latSteps = Math.floor(140 / gridResolution + 1e-9);
+    const lonSteps = Math.floor(360 / gridResolution + 1e-9);
+    
+    for (let i = 0; i <= latSteps; i++) {
+        const lat = -60 + i * gridResolution;
+        for (let j = 0; j <= lonSteps; j++) {
+            const lon = -180 + j * gridResolution;
+            const { climateZone, landType, agricultural } = locationZones.lookup(lat, lon);
+            // Skip areas with no agricultural significance
+            if (!agricultural) continue;
+            
+            yield { lat, lon, climateZone, landType };
+        }
+    }
+}
+
+// Check if coordinates are non-agricultural zones
+function isNonAgriculturalZone(lat, lon) {
+    // Skip oceans and major deserts
+    const absLat = Math.abs(lat);
+    const absLon = Math.abs(lon);
+    
+    // High latitudes with ice
+    if (absLat > 75) return true;
+    
+    // Major desert regions
+    if (absLat >= 15 && absLat <= 35) {
+        if ((absLon >= 15 && absLon <= 40) || // Sahara
+            (absLon >= 110 && absLon <= 140) || // Australian desert
+            (absLon >= 65 && absLon <= 90)) { // Arabian desert
+            return true;
+        }
+    }
+    
+    return false;
+}
+
+// Get seasonal factor based on current date
+function getSeasonalFactor() {
+    const now = new Date();
+    const dayOfYear = Math.floor((now - new Date(now.getFullYear(), 0, 0)) / (1000 * 60 * 60 * 24));
+    return Math.sin((dayOfYear / 365) * 2 * Math.PI);
+}
+
+// Get land type based on coordinates
+function getLandType(lat, lon) {
+    const absLat = Math.abs(lat);
+    
+    if (absLat < 23.5) return 'Tropical';
+    if (absLat < 40) return 'Subtropical';
+    if (absLat < 60) return 'Temperate';
+    return 'Boreal';
+}
+
+// Calculate regional stress based on climate zone
+function calculateRegionalStress(lat, climateZone, seasonalFactor) {
+    // Base stress varies by climate zone
+    const baseStress = {
+        'Tropical': { drought: 35, heat: 55, vegetation: 40, rainfall: 30 },
+        'Subtropical': { drought: 45, heat: 60, vegetation: 45, rainfall: 35 },
+        'Temperate': { drought: 30, heat: 35, vegetation: 35, rainfall: 40 },
+        'Boreal/Polar': { drought: 20, heat: 15, vegetation: 25, rainfall: 45 }
+    };
+    
+    const base = baseStress[climateZone] || baseStress['Temperate'];
+    const seasonalVariation = seasonalFactor * 15;
+    
+    // Add some randomness
+    const randomVariation = () => (Math.random() - 0.5) * 20;
+    
+    return {
+        drought: Math.round(Math.max(0, Math.min(100, base.drought + seasonalVariation + randomVariation()))),
+        heat: Math.round(Math.max(0, Math.min(100, base.heat + seasonalVariation + randomVariation()))),
+        vegetation: Math.round(Math.max(0, Math.min(100, base.vegetation - seasonalVariation * 0.5 + randomVariation()))),
+        rainfall: Math.round(Math.max(0, Math.min(100, base.rainfall - seasonalVariation + randomVariation()))),
+        overall: Math.round(Math.max(0, Math.min(100, (base.drought + base.heat + base.vegetation) / 3 + seasonalVariation + randomVariation()))),
+        temperature: Math.round(15 + (Math.abs(lat) / 90) * 20 + seasonalFactor * 10 + randomVariation()),
+        precipitation: Math.round(Math.max(0, 50 + randomVariation() * 2))
+    };
+}
+
+module.exports = {
+    locationZones,
+    classifyLocation,
+    determineClimateZone,
+    isNonAgriculturalZone,
+    getLandType,
+    getSeasonalFactor,
+    calculateRegionalStress,
+    heatmapCells,
+    heatmapPoints
+};
@@ -0,0 +1,438 @@
+// Precomputed tile pyramid for the heat map layer
+//
+// The stress grid is aggregated once per zoom level, to about TILE_BINS
+// cells across a tile, and cut into Web Mercator z/x/y tiles (the scheme
+// Leaflet uses), so a client only downloads the visible area at a density
+// that suits its zoom. Each tile is a small binary file; a build is an
+// immutable version directory, and a pointer file names the live one:
+//   <dir>/current                     name of the live version
+//   <dir>/<version>/metadata.json     zoom levels, resolutions and bounds
+//   <dir>/<version>/<z>/<x>/<y>.wcmt  one file per non-empty tile
+// A rebuild writes a new version, then renames a new pointer over `current`,
+// so readers always see one complete pyramid.
+//
+// Build it offline from the synthetic stress grid (the default), from the
+// output of crop_stress.py or from a heat map export of a running server:
+//   node backend/tilePyramid.js [--resolution 0.25] [--out data/tiles/heatmap]
+//   python crop_stress.py --output grid.npz && node backend/tilePyramid.js --input grid.npz
+//   curl -o heatmap.wcmx "http://localhost:3000/api/export/bin?dataset=heatmap&resolution=0.25"
+//   node backend/tilePyramid.js --input heatmap.wcmx
+
+const fs = require('fs');
+const path = require('path');
+const zlib = require('zlib');
+const crypto = require('crypto');
+const readline = require('readline');
+const { LRUCache } = require('./lruCache');
+const { decodeBinary } = require('./exportStream');
+const { heatmapPoints } = require('./stressModel');
+
+// Tile-local coordinates run from 0 to TILE_EXTENT - 1
+const TILE_EXTENT = 4096;
+// Target number of aggregated cells across one tile
+const TILE_BINS = 64;
+const MAX_MERCATOR_LAT = 85.0511287798;
+// Grid spacing of a build without --input, in degrees
+const DEFAULT_RESOLUTION = 0.25;
+
+// Pointer file naming the live version, and the names of version directories
+const CURRENT_FILE = 'current';
+const VERSION_PATTERN = /^v\d{8}T\d{9}Z-\d+$/;
+
+// Tile format, all integers little-endian:
+//   header:  "WCMT", uint8 version, uint32 cell count
+//   columns: uint16 x[count], uint16 y[count], uint8 intensity[count], uint8 peak[count]
+// x and y are the cell centre in tile coordinates; intensity is the mean and
+// peak the maximum stress of the grid points merged into the cell
+const TILE_MAGIC = Buffer.from('WCMT');
+const TILE_VERSION = 1;
+const TILE_HEADER_BYTES = 9;
+
+function tileX(lon, zoom) {
+    return ((lon + 180) / 360) * 2 ** zoom;
+}
+
+function tileY(lat, zoom) {
+    const phi = Math.max(-MAX_MERCATOR_LAT, Math.min(MAX_MERCATOR_LAT, lat)) * Math.PI / 180;
+    return ((1 - Math.log(Math.tan(phi) + 1 / Math.cos(phi)) / Math.PI) / 2) * 2 ** zoom;
+}
+
+// Grid spacing used at a zoom level: the source resolution doubled until
+// it is at least the width of one bin
+function levelResolution(zoom, resolution) {
+    const binDegrees = 360 / 2 ** zoom / TILE_BINS;
+    return resolution * 2 ** Math.max(0, Math.ceil(Math.log2(binDegrees / resolution) - 1e-9));
+}
+
+// Smallest zoom at which the source grid is shown at full resolution
+function nativeZoom(resolution) {
+    return Math.max(0, Math.ceil(Math.log2(360 / TILE_BINS / resolution) - 1e-9));
+}
+
+// Spacing of a regular grid: the smallest step between distinct latitudes
+function inferResolution(lat) {
+    const distinct = Array.from(new Set(lat)).sort((a, b) => a - b);
+    let step = Infinity;
+    for (let i = 1; i < distinct.length; i++) {
+        step = Math.min(step, distinct[i] - distinct[i - 1]);
+    }
+    return Number.isFinite(step) ? Math.round(step * 1e6) / 1e6 : 1;
+}
+
+function encodeTile(cells) {
+    const count = cells.length;
+    const buffer = Buffer.alloc(TILE_HEADER_BYTES + count * 6);
+    TILE_MAGIC.copy(buffer, 0);
+    buffer.writeUInt8(TILE_VERSION, 4);
+    buffer.writeUInt32LE(count, 5);
+    let offset = TILE_HEADER_BYTES;
+    for (const cell of cells) {
+        buffer.writeUInt16LE(cell.x, offset);
+        offset += 2;
+    }
+    for (const cell of cells) {
+        buffer.writeUInt16LE(cell.y, offset);
+        offset += 2;
+    }
+    for (const cell of cells) {
+        buffer.writeUInt8(cell.intensity, offset++);
+    }
+    for (const cell of cells) {
+        buffer.writeUInt8(cell.peak, offset++);
+    }
+    return buffer;
+}
+
+function decodeTile(buffer) {
+    if (!buffer.subarray(0, 4).equals(TILE_MAGIC)) {
+        throw new Error('Not a WCMT tile');
+    }
+    const count = buffer.readUInt32LE(5);
+    const cells = [];
+    for (let i = 0; i < count; i++) {
+        cells.push({
+            x: buffer.readUInt16LE(TILE_HEADER_BYTES + i * 2),
+            y: buffer.readUInt16LE(TILE_HEADER_BYTES + count * 2 + i * 2),
+            intensity: buffer.readUInt8(TILE_HEADER_BYTES + count * 4 + i),
+            peak: buffer.readUInt8(TILE_HEADER_BYTES + count * 5 + i)
+        });
+    }
+    return cells;
+}
+
+const min = (a, b) => Math.min(a, b);
+const max = (a, b) => Math.max(a, b);
+
+// Build every tile of the pyramid from grid points { lat, lon, intensity }.
+// Returns { metadata, tiles } with tiles a Map of "z/x/y" to encoded buffers.
+function buildPyramid(points, { resolution = null, maxZoom = null } = {}) {
+    const rows = Array.from(points);
+    const lat = Float64Array.from(rows, point => point.lat);
+    const lon = Float64Array.from(rows, point => point.lon);
+    const intensity = Float64Array.from(rows, point => point.intensity);
+    const sourceResolution = resolution || inferResolution(lat);
+    const topZoom = maxZoom === null ? nativeZoom(sourceResolution) : maxZoom;
+
+    const tiles = new Map();
+    const levels = [];
+    for (let zoom = 0; zoom <= topZoom; zoom++) {
+        const cellSize = levelResolution(zoom, sourceResolution);
+        const byTile = new Map();
+        for (const cell of aggregate(lat, lon, intensity, cellSize)) {
+            const x = tileX(cell.lon, zoom);
+            const y = tileY(cell.lat, zoom);
+            const column = Math.min(2 ** zoom - 1, Math.floor(x));
+            const row = Math.min(2 ** zoom - 1, Math.floor(y));
+            const key = `${zoom}/${column}/${row}`;
+            if (!byTile.has(key)) {
+                byTile.set(key, []);
+            }
+            byTile.get(key).push({
+                x: Math.min(TILE_EXTENT - 1, Math.floor((x - column) * TILE_EXTENT)),
+                y: Math.min(TILE_EXTENT - 1, Math.floor((y - row) * TILE_EXTENT)),
+                intensity: cell.intensity,
+                peak: cell.peak
+            });
+        }
+        for (const [key, cells] of byTile) {
+            tiles.set(key, encodeTile(cells));
+        }
+        levels.push({ zoom, resolution: cellSize, tiles: byTile.size });
+    }
+
+    const metadata = {
+        format: 'wcmt',
+        version: TILE_VERSION,
+        extent: TILE_EXTENT,
+        minZoom: 0,
+        maxZoom: topZoom,
+        resolution: sourceResolution,
+        bounds: rows.length ? [lon.reduce(min), lat.reduce(min), lon.reduce(max), lat.reduce(max)] : null,
+        points: rows.length,
+        levels,
+        generated: new Date().toISOString()
+    };
+    return { metadata, tiles };
+}
+
+// Merge grid points into cells of `cellSize` degrees: mean position,
+// rounded mean intensity and peak intensity of each non-empty cell
+function aggregate(lat, lon, intensity, cellSize) {
+    const cells = new Map();
+    for (let i = 0; i < lat.length; i++) {
+        const key = Math.floor((lat[i] + 90) / cellSize) * 1e6 + Math.floor((lon[i] + 180) / cellSize);
+        let cell = cells.get(key);
+        if (!cell) {
+            cell = { lat: 0, lon: 0, sum: 0, count: 0, peak: 0 };
+            cells.set(key, cell);
+        }
+        cell.lat += lat[i];
+        cell.lon += lon[i];
+        cell.sum += intensity[i];
+        cell.peak = Math.max(cell.peak, intensity[i]);
+        cell.count++;
+    }
+    return Array.from(cells.values(), cell => ({
+        lat: cell.lat / cell.count,
+        lon: cell.lon / cell.count,
+        intensity: Math.round(cell.sum / cell.count),
+        peak: Math.round(cell.peak)
+    }));
+}
+
+// Name of the live version of the pyramid in `dir`, or null if none was published
+function currentVersion(dir) {
+    try {
+        return fs.readFileSync(path.join(dir, CURRENT_FILE), 'utf8').trim() || null;
+    } catch (error) {
+        if (error.code === 'ENOENT') {
+            return null;
+        }
+        throw error;
+    }
+}
+
+// Write a pyramid to a new version directory in `dir` and publish it by
+// renaming a new pointer file over `current`. The previous version is kept
+// for requests that resolved it just before the swap; older ones are removed.
+function writePyramid(dir, { metadata, tiles }) {
+    const version = `v${new Date().toISOString().replace(/[-:.]/g, '')}-${process.pid}`;
+    const target = path.join(dir, version);
+    let bytes = 0;
+    for (const [key, buffer] of tiles) {
+        const file = path.join(target, `${key}.wcmt`);
+        fs.mkdirSync(path.dirname(file), { recursive: true });
+        fs.writeFileSync(file, buffer);
+        bytes += buffer.length;
+    }
+    fs.mkdirSync(target, { recursive: true });
+    fs.writeFileSync(path.join(target, 'metadata.json'),
+        `${JSON.stringify({ ...metadata, build: version, tileCount: tiles.size, bytes }, null, 2)}\n`);
+
+    const previous = currentVersion(dir);
+    const pointer = path.join(dir, `${CURRENT_FILE}.tmp-${process.pid}`);
+    fs.writeFileSync(pointer, `${version}\n`);
+    fs.renameSync(pointer, path.join(dir, CURRENT_FILE));
+
+    for (const entry of fs.readdirSync(dir)) {
+        if (VERSION_PATTERN.test(entry) && entry !== version && entry !== previous) {
+            fs.rmSync(path.join(dir, entry), { recursive: true, force: true });
+        }
+    }
+    return { version, tileCount: tiles.size, bytes };
+}
+
+// Serves tiles from the live version of a pyramid directory, keeping
+// recently used tiles in memory
+class TileStore {
+    constructor({ dir, maxEntries = 5000 }) {
+        this.dir = dir;
+        this.tiles = new LRUCache({ maxEntries, ttlMs: Infinity });
+        this.loadedMetadata = null;
+        this.version = null;
+        this.pointerStamp = null;
+    }
+
+    // Pyramid metadata, or null if no pyramid has been built; switches to a
+    // newly published version (a new pointer file, so a new inode)
+    metadata() {
+        let stat;
+        try {
+            stat = fs.statSync(path.join(this.dir, CURRENT_FILE));
+        } catch (error) {
+            this.loadedMetadata = null;
+            this.version = null;
+            this.pointerStamp = null;
+            return null;
+        }
+        const stamp = `${stat.ino}:${stat.mtimeMs}`;
+        if (stamp !== this.pointerStamp) {
+            const version = currentVersion(this.dir);
+            this.loadedMetadata = JSON.parse(fs.readFileSync(path.join(this.dir, version, 'metadata.json'), 'utf8'));
+            this.version = version;
+            this.pointerStamp = stamp;
+            this.tiles.clear();
+        }
+        return this.loadedMetadata;
+    }
+
+    // { body, etag } of a tile of the version loaded by metadata(), or null
+    // for an empty tile
+    get(zoom, x, y) {
+        if (this.version === null) {
+            return null;
+        }
+        const key = `${zoom}/${x}/${y}`;
+        let tile = this.tiles.get(key);
+        if (tile === undefined) {
+            const file = path.join(this.dir, this.version, String(zoom), String(x), `${y}.wcmt`);
+            if (fs.existsSync(file)) {
+                const body = fs.readFileSync(file);
+                const hash = crypto.createHash('sha1').update(body).digest('base64url');
+                tile = { body, etag: `"${hash}"` };
+            } else {
+                tile = null;
+            }
+            this.tiles.set(key, tile);
+        }
+        return tile;
+    }
+}
+
+// Numeric .npy dtypes, by descriptor without the byte order
+const NPY_TYPES = {
+    f8: Float64Array, f4: Float32Array,
+    i8: BigInt64Array, i4: Int32Array, i2: Int16Array, i1: Int8Array,
+    u8: BigUint64Array, u4: Uint32Array, u2: Uint16Array, u1: Uint8Array, b1: Uint8Array
+};
+
+// One-dimensional little-endian .npy array as a typed array (64-bit
+// integers as Float64Array)
+function decodeNpy(buffer, name) {
+    if (buffer.toString('latin1', 0, 6) !== '\x93NUMPY') {
+        throw new Error(`${name} is not a .npy array`);
+    }
+    const headerStart = buffer[6] === 1 ? 10 : 12;
+    const dataStart = headerStart + (buffer[6] === 1 ? buffer.readUInt16LE(8) : buffer.readUInt32LE(8));
+    const header = buffer.toString('latin1', headerStart, dataStart);
+    const descr = /'descr':\s*'([<|=])(\w+)'/.exec(header);
+    const Type = descr && NPY_TYPES[descr[2]];
+    if (!Type || !/'shape':\s*\(\d+,\)/.test(header)) {
+        throw new Error(`${name}: unsupported array ${header.trim()}`);
+    }
+    // Copied, since the data is not necessarily aligned for the typed array
+    const bytes = buffer.subarray(dataStart);
+    const array = new Type(bytes.length / Type.BYTES_PER_ELEMENT);
+    new Uint8Array(array.buffer).set(bytes);
+    return Type === BigInt64Array || Type === BigUint64Array ? Float64Array.from(array, Number) : array;
+}
+
+// Arrays of a NumPy .npz file (a zip of .npy files), by name
+function readNpz(buffer) {
+    // End of central directory record: after the entries, before an optional comment
+    const end = buffer.lastIndexOf(Buffer.from([0x50, 0x4b, 0x05, 0x06]));
+    if (end < 0) {
+        throw new Error('Not an .npz file');
+    }
+    const count = buffer.readUInt16LE(end + 10);
+    let offset = buffer.readUInt32LE(end + 16);
+    const arrays = {};
+    for (let i = 0; i < count; i++) {
+        if (buffer.readUInt32LE(offset) !== 0x02014b50) {
+            throw new Error('Corrupt .npz central directory');
+        }
+        const method = buffer.readUInt16LE(offset + 10);
+        const size = buffer.readUInt32LE(offset + 20);
+        const nameLength = buffer.readUInt16LE(offset + 28);
+        const local = buffer.readUInt32LE(offset + 42);
+        const name = buffer.toString('utf8', offset + 46, offset + 46 + nameLength);
+        if (size === 0xffffffff || local === 0xffffffff) {
+            throw new Error(`${name}: zip64 entries are not supported`);
+        }
+        if (method !== 0 && method !== 8) {
+            throw new Error(`${name}: unsupported compression method ${method}`);
+        }
+        // The local header has its own name and extra field lengths
+        const dataStart = local + 30 + buffer.readUInt16LE(local + 26) + buffer.readUInt16LE(local + 28);
+        const data = buffer.subarray(dataStart, dataStart + size);
+        arrays[name.replace(/\.npy$/, '')] = decodeNpy(method === 8 ? zlib.inflateRawSync(data) : data, name);
+        offset += 46 + nameLength + buffer.readUInt16LE(offset + 30) + buffer.readUInt16LE(offset + 32);
+    }
+    return arrays;
+}
+
+// Read grid points from a heat map export (.wcmx or .ndjson, optionally
+// .gz) or from a grid scored by crop_stress.py --output (.npz)
+async function readPoints(file) {
+    if (file.endsWith('.npz')) {
+        const { lat, lon, overall } = readNpz(fs.readFileSync(file));
+        if (!lat || !lon || !overall) {
+            throw new Error(`${file} has no lat, lon and overall arrays`);
+        }
+        return Array.from(lat, (value, i) => ({ lat: value, lon: lon[i], intensity: overall[i] }));
+    }
+    const gzipped = file.endsWith('.gz');
+    const name = gzipped ? file.slice(0, -3) : file;
+    if (name.endsWith('.ndjson')) {
+        let stream = fs.createReadStream(file);
+        if (gzipped) {
+            stream = stream.pipe(zlib.createGunzip());
+        }
+        const points = [];
+        for await (const line of readline.createInterface({ input: stream, crlfDelay: Infinity })) {
+            if (line.trim()) {
+                points.push(JSON.parse(line));
+            }
+        }
+        return points;
+    }
+    const buffer = fs.readFileSync(file);
+    return decodeBinary(gzipped ? zlib.gunzipSync(buffer) : buffer);
+}
+
+module.exports = {
+    TILE_EXTENT,
+    buildPyramid,
+    writePyramid,
+    encodeTile,
+    decodeTile,
+    levelResolution,
+    readNpz,
+    TileStore
+};
+
+if (require.main === module) {
+    const args = process.argv.slice(2);
+    const option = (name, fallback) => {
+        const index = args.indexOf(name);
+        return index >= 0 ? args[index + 1] : fallback;
+    };
+    const input = option('--input', null);
+    const out = option('--out', process.env.TILES_DIR || path.join(__dirname, '../data/tiles/heatmap'));
+    const maxZoom = option('--max-zoom', null);
+    const resolution = option('--resolution', null);
+
+    if (resolution !== null && !(Number(resolution) > 0)) {
+        console.error('Usage: node backend/tilePyramid.js [--input FILE] [--out DIR] [--max-zoom N] [--resolution DEG]');
+        process.exit(2);
+    }
+
+    (async () => {
+        const start = Date.now();
+        // Without --input, score the synthetic grid here, like the server does
+        const points = input ? await readPoints(input) : Array.from(
+            heatmapPoints(resolution === null ? DEFAULT_RESOLUTION : Number(resolution)),
+            ({ lat, lon, intensity }) => ({ lat, lon, intensity })
+        );
+        const pyramid = buildPyramid(points, {
+            resolution: resolution === null ? null : Number(resolution),
+            maxZoom: maxZoom === null ? null : Number(maxZoom)
+        });
+        const { version, tileCount, bytes } = writePyramid(out, pyramid);
+        console.log(`Built ${tileCount} tiles (${(bytes / 1024).toFixed(0)} KB) for zoom 0-${pyramid.metadata.maxZoom} ` +
+            `from ${points.length} points at ${pyramid.metadata.resolution}° in ${Date.now() - start}ms -> ${path.join(out, version)}`);
+    })().catch(error => {
+        console.error(`Tile build failed: ${error.message}`);
+        process.exitCode = 1;
+    });
+}
@@ -0,0 +1,193 @@
+// Open-Meteo fetch layer
+//
+// Coordinates are rounded and looked up in a TTL + LRU cache first. The
+// misses are sent to Open-Meteo in multi-location batches over keep-alive
+// connections, with a cap on how many batches are in flight at once.
+// Concurrent requests for the same location share one fetch.
+
+const http = require('http');
+const https = require('https');
+const { LRUCache } = require('./lruCache');
+
+const DEFAULT_BASE_URL = 'https://api.open-meteo.com/v1/forecast';
+const CURRENT_FIELDS = 'temperature_2m,precipitation,relative_humidity_2m';
+const DAILY_FIELDS = 'temperature_2m_max,temperature_2m_min,precipitation_sum';
+
+class WeatherFetchError extends Error {
+    constructor(message, status = null) {
+        super(message);
+        this.name = 'WeatherFetchError';
+        this.status = status;
+    }
+}
+
+class WeatherClient {
+    constructor({
+        baseUrl = process.env.OPEN_METEO_URL || DEFAULT_BASE_URL,
+        batchSize = 50,
+        concurrency = 4,
+        ttlMs = 30 * 60 * 1000,
+        maxEntries = 5000,
+        precision = 2,
+        pastDays = 14,
+        forecastDays = 14,
+        timeoutMs = 10000
+    } = {}) {
+        this.baseUrl = baseUrl;
+        this.batchSize = batchSize;
+        this.concurrency = concurrency;
+        this.precision = precision;
+        this.pastDays = pastDays;
+        this.forecastDays = forecastDays;
+        this.timeoutMs = timeoutMs;
+        this.cache = new LRUCache({ maxEntries, ttlMs });
+        this.inFlight = new Map();
+        this.queue = [];
+        this.activeBatches = 0;
+        // One keep-alive pool per client; sockets are reused across batches
+        const Agent = baseUrl.startsWith('https:') ? https.Agent : http.Agent;
+        this.transport = baseUrl.startsWith('https:') ? https : http;
+        this.agent = new Agent({ keepAlive: true, maxSockets: concurrency });
+        this.stats = { requests: 0, locationsFetched: 0, cacheHits: 0, coalesced: 0 };
+    }
+
+    // Fetch the forecast for one location
+    async fetchOne(lat, lon) {
+        const [result] = await this.fetchMany([{ lat, lon }]);
+        if (result.status === 'rejected') {
+            throw result.reason;
+        }
+        return result.value;
+    }
+
+    // Fetch forecasts for many locations; resolves like Promise.allSettled, in input order
+    fetchMany(locations) {
+        const pending = [];
+        const promises = locations.map(({ lat, lon }) => {
+            const key = this.cacheKey(lat, lon);
+
+            const cached = this.cache.get(key);
+            if (cached) {
+                this.stats.cacheHits++;
+                return Promise.resolve(cached);
+            }
+
+            const shared = this.inFlight.get(key);
+            if (shared) {
+                this.stats.coalesced++;
+                return shared;
+            }
+
+            let resolve;
+            let reject;
+            const promise = new Promise((res, rej) => {
+                resolve = res;
+                reject = rej;
+            });
+            this.inFlight.set(key, promise);
+            pending.push({ key, lat: this.round(lat), lon: this.round(lon), resolve, reject });
+            return promise;
+        });
+
+        for (let i = 0; i < pending.length; i += this.batchSize) {
+            this.enqueue(pending.slice(i, i + this.batchSize));
+        }
+
+        return Promise.allSettled(promises);
+    }
+
+    cacheKey(lat, lon) {
+        // The forecast window moves daily, so the UTC date is part of the key
+        const day = new Date().toISOString().slice(0, 10);
+        return `${this.round(lat)},${this.round(lon)}|${day}|${this.pastDays}/${this.forecastDays}`;
+    }
+
+    round(value) {
+        return Number(Number(value).toFixed(this.precision));
+    }
+
+    close() {
+        this.agent.destroy();
+    }
+
+    enqueue(batch) {
+        this.queue.push(batch);
+        this.drain();
+    }
+
+    drain() {
+        while (this.activeBatches < this.concurrency && this.queue.length > 0) {
+            const batch = this.queue.shift();
+            this.activeBatches++;
+            this.fetchBatch(batch).finally(() => {
+                this.activeBatches--;
+                this.drain();
+            });
+        }
+    }
+
+    async fetchBatch(batch) {
+        try {
+            const body = await this.getJson(this.batchUrl(batch));
+            // Open-Meteo returns a bare object for a single location and an array otherwise
+            const results = Array.isArray(body) ? body : [body];
+            if (results.length !== batch.length) {
+                throw new WeatherFetchError(
+                    `Open-Meteo returned ${results.length} locations for a batch of ${batch.length}`
+                );
+            }
+            this.stats.locationsFetched += batch.length;
+            batch.forEach((entry, i) => {
+                this.cache.set(entry.key, results[i]);
+                entry.resolve(results[i]);
+            });
+        } catch (error) {
+            batch.forEach(entry => entry.reject(error));
+        } finally {
+            batch.forEach(entry => this.inFlight.delete(entry.key));
+        }
+    }
+
+    batchUrl(batch) {
+        const params = new URLSearchParams({
+            latitude: batch.map(entry => entry.lat).join(','),
+            longitude: batch.map(entry => entry.lon).join(','),
+            current: CURRENT_FIELDS,
+            daily: DAILY_FIELDS,
+            timezone: 'auto',
+            past_days: String(this.pastDays),
+            forecast_days: String(this.forecastDays)
+        });
+        return `${this.baseUrl}?${params}`;
+    }
+
+    getJson(url) {
+        this.stats.requests++;
+        return new Promise((resolve, reject) => {
+            const request = this.transport.get(url, { agent: this.agent }, response => {
+                const chunks = [];
+                response.on('data', chunk => chunks.push(chunk));
+                response.on('end', () => {
+                    if (response.statusCode !== 200) {
+                        reject(new WeatherFetchError(`Open-Meteo API error: ${response.statusCode}`, response.statusCode));
+                        return;
+                    }
+                    try {
+                        resolve(JSON.parse(Buffer.concat(chunks).toString('utf8')));
+                    } catch (error) {
+                        reject(new WeatherFetchError(`Invalid JSON from Open-Meteo: ${error.message}`));
+                    }
+                });
+                response.on('error', reject);
+            });
+            request.setTimeout(this.timeoutMs, () => {
+                request.destroy(new WeatherFetchError(`Open-Meteo request timed out after ${this.timeoutMs}ms`));
+            });
+            request.on('error', error => {
+                reject(error instanceof WeatherFetchError ? error : new WeatherFetchError(error.message));
+            });
+        });
+    }
+}
+
+module.exports = { WeatherClient, WeatherFetchError };
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the ProjectAnalyzer in analyze_project.py.
+Generates a synthetic project tree, times each analysis phase separately and
+records each phase's peak memory, worker processes included. Results are written as JSON and can be compared against
+a stored baseline. Runs fully offline.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Set
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analyze_project import ProjectAnalyzer, AnalysisCache
+
+
+SIZE_PRESETS = {
+    "1k": 1_000,
+    "10k": 10_000,
+    "100k": 100_000,
+}
+
+# Sampled RSS is coarse, so small phases get this much headroom on top of
+# the relative memory tolerance before they count as a regression.
+MEMORY_SLACK_KB = 2048
+
+PHASES = [
+    "discover_files",
+    "analyze_python_files",
+    "analyze_typescript_files",
+    "generate_report",
+    "generate_json_report",
+]
+
+WORDS = [
+    "grid", "tile", "climate", "region", "stress", "layer", "cache", "index",
+    "rainfall", "drought", "heat", "vegetation", "contour", "dataset", "export",
+    "scenario", "ensemble", "projection", "forecast", "station", "raster", "mask",
+]
+
+
+class SyntheticProjectGenerator:
+    """Writes a deterministic project tree with Python and TypeScript sources."""
+
+    def __init__(self, root: Path, total_files: int, ts_ratio: float = 0.4,
+                 functions_per_file: int = 6, classes_per_file: int = 2,
+                 methods_per_class: int = 5, seed: int = 0):
+        self.root = Path(root)
+        self.total_files = total_files
+        self.ts_ratio = ts_ratio
+        self.functions_per_file = functions_per_file
+        self.classes_per_file = classes_per_file
+        self.methods_per_class = methods_per_class
+        self.rng = random.Random(seed)
+
+    def generate(self) -> Dict[str, int]:
+        """Generate the tree and return how many files of each kind were written."""
+        ts_files = int(self.total_files * self.ts_ratio)
+        py_files = self.total_files - ts_files
+
+        with open(self.root / "package.json", "w", encoding="utf-8") as f:
+            json.dump({"name": "synthetic", "version": "1.0.0", "dependencies": {"express": "^4.18.2"}}, f)
+
+        for i in range(py_files):
+            path = self.root / "climatemaps" / f"pkg{i // 100}" / f"module_{i}.py"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(self._python_source(i), encoding="utf-8")
+
+        for i in range(ts_files):
+            kind = ("service", "component", "util")[i % 3]
+            name = f"{self._word()}-{i}"
+            suffix = f".{kind}.ts" if kind != "util" else ".ts"
+            path = self.root / "climatemaps" / "client" / "src" / "app" / f"feature{i // 100}" / f"{name}{suffix}"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(self._typescript_source(kind, i), encoding="utf-8")
+
+        return {"python_files": py_files, "typescript_files": ts_files}
+
+    def _word(self) -> str:
+        return self.rng.choice(WORDS)
+
+    def _identifier(self) -> str:
+        return f"{self._word()}_{self._word()}"
+
+    def _args(self) -> str:
+        return ", ".join(self._word() for _ in range(self.rng.randint(0, 4)))
+
+    def _python_source(self, index: int) -> str:
+        lines = [f'"""Synthetic module {index} for analyzer benchmarks."""', "", "import os", ""]
+        for f in range(self.functions_per_file):
+            prefix = "async def" if self.rng.random() < 0.1 else "def"
+            lines.append(f"{prefix} {self._identifier()}_{f}({self._args()}):")
+            if self.rng.random() < 0.7:
+                lines.append(f'    """Compute the {self._word()} {self._word()} for a {self._word()}."""')
+            lines.extend([
+                "    total = 0",
+                "    for value in range(10):",
+                "        total += value * 2",
+                "    return total",
+                "",
+            ])
+        for c in range(self.classes_per_file):
+            lines.append(f"class {self._word().title()}{self._word().title()}{c}:")
+            lines.append(f'    """Manage {self._word()} state for the {self._word()} layer."""')
+            lines.append("")
+            for m in range(self.methods_per_class):
+                args = self._args()
+                lines.append(f"    def {self._identifier()}_{m}(self{', ' + args if args else ''}):")
+                if self.rng.random() < 0.5:
+                    lines.append(f'        """Return the {self._word()}."""')
+                lines.append("        return None")
+                lines.append("")
+        return "\n".join(lines)
+
+    def _typescript_source(self, kind: str, index: int) -> str:
+        name = f"{self._word().title()}{index}"
+        if kind == "service":
+            methods = "\n".join(
+                f"  {self._word()}{m}(id: string): Observable<any> {{\n    return this.http.get(id);\n  }}\n"
+                for m in range(self.methods_per_class)
+            )
+            return (
+                "import { Injectable } from '@angular/core';\n\n"
+                "@Injectable({ providedIn: 'root' })\n"
+                f"export class {name}Service {{\n"
+                "  constructor(private http: HttpClient) {}\n\n"
+                f"{methods}}}\n"
+            )
+        if kind == "component":
+            metadata = [
+                f"selector: 'app-{self._word()}-{index}'",
+                f"templateUrl: './{self._word()}.component.html'",
+                f"styleUrls: ['./{self._word()}.component.scss']",
+            ]
+            # Alternate between multi-line and one-line decorators.
+            if index % 2:
+                decorator = "@Component({ " + ", ".join(metadata) + " })\n"
+            else:
+                decorator = "@Component({\n  " + ",\n  ".join(metadata) + "\n})\n"
+            return (
+                "import { Component } from '@angular/core';\n\n"
+                f"{decorator}"
+                f"export class {name}Component {{\n"
+                "  ngOnInit(): void {}\n"
+                "}\n"
+            )
+        return "\n".join(
+            f"export function {self._word()}{f}(value: number, scale: number): number {{\n  return value * scale;\n}}\n"
+            for f in range(self.functions_per_file)
+        )
+
+
+class RSSSampler:
+    """Samples the resident set size of this process and its children on a thread.
+    
+    ru_maxrss only reports the highest RSS over the whole process lifetime, so
+    it cannot tell phases apart. Each ``phase()`` block records the highest
+    sampled RSS seen while it ran, summed over this process and every
+    descendant such as --jobs workers, and the growth over the RSS it started
+    with. Sampling reads /proc, so it is only available on Linux.
+    """
+
+    PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.available = Path("/proc/self/statm").exists()
+        self._peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @contextlib.contextmanager
+    def phase(self, results: Dict[str, Any]):
+        """Measure the block and store ``peak_rss_kb``/``rss_delta_kb`` in ``results``."""
+        if not self.available:
+            yield
+            return
+        start_kb = self.current_kb()
+        self._peak_kb = start_kb
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        try:
+            yield
+        finally:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+            results["peak_rss_kb"] = self._peak_kb
+            results["rss_delta_kb"] = self._peak_kb - start_kb
+
+    def current_kb(self) -> int:
+        """RSS of this process plus all of its descendants, in KiB."""
+        total = 0
+        for pid in self._process_tree(os.getpid()):
+            try:
+                with open(f"/proc/{pid}/statm") as f:
+                    total += int(f.read().split()[1]) * self.PAGE_KB
+            except (OSError, ValueError, IndexError):
+                # The process exited between listing and reading it.
+                continue
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        self._peak_kb = max(self._peak_kb, self.current_kb())
+
+    @staticmethod
+    def _process_tree(root: int) -> Set[int]:
+        pids = {root}
+        pending = [root]
+        while pending:
+            pid = pending.pop()
+            try:
+                tasks = os.listdir(f"/proc/{pid}/task")
+            except OSError:
+                continue
+            for tid in tasks:
+                try:
+                    with open(f"/proc/{pid}/task/{tid}/children") as f:
+                        children = [int(child) for child in f.read().split()]
+                except OSError:
+                    continue
+                for child in children:
+                    if child not in pids:
+                        pids.add(child)
+                        pending.append(child)
+        return pids
+
+
+def run_phases(tree: Path, jobs: int, discovery: str, cache_path: Optional[Path],
+               trace_memory: bool) -> Dict[str, Dict[str, float]]:
+    """Run one full analysis and time each phase."""
+    cache = AnalysisCache(str(cache_path)) if cache_path else None
+    analyzer = ProjectAnalyzer(str(tree), jobs=jobs, cache=cache, discovery_mode=discovery)
+    output_dir = Path(tempfile.mkdtemp(prefix="analyzer-bench-out-"))
+    steps = {
+        "discover_files": analyzer.discover_files,
+        "analyze_python_files": analyzer.analyze_python_files,
+        "analyze_typescript_files": analyzer.analyze_typescript_files,
+        "generate_report": lambda: analyzer.generate_report(str(output_dir / "PROJECT_ANALYSIS.md")),
+        "generate_json_report": lambda: analyzer.generate_json_report(str(output_dir / "PROJECT_ANALYSIS.json")),
+    }
+
+    results = {}
+    sampler = RSSSampler()
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for phase in PHASES:
+                if trace_memory:
+                    tracemalloc.start()
+                results[phase] = {}
+                with sampler.phase(results[phase]):
+                    wall_start = time.perf_counter()
+                    cpu_start = time.process_time()
+                    steps[phase]()
+                    results[phase]["wall_s"] = time.perf_counter() - wall_start
+                    results[phase]["cpu_s"] = time.process_time() - cpu_start
+                if trace_memory:
+                    results[phase]["traced_peak_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+                    tracemalloc.stop()
+    finally:
+        if cache:
+            cache.close()
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return results
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+                        memory_tolerance: float) -> List[str]:
+    """Return a description of every phase slower or larger than the baseline allows.
+    
+    Memory is compared on the per-phase peak RSS and, when both runs traced
+    it, the tracemalloc peak; metrics missing from either side are skipped.
+    """
+    regressions = []
+    for phase, current in results["phases"].items():
+        previous = baseline.get("phases", {}).get(phase)
+        if not previous:
+            continue
+        limit = previous["wall_s"] * (1 + tolerance)
+        if current["wall_s"] > limit:
+            regressions.append(
+                f"{phase}: {current['wall_s']:.3f}s > {previous['wall_s']:.3f}s baseline (+{tolerance:.0%} allowed)"
+            )
+        for metric in ("peak_rss_kb", "traced_peak_kb"):
+            if metric not in current or metric not in previous:
+                continue
+            limit = previous[metric] * (1 + memory_tolerance) + MEMORY_SLACK_KB
+            if current[metric] > limit:
+                regressions.append(
+                    f"{phase}: {metric} {current[metric]} KiB > {previous[metric]} KiB baseline "
+                    f"(+{memory_tolerance:.0%} and {MEMORY_SLACK_KB} KiB allowed)"
+                )
+    return regressions
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark ProjectAnalyzer on a synthetic project tree.")
+    parser.add_argument("--size", default="1k",
+                        help=f"Number of source files, or one of {', '.join(SIZE_PRESETS)} (default: 1k)")
+    parser.add_argument("--ts-ratio", type=float, default=0.4, help="Fraction of TypeScript files (default: 0.4)")
+    parser.add_argument("--functions", type=int, default=6, help="Functions per file (default: 6)")
+    parser.add_argument("--classes", type=int, default=2, help="Classes per Python file (default: 2)")
+    parser.add_argument("--methods", type=int, default=5, help="Methods per class/service (default: 5)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generator (default: 0)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Analyzer worker processes (default: 1)")
+    parser.add_argument("--discovery", choices=["auto", "git", "walk"], default="walk",
+                        help="Discovery strategy passed to the analyzer (default: walk)")
+    parser.add_argument("--warm-cache", action="store_true",
+                        help="Measure runs against a primed incremental cache instead of cold runs")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per phase; the fastest is kept (default: 3)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Also record tracemalloc peaks per phase (slows the run down)")
+    parser.add_argument("--tree-dir", default=None,
+                        help="Generate the tree here and keep it, instead of a temporary directory")
+    parser.add_argument("--output", default=None, help="Write results JSON to this file (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="Compare against this results JSON and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown relative to the baseline (default: 0.2 = 20%%)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.2,
+                        help="Allowed per-phase memory growth relative to the baseline (default: 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    total_files = SIZE_PRESETS.get(args.size) or int(args.size)
+
+    if args.tree_dir:
+        tree = Path(args.tree_dir)
+        tree.mkdir(parents=True, exist_ok=True)
+    else:
+        tree = Path(tempfile.mkdtemp(prefix="analyzer-bench-"))
+
+    try:
+        print(f"🏗  Generating {total_files} files in {tree}...", file=sys.stderr)
+        generator = SyntheticProjectGenerator(
+            tree, total_files, ts_ratio=args.ts_ratio, functions_per_file=args.functions,
+            classes_per_file=args.classes, methods_per_class=args.methods, seed=args.seed
+        )
+        counts = generator.generate()
+
+        cache_path = tree / "PROJECT_ANALYSIS.cache.db" if args.warm_cache else None
+        if cache_path:
+            run_phases(tree, args.jobs, args.discovery, cache_path, trace_memory=False)
+
+        # Each metric keeps its best value over the runs, so one noisy run
+        # does not skew either time or memory.
+        best = {}
+        for run in range(args.repeat):
+            print(f"⏱  Run {run + 1}/{args.repeat}...", file=sys.stderr)
+            for phase, timing in run_phases(tree, args.jobs, args.discovery, cache_path, args.trace_memory).items():
+                kept = best.setdefault(phase, {})
+                for metric, value in timing.items():
+                    kept[metric] = min(kept.get(metric, value), value)
+    finally:
+        if not args.tree_dir:
+            shutil.rmtree(tree, ignore_errors=True)
+
+    results = {
+        "benchmark": "analyzer",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "files": total_files,
+            **counts,
+            "functions_per_file": args.functions,
+            "classes_per_file": args.classes,
+            "methods_per_class": args.methods,
+            "seed": args.seed,
+            "jobs": args.jobs,
+            "discovery": args.discovery,
+            "warm_cache": args.warm_cache,
+            "repeat": args.repeat,
+        },
+        "phases": best,
+        "total_wall_s": sum(timing["wall_s"] for timing in best.values()),
+        "files_per_s": total_files / max(sum(best[p]["wall_s"] for p in PHASES[1:3]), 1e-9),
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"✓ Results saved to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.memory_tolerance)
+        if regressions:
+            print("❌ Regressions against baseline:", file=sys.stderr)
+            for line in regressions:
+                print(f"  • {line}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ No regressions against baseline", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+// Load test for the World Crop Monitor API
+//
+// Starts the server in a child process against an in-process Open-Meteo
+// stub (so runs are offline and reproducible), drives a weighted mix of
+// requests with a fixed number of concurrent clients, and reports
+// throughput and p50/p95/p99 latency per endpoint. With --baseline the run
+// fails when an endpoint is slower or has lower throughput than the stored
+// baseline allows.
+//
+//   node benchmarks/loadTest.js --concurrency 32 --duration 20
+//   node benchmarks/loadTest.js --baseline benchmarks/baseline.json
+//   node benchmarks/loadTest.js --update-baseline benchmarks/baseline.json
+//
+// Options:
+//   --concurrency N      concurrent clients (default 16)
+//   --duration S         measured seconds (default 15)
+//   --warmup S           unmeasured seconds first (default 3)
+//   --mix FILE           request mix (default benchmarks/mix.json)
+//   --stub-latency MS    delay of every stub response (default 20)
+//   --seed N             seed for the request sequence (default 1)
+//   --baseline FILE      compare with FILE and exit 1 on a regression
+//   --tolerance F        allowed relative regression (default 0.3)
+//   --slack-ms MS        allowed absolute latency regression (default 5)
+//   --update-baseline F  write this run's results to F
+//   --json FILE          write this run's results to FILE
+
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const http = require('http');
+const { spawn } = require('child_process');
+const { createOpenMeteoStub, seededRandom } = require('../backend/openMeteoStub');
+const { PERIODS } = require('../backend/historyStore');
+
+const ROOT = path.join(__dirname, '..');
+const REGIONS = ['Sahel Region', 'East Africa', 'South Asia', 'Southeast Asia', 'Southern Africa',
+    'Central America', 'West Africa', 'Middle East', 'Australia', 'Brazil', 'Ukraine', 'United States'];
+
+function parseArgs(argv) {
+    const options = {
+        concurrency: 16,
+        duration: 15,
+        warmup: 3,
+        mix: path.join(__dirname, 'mix.json'),
+        stubLatency: 20,
+        seed: 1,
+        baseline: null,
+        tolerance: 0.3,
+        slackMs: 5,
+        updateBaseline: null,
+        json: null
+    };
+    const numeric = new Set(['concurrency', 'duration', 'warmup', 'stubLatency', 'seed', 'tolerance', 'slackMs']);
+
+    for (let i = 0; i < argv.length; i++) {
+        const name = argv[i].replace(/^--/, '').replace(/-([a-z])/g, (_, letter) => letter.toUpperCase());
+        if (!(name in options) || i + 1 >= argv.length) {
+            throw new Error(`Unknown or incomplete option: ${argv[i]}`);
+        }
+        const value = argv[++i];
+        options[name] = numeric.has(name) ? Number(value) : value;
+        if (numeric.has(name) && !(options[name] >= 0)) {
+            throw new Error(`${argv[i - 1]} must be a non-negative number`);
+        }
+    }
+    return options;
+}
+
+// Pick mix entries by weight and fill in their path placeholders
+function requestPicker(mix, random) {
+    const totalWeight = mix.reduce((sum, entry) => sum + (entry.weight || 1), 0);
+    const choose = (values) => values[Math.floor(random() * values.length)];
+    const placeholders = {
+        region: () => encodeURIComponent(choose(REGIONS)),
+        period: () => choose(Object.keys(PERIODS).filter(period => period !== 'custom')),
+        lat: () => (random() * 120 - 50).toFixed(2),
+        lon: () => (random() * 360 - 180).toFixed(2)
+    };
+
+    return () => {
+        let pick = random() * totalWeight;
+        const entry = mix.find(candidate => (pick -= candidate.weight || 1) < 0) || mix[mix.length - 1];
+        const requestPath = entry.path.replace(/\{(\w+)\}/g, (match, name) =>
+            placeholders[name] ? placeholders[name]() : match);
+        return { name: entry.name, path: requestPath };
+    };
+}
+
+// Find a free local port
+function freePort() {
+    return new Promise((resolve, reject) => {
+        const server = http.createServer();
+        server.unref();
+        server.on('error', reject);
+        server.listen(0, '127.0.0.1', () => {
+            const { port } = server.address();
+            server.close(() => resolve(port));
+        });
+    });
+}
+
+function get(agent, port, requestPath) {
+    return new Promise((resolve, reject) => {
+        const request = http.get({ host: '127.0.0.1', port, path: requestPath, agent }, (response) => {
+            response.on('data', () => {});
+            response.on('end', () => resolve(response.statusCode));
+            response.on('error', reject);
+        });
+        request.on('error', reject);
+    });
+}
+
+// Start the server and wait until it answers
+async function startServer({ port, weatherUrl, historyDir }) {
+    const child = spawn(process.execPath, [path.join(ROOT, 'backend', 'server.js')], {
+        cwd: ROOT,
+        env: { ...process.env, PORT: String(port), OPEN_METEO_URL: weatherUrl, HISTORY_DIR: historyDir },
+        stdio: ['ignore', 'ignore', 'pipe']
+    });
+    let stderr = '';
+    child.stderr.on('data', chunk => {
+        stderr += chunk;
+    });
+
+    const agent = new http.Agent();
+    const deadline = Date.now() + 15000;
+    while (Date.now() < deadline) {
+        if (child.exitCode !== null) {
+            throw new Error(`Server exited with code ${child.exitCode}:\n${stderr}`);
+        }
+        try {
+            if (await get(agent, port, '/api/regions') === 200) {
+                agent.destroy();
+                return child;
+            }
+        } catch (error) {
+            // Not listening yet
+        }
+        await new Promise(resolve => setTimeout(resolve, 100));
+    }
+    child.kill();
+    throw new Error(`Server did not start within 15s:\n${stderr}`);
+}
+
+// Run `concurrency` clients back to back until `until`; returns latencies by endpoint
+async function drive({ port, concurrency, until, nextRequest }) {
+    const agent = new http.Agent({ keepAlive: true, maxSockets: concurrency });
+    const results = {};
+
+    const client = async () => {
+        while (Date.now() < until) {
+            const { name, path: requestPath } = nextRequest();
+            const result = results[name] || (results[name] = { latencies: [], errors: 0 });
+            const start = process.hrtime.bigint();
+            try {
+                const status = await get(agent, port, requestPath);
+                if (status >= 400) {
+                    result.errors++;
+                }
+            } catch (error) {
+                result.errors++;
+            }
+            result.latencies.push(Number(process.hrtime.bigint() - start) / 1e6);
+        }
+    };
+
+    await Promise.all(Array.from({ length: concurrency }, client));
+    agent.destroy();
+    return results;
+}
+
+// Nearest-rank percentile of sorted values
+function percentile(sorted, p) {
+    if (sorted.length === 0) {
+        return 0;
+    }
+    return sorted[Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1)];
+}
+
+function summarize(results, seconds) {
+    const endpoints = {};
+    for (const name of Object.keys(results).sort()) {
+        const { latencies, errors } = results[name];
+        const sorted = Float64Array.from(latencies).sort();
+        const round = value => Math.round(value * 100) / 100;
+        endpoints[name] = {
+            requests: sorted.length,
+            errors,
+            rps: round(sorted.length / seconds),
+            p50: round(percentile(sorted, 50)),
+            p95: round(percentile(sorted, 95)),
+            p99: round(percentile(sorted, 99)),
+            max: round(sorted.length ? sorted[sorted.length - 1] : 0)
+        };
+    }
+    return endpoints;
+}
+
+function printTable(endpoints) {
+    const header = ['endpoint', 'requests', 'errors', 'rps', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms'];
+    const rows = Object.entries(endpoints).map(([name, stats]) =>
+        [name, stats.requests, stats.errors, stats.rps, stats.p50, stats.p95, stats.p99, stats.max].map(String));
+    const widths = header.map((title, i) => Math.max(title.length, ...rows.map(row => row[i].length)));
+    const line = cells => cells.map((cell, i) => (i === 0 ? cell.padEnd(widths[i]) : cell.padStart(widths[i])))
+        .join('  ');
+    console.log(line(header));
+    rows.forEach(row => console.log(line(row)));
+}
+
+// Regressions of `endpoints` against a baseline run, as readable messages
+function compareWithBaseline(endpoints, baseline, { tolerance, slackMs }) {
+    const regressions = [];
+    for (const [name, expected] of Object.entries(baseline.endpoints)) {
+        const actual = endpoints[name];
+        if (!actual) {
+            regressions.push(`${name}: no requests in this run`);
+            continue;
+        }
+        if (actual.errors > expected.errors) {
+            regressions.push(`${name}: ${actual.errors} errors (baseline ${expected.errors})`);
+        }
+        for (const metric of ['p50', 'p95', 'p99']) {
+            const limit = expected[metric] * (1 + tolerance) + slackMs;
+            if (actual[metric] > limit) {
+                regressions.push(`${name}: ${metric} ${actual[metric]} ms > ${limit.toFixed(2)} ms ` +
+                    `(baseline ${expected[metric]} ms)`);
+            }
+        }
+        const minimumRps = expected.rps * (1 - tolerance);
+        if (actual.rps < minimumRps) {
+            regressions.push(`${name}: ${actual.rps} rps < ${minimumRps.toFixed(2)} rps (baseline ${expected.rps} rps)`);
+        }
+    }
+    return regressions;
+}
+
+async function main() {
+    const options = parseArgs(process.argv.slice(2));
+    const mix = JSON.parse(fs.readFileSync(options.mix, 'utf8'));
+    const historyDir = fs.mkdtempSync(path.join(os.tmpdir(), 'crop-monitor-bench-'));
+
+    const stub = createOpenMeteoStub({ latencyMs: options.stubLatency });
+    await new Promise(resolve => stub.listen(0, '127.0.0.1', resolve));
+    const weatherUrl = `http://127.0.0.1:${stub.address().port}/v1/forecast`;
+    const port = await freePort();
+
+    let server;
+    try {
+        server = await startServer({ port, weatherUrl, historyDir });
+        const nextRequest = requestPicker(mix, seededRandom(options.seed));
+
+        console.log(`Warming up for ${options.warmup}s with ${options.concurrency} clients...`);
+        await drive({ port, concurrency: options.concurrency, until: Date.now() + options.warmup * 1000, nextRequest });
+
+        console.log(`Measuring for ${options.duration}s...`);
+        const start = Date.now();
+        const results = await drive({
+            port,
+            concurrency: options.concurrency,
+            until: start + options.duration * 1000,
+            nextRequest
+        });
+        const seconds = (Date.now() - start) / 1000;
+        const endpoints = summarize(results, seconds);
+        const total = Object.values(endpoints).reduce((sum, stats) => sum + stats.requests, 0);
+
+        console.log('');
+        printTable(endpoints);
+        console.log(`\n${total} requests in ${seconds.toFixed(1)}s (${(total / seconds).toFixed(1)} rps), ` +
+            `${stub.requestCount} upstream requests`);
+
+        const run = {
+            timestamp: new Date().toISOString(),
+            settings: {
+                concurrency: options.concurrency,
+                duration: options.duration,
+                stubLatency: options.stubLatency,
+                seed: options.seed,
+                mix: path.relative(ROOT, path.resolve(options.mix))
+            },
+            machine: { node: process.version, cpus: os.cpus().length, platform: os.platform() },
+            endpoints
+        };
+        for (const file of [options.json, options.updateBaseline].filter(Boolean)) {
+            fs.writeFileSync(file, `${JSON.stringify(run, null, 2)}\n`);
+            console.log(`Results written to ${file}`);
+        }
+
+        if (options.baseline) {
+            const baseline = JSON.parse(fs.readFileSync(options.baseline, 'utf8'));
+            const changed = ['concurrency', 'stubLatency', 'mix']
+                .filter(setting => baseline.settings && baseline.settings[setting] !== run.settings[setting]);
+            if (changed.length) {
+                console.warn(`\nWarning: settings differ from the baseline run: ${changed.join(', ')}`);
+            }
+            const regressions = compareWithBaseline(endpoints, baseline, options);
+            if (regressions.length) {
+                console.error(`\n${regressions.length} regression(s) against ${options.baseline}:`);
+                regressions.forEach(message => console.error(`  - ${message}`));
+                process.exitCode = 1;
+            } else {
+                console.log(`\nNo regressions against ${options.baseline}`);
+            }
+        }
+    } finally {
+        if (server) {
+            server.kill();
+        }
+        stub.close();
+        fs.rmSync(historyDir, { recursive: true, force: true });
+    }
+}
+
+if (require.main === module) {
+    main().catch(error => {
+        console.error(error.message);
+        process.exitCode = 2;
+    });
+}
+
+module.exports = { percentile, summarize, compareWithBaseline };
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Batch crop-stress scoring for World Crop Monitor 1.0
+Vectorized NumPy versions of the stress formulas in backend/server.js and
+backend/stressModel.js. Scores whole arrays of locations (and days) in one pass
+instead of one region at a time, with the same thresholds and rounding as the
+JavaScript functions.
+"""
+
+import sys
+import time
+import argparse
+from datetime import date
+from typing import Dict, Optional, NamedTuple
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("crop_stress requires NumPy; install it with `pip install -r requirements.txt`") from e
+
+
+# Index order of the integer codes returned for risk levels, trends and zones.
+RISK_LEVELS = ("low", "medium", "high", "critical")
+RISK_THRESHOLDS = (30, 50, 70)
+TRENDS = ("stable", "increasing", "decreasing")
+CLIMATE_ZONES = ("Tropical", "Subtropical", "Temperate", "Boreal/Polar")
+ZONE_LATITUDES = (23.5, 40, 60)
+
+# Per-zone base values used by calculateRegionalStress, in CLIMATE_ZONES order.
+ZONE_BASE_STRESS = {
+    "drought": np.array([35, 45, 30, 20], dtype=np.float64),
+    "heat": np.array([55, 60, 35, 15], dtype=np.float64),
+    "vegetation": np.array([40, 45, 35, 25], dtype=np.float64),
+    "rainfall": np.array([30, 35, 40, 45], dtype=np.float64),
+}
+
+
+class StressIndicators(NamedTuple):
+    """Per-location results of calculateStressIndicators, as arrays."""
+    drought: np.ndarray
+    heat: np.ndarray
+    vegetation: np.ndarray
+    rainfall: np.ndarray
+    overall: np.ndarray
+    # Index into TRENDS
+    trend: np.ndarray
+    temperature: np.ndarray
+    rainfall_total: np.ndarray
+
+
+class RegionalStress(NamedTuple):
+    """Per-cell results of calculateRegionalStress, as arrays."""
+    drought: np.ndarray
+    heat: np.ndarray
+    vegetation: np.ndarray
+    rainfall: np.ndarray
+    overall: np.ndarray
+    temperature: np.ndarray
+    precipitation: np.ndarray
+
+
+class HeatmapGrid(NamedTuple):
+    """Agricultural cells of a global grid and their stress scores."""
+    lat: np.ndarray
+    lon: np.ndarray
+    # Index into CLIMATE_ZONES
+    zone: np.ndarray
+    stress: RegionalStress
+    # Index into RISK_LEVELS
+    risk: np.ndarray
+
+
+def js_round(values: np.ndarray) -> np.ndarray:
+    """Round like JavaScript's Math.round: halves go towards +infinity.
+
+    np.round rounds halves to even, which would put e.g. an overall score of
+    69.5 in the "high" band instead of "critical".
+    """
+    return np.floor(np.asarray(values, dtype=np.float64) + 0.5)
+
+
+def _sequential_sum(values: np.ndarray) -> np.ndarray:
+    """Sum over the last axis strictly left to right, like Array.reduce.
+
+    NumPy's pairwise summation can differ in the last bit, which is enough to
+    move a score across a rounding boundary. The day axis is short, so the
+    loop is over days while every location is summed at once.
+    """
+    total = np.zeros(values.shape[:-1], dtype=np.float64)
+    for day in range(values.shape[-1]):
+        total += values[..., day]
+    return total
+
+
+def _daily(values) -> np.ndarray:
+    # Open-Meteo reports missing days as null, which Array.reduce adds as 0.
+    return np.nan_to_num(np.asarray(values, dtype=np.float64), nan=0.0)
+
+
+def stress_indicators(temperature_max, temperature_min, precipitation) -> StressIndicators:
+    """Score locations from daily weather, like calculateStressIndicators.
+
+    Each argument has shape ``(..., days)``: one row of daily values per
+    location, in Open-Meteo's order. Missing values (NaN) count as zero, as
+    they do in the JavaScript version. The trend compares the first seven
+    days with the next seven.
+    """
+    temperature_max = _daily(temperature_max)
+    temperature_min = _daily(temperature_min)
+    precipitation = _daily(precipitation)
+
+    avg_temp_max = _sequential_sum(temperature_max) / temperature_max.shape[-1]
+    avg_temp_min = _sequential_sum(temperature_min) / temperature_min.shape[-1]
+    avg_temp = (avg_temp_max + avg_temp_min) / 2
+    total_rainfall = _sequential_sum(precipitation)
+
+    drought = np.clip(50 - total_rainfall, 0, 100)
+    heat = np.clip((avg_temp - 28) * 10, 0, 100)
+    vegetation = np.minimum(100, drought * 0.6 + heat * 0.4)
+    rainfall = np.clip(50 - total_rainfall, 0, 100)
+
+    recent = _sequential_sum(precipitation[..., 0:7])
+    previous = _sequential_sum(precipitation[..., 7:14])
+    trend = np.where(recent < previous, 1, np.where(recent > previous, 2, 0)).astype(np.int8)
+
+    return StressIndicators(
+        drought=js_round(drought),
+        heat=js_round(heat),
+        vegetation=js_round(vegetation),
+        rainfall=js_round(rainfall),
+        overall=js_round((drought + heat + vegetation) / 3),
+        trend=trend,
+        temperature=js_round(avg_temp),
+        rainfall_total=js_round(total_rainfall),
+    )
+
+
+def risk_levels(overall) -> np.ndarray:
+    """Classify overall scores like determineRiskLevel; returns indexes into RISK_LEVELS."""
+    return np.digitize(np.asarray(overall, dtype=np.float64), RISK_THRESHOLDS).astype(np.int8)
+
+
+def volatility(series, axis: int = -1) -> np.ndarray:
+    """Population standard deviation of each series, the historical "volatility" statistic.
+
+    Series with fewer than two values have a volatility of 0.
+    """
+    values = np.moveaxis(np.asarray(series, dtype=np.float64), axis, -1)
+    count = values.shape[-1]
+    if count < 2:
+        return np.zeros(values.shape[:-1], dtype=np.float64)
+    mean = _sequential_sum(values) / count
+    return np.sqrt(_sequential_sum((values - mean[..., np.newaxis]) ** 2) / count)
+
+
+def climate_zones(lat) -> np.ndarray:
+    """Climate zone of each latitude, like determineClimateZone; indexes into CLIMATE_ZONES."""
+    return np.digitize(np.abs(np.asarray(lat, dtype=np.float64)), ZONE_LATITUDES).astype(np.int8)
+
+
+def non_agricultural_mask(lat, lon) -> np.ndarray:
+    """True where isNonAgriculturalZone would skip the cell (ice and major deserts)."""
+    abs_lat = np.abs(np.asarray(lat, dtype=np.float64))
+    abs_lon = np.abs(np.asarray(lon, dtype=np.float64))
+    deserts = (
+        ((abs_lon >= 15) & (abs_lon <= 40))
+        | ((abs_lon >= 110) & (abs_lon <= 140))
+        | ((abs_lon >= 65) & (abs_lon <= 90))
+    )
+    return (abs_lat > 75) | ((abs_lat >= 15) & (abs_lat <= 35) & deserts)
+
+
+def seasonal_factor(day: Optional[date] = None) -> float:
+    """Seasonal factor for a day, like getSeasonalFactor (default: today)."""
+    day = day or date.today()
+    return float(np.sin(day.timetuple().tm_yday / 365 * 2 * np.pi))
+
+
+def regional_stress(lat, factor: float, rng: Optional[np.random.Generator] = None) -> RegionalStress:
+    """Synthetic stress for grid cells, like calculateRegionalStress.
+
+    Every cell gets its own independent ±10 random variation per indicator,
+    as each call to randomVariation() does in the JavaScript version.
+    """
+    rng = rng or np.random.default_rng()
+    lat = np.asarray(lat, dtype=np.float64)
+    zone = climate_zones(lat)
+    base = {name: values[zone] for name, values in ZONE_BASE_STRESS.items()}
+    seasonal = factor * 15
+
+    def variation() -> np.ndarray:
+        return (rng.random(lat.shape) - 0.5) * 20
+
+    def score(values: np.ndarray) -> np.ndarray:
+        return js_round(np.clip(values, 0, 100))
+
+    return RegionalStress(
+        drought=score(base["drought"] + seasonal + variation()),
+        heat=score(base["heat"] + seasonal + variation()),
+        vegetation=score(base["vegetation"] - seasonal * 0.5 + variation()),
+        rainfall=score(base["rainfall"] - seasonal + variation()),
+        overall=score((base["drought"] + base["heat"] + base["vegetation"]) / 3 + seasonal + variation()),
+        temperature=js_round(15 + (np.abs(lat) / 90) * 20 + factor * 10 + variation()),
+        precipitation=js_round(np.maximum(0, 50 + variation() * 2)),
+    )
+
+
+def heatmap_grid(resolution: float = 0.25, factor: Optional[float] = None,
+                 rng: Optional[np.random.Generator] = None) -> HeatmapGrid:
+    """Score every agricultural cell of the heatmap grid, like generateHeatmapData.
+
+    The grid spans latitudes -60..80 and longitudes -180..180 inclusive in
+    steps of ``resolution`` degrees.
+    """
+    lat_axis = np.arange(-60, 80 + resolution / 2, resolution)
+    lon_axis = np.arange(-180, 180 + resolution / 2, resolution)
+    lat, lon = np.meshgrid(lat_axis, lon_axis, indexing="ij")
+    keep = ~non_agricultural_mask(lat, lon)
+    lat = lat[keep]
+    lon = lon[keep]
+
+    stress = regional_stress(lat, seasonal_factor() if factor is None else factor, rng)
+    return HeatmapGrid(lat=lat, lon=lon, zone=climate_zones(lat), stress=stress, risk=risk_levels(stress.overall))
+
+
+def label_counts(codes: np.ndarray, labels) -> Dict[str, int]:
+    """Number of entries per label for an array of label indexes."""
+    counts = np.bincount(codes.ravel(), minlength=len(labels))
+    return {label: int(count) for label, count in zip(labels, counts)}
+
+
+def main():
+    """Score the global heatmap grid once and report how long it took."""
+    parser = argparse.ArgumentParser(description="Batch crop-stress scoring for the heatmap grid.")
+    parser.add_argument("--resolution", type=float, default=0.25, help="Grid spacing in degrees (default: 0.25)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the random variation")
+    parser.add_argument("--output", default=None, help="Write the scored grid to this .npz file")
+    args = parser.parse_args()
+
+    if args.resolution <= 0:
+        parser.error("--resolution must be positive")
+
+    start = time.perf_counter()
+    grid = heatmap_grid(args.resolution, rng=np.random.default_rng(args.seed))
+    elapsed = time.perf_counter() - start
+
+    print(f"✓ Scored {grid.lat.size:,} cells at {args.resolution}° in {elapsed:.2f}s")
+    for level, count in label_counts(grid.risk, RISK_LEVELS).items():
+        print(f"  • {level}: {count:,}")
+
+    if args.output:
+        np.savez_compressed(args.output, lat=grid.lat, lon=grid.lon, zone=grid.zone, risk=grid.risk,
+                            **grid.stress._asdict())
+        print(f"✓ Grid saved to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
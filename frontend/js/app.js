@@ -6,6 +6,15 @@ let currentLayer = 'satellite';
 let cropStressLayer;
 let stateMarkerLayer;
 let selectedStateMarker;
+let heatTileLayer;
+
+// Stress bands of the heat map tiles (same as the /api/heatmap legend)
+const heatmapLegend = [
+    { max: 29, color: '#388e3c' },
+    { max: 49, color: '#fbc02d' },
+    { max: 69, color: '#f57c00' },
+    { max: 100, color: '#d32f2f' }
+];
 
 // Map tile configurations
 const mapLayers = {
@@ -268,7 +277,7 @@ function initializeControls() {
         });
     }
 
-    // Heat map button (placeholder)
+    // Heat map button
     const heatmapBtn = document.getElementById('heatmapBtn');
     if (heatmapBtn) {
         heatmapBtn.addEventListener('click', function() {
@@ -394,8 +403,102 @@ function toggleHeatMap() {
     
     if (btn.classList.contains('active')) {
         btn.innerHTML = '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><rect x="3" y="3" width="18" height="18" rx="2"/><rect x="7" y="7" width="3" height="9" fill="currentColor" opacity="0.7"/><rect x="14" y="4" width="3" height="13" fill="currentColor" opacity="0.7"/></svg>Heat Map On';
+        showHeatTiles();
     } else {
         btn.innerHTML = '<svg width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2"><rect x="3" y="3" width="18" height="18" rx="2"/><rect x="7" y="7" width="3" height="9" fill="currentColor" opacity="0.7"/><rect x="14" y="4" width="3" height="13" fill="currentColor" opacity="0.7"/></svg>Heat Map';
+        if (heatTileLayer) {
+            climateMap.removeLayer(heatTileLayer);
+        }
+    }
+}
+
+// Show the heat map from the precomputed tile pyramid; only visible tiles are downloaded
+function showHeatTiles() {
+    if (heatTileLayer) {
+        heatTileLayer.addTo(climateMap);
+        return;
+    }
+
+    fetch('/api/tiles/heatmap/metadata.json')
+        .then(function(response) {
+            if (!response.ok) throw new Error('Heat map tiles unavailable (' + response.status + ')');
+            return response.json();
+        })
+        .then(function(metadata) {
+            heatTileLayer = createHeatTileLayer(metadata);
+            const btn = document.getElementById('heatmapBtn');
+            if (btn && btn.classList.contains('active')) {
+                heatTileLayer.addTo(climateMap);
+            }
+        })
+        .catch(function(error) {
+            console.warn('Could not load heat map:', error.message);
+        });
+}
+
+// Leaflet layer that draws the binary heat map tiles onto canvases
+function createHeatTileLayer(metadata) {
+    const cellDegrees = {};
+    metadata.levels.forEach(function(level) {
+        cellDegrees[level.zoom] = level.resolution;
+    });
+
+    const HeatTileLayer = L.GridLayer.extend({
+        createTile: function(coords, done) {
+            const tile = document.createElement('canvas');
+            const size = this.getTileSize();
+            tile.width = size.x;
+            tile.height = size.y;
+
+            fetch('/api/tiles/heatmap/' + coords.z + '/' + coords.x + '/' + coords.y + '.wcmt')
+                .then(function(response) {
+                    // 204 means the tile has no agricultural cells
+                    return response.status === 200 ? response.arrayBuffer() : null;
+                })
+                .then(function(buffer) {
+                    if (buffer) {
+                        drawHeatTile(tile, buffer, coords, cellDegrees[coords.z], metadata.extent);
+                    }
+                    done(null, tile);
+                })
+                .catch(function(error) {
+                    done(error, tile);
+                });
+            return tile;
+        }
+    });
+
+    return new HeatTileLayer({
+        pane: 'overlayPane',
+        opacity: 0.6,
+        minNativeZoom: metadata.minZoom,
+        maxNativeZoom: metadata.maxZoom
+    });
+}
+
+// Draw one tile: header "WCMT", version, cell count, then x, y, intensity and peak columns
+function drawHeatTile(canvas, buffer, coords, cellDegrees, extent) {
+    const view = new DataView(buffer);
+    const count = view.getUint32(5, true);
+    const xs = new DataView(buffer, 9, count * 2);
+    const ys = new DataView(buffer, 9 + count * 2, count * 2);
+    const intensities = new Uint8Array(buffer, 9 + count * 4, count);
+    const context = canvas.getContext('2d');
+    const scale = canvas.width / extent;
+    const tiles = Math.pow(2, coords.z);
+    // Cell width in pixels; Mercator stretches cells vertically by 1 / cos(latitude)
+    const cellWidth = Math.max(1, cellDegrees / 360 * tiles * canvas.width);
+
+    for (let i = 0; i < count; i++) {
+        const x = xs.getUint16(i * 2, true) * scale;
+        const y = ys.getUint16(i * 2, true) * scale;
+        const lat = Math.atan(Math.sinh(Math.PI * (1 - 2 * (coords.y + y / canvas.height) / tiles)));
+        const cellHeight = cellWidth / Math.cos(lat);
+        const band = heatmapLegend.find(function(entry) { return intensities[i] <= entry.max; }) ||
+            heatmapLegend[heatmapLegend.length - 1];
+
+        context.fillStyle = band.color;
+        context.fillRect(x - cellWidth / 2, y - cellHeight / 2, cellWidth, cellHeight);
     }
 }
 